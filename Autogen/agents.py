@@ -1,12 +1,15 @@
+import os
+
 from autogen import AssistantAgent, UserProxyAgent
 
 
 
 # --- Configuration ---
 config = {
-    "base_url": "https://openrouter.ai/api/v1",
-    "api_key": "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",  # Replace with your actual key
-    "model": "deepseek/deepseek-r1-0528-qwen3-8b:free"
+    "base_url": os.environ.get("EDUTRACK_LLM_BASE_URL", "https://openrouter.ai/api/v1"),
+    "api_key": os.environ.get("EDUTRACK_LLM_API_KEY", "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"),  # Replace with your actual key
+    "model": os.environ.get("EDUTRACK_LLM_MODEL", "deepseek/deepseek-r1-0528-qwen3-8b:free"),
+    "timeout": float(os.environ.get("EDUTRACK_LLM_TIMEOUT", "60")),  # seconds per HTTP call
 }
 
 # --- Define Agents ---
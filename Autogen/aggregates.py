@@ -0,0 +1,346 @@
+import heapq
+import re
+import threading
+from collections import defaultdict
+
+import pandas as pd
+
+from search_index import tokenize
+
+# Columns each dataset contributes to the views ("gpa_band" is derived from gpa)
+VIEW_COLUMNS = {
+    "academic_data.csv": ["major", "academic_warnings", "gpa"],
+    "welfare_data.csv": ["stress_level"],
+    "career_data.csv": ["career_goal", "job_ready"],
+    "performance_data.csv": ["recent_progress"],
+}
+
+# Columns whose members are kept as student id sets, so cohorts resolve without a scan
+COHORT_COLUMNS = ["major", "academic_warnings", "gpa_band", "stress_level", "career_goal", "job_ready",
+                  "recent_progress"]
+
+# Cross-tab counts and per-group numeric totals maintained alongside the cohorts
+PAIR_COUNTS = [("major", "gpa_band"), ("career_goal", "job_ready")]
+NUMERIC_BY_GROUP = [("major", "gpa")]
+
+GPA_BANDS = ["below 7", "7 to 9", "9 and above"]
+
+# Views and the query words that ask for them
+VIEW_HINTS = {
+    "gpa_by_major": ["gpa", "cgpa", "grade", "grades", "major", "majors", "branch", "department", "academic"],
+    "academic_warnings": ["warning", "warnings", "probation"],
+    "stress_levels": ["stress", "stressed", "wellbeing", "welfare"],
+    "job_readiness": ["job", "ready", "readiness", "placement", "placements", "career", "careers"],
+    "recent_progress": ["progress", "improving", "declining", "trend", "trends"],
+}
+
+SUMMARY_PATTERN = re.compile(
+    r"\b(average|mean|distribution|breakdown|overview|summary|statistics|stats|percentage|share|proportion|"
+    r"how many|count|number of|by major|per major|by career|per career)\b"
+)
+COHORT_INTENT_PATTERN = re.compile(r"\b(students?|who|which|list|show|how many|count|number of)\b")
+
+
+def progress_pattern(word):
+    """A progress value only when it describes students or their progress ("tips for improving" is not one)"""
+    return re.compile(
+        rf"\b(progress|performance|students?|who|which) (is |are |has been |have been )?{word}\b"
+        rf"|\b{word} (progress|performance|students?)\b"
+    )
+
+
+# Query phrases that name a cohort value for the yes/no and level columns
+COHORT_PATTERNS = [
+    (re.compile(r"\b(without|no|zero) (academic )?warnings?\b"), "academic_warnings", "No"),
+    (re.compile(r"\bwarnings?\b|\bprobation\b"), "academic_warnings", "Yes"),
+    (re.compile(r"\bnot (yet )?job[- ]ready\b|\bnot ready for (a )?job"), "job_ready", "No"),
+    (re.compile(r"\bjob[- ]ready\b"), "job_ready", "Yes"),
+    (re.compile(r"\bhigh(ly)? stress(ed)?\b|\bstress(ed)? (level )?(is )?high\b"), "stress_level", "High"),
+    (re.compile(r"\b(moderate|medium) stress\b|\bstress (level )?(is )?(moderate|medium)\b"), "stress_level",
+     "Moderate"),
+    (re.compile(r"\blow stress\b|\bstress (level )?(is )?low\b"), "stress_level", "Low"),
+    (progress_pattern("needs? attention"), "recent_progress", "Needs attention"),
+    (progress_pattern("declining"), "recent_progress", "Declining"),
+    (progress_pattern("improving"), "recent_progress", "Improving"),
+    (progress_pattern("stable"), "recent_progress", "Stable"),
+    (re.compile(r"\b(gpa|cgpa) (below|under|less than|lower than|<) ?7\b"), "gpa_band", "below 7"),
+    (re.compile(r"\b(gpa|cgpa) (between )?7 (to|and|-) ?9\b"), "gpa_band", "7 to 9"),
+    (re.compile(r"\b(gpa|cgpa) (above|over|at least|of|>=?) ?9\b"), "gpa_band", "9 and above"),
+]
+
+# Free-text columns matched by their value names ("Mechanical", "Data Scientist")
+NAMED_VALUE_COLUMNS = ["major", "career_goal"]
+
+
+def gpa_band(gpa):
+    if pd.isna(gpa):
+        return None
+    if gpa < 7.0:
+        return GPA_BANDS[0]
+    if gpa < 9.0:
+        return GPA_BANDS[1]
+    return GPA_BANDS[2]
+
+
+def _present(value):
+    return value is not None and not pd.isna(value)
+
+
+class AggregateLookup:
+    """Summary tables and cohort questions answered from materialized views.
+
+    Read-only; subclasses provide lock, members ({column: {value: student
+    ids}}), pair_counts, numeric, cohort() and cohort_frame().
+    """
+
+    def count(self, column, value):
+        with self.lock:
+            return len(self.members[column].get(value, ()))
+
+    def distribution(self, column):
+        with self.lock:
+            counts = {value: len(ids) for value, ids in self.members[column].items() if len(ids)}
+        return pd.DataFrame(
+            sorted(counts.items(), key=lambda item: -item[1]), columns=[column, "students"]
+        )
+
+    def gpa_by_major(self):
+        with self.lock:
+            rows = []
+            for major, (count, total) in self.numeric[("major", "gpa")].items():
+                if not count:
+                    continue
+                row = {"major": major, "students": count, "mean_gpa": round(total / count, 2)}
+                for band in GPA_BANDS:
+                    row[f"gpa {band}"] = self.pair_counts[("major", "gpa_band")].get((major, band), 0)
+                rows.append(row)
+        return pd.DataFrame(rows).sort_values("major", ignore_index=True) if rows else pd.DataFrame(rows)
+
+    def job_readiness(self):
+        with self.lock:
+            totals = defaultdict(lambda: [0, 0])
+            for (goal, ready), count in self.pair_counts[("career_goal", "job_ready")].items():
+                totals[goal][0] += count
+                if ready == "Yes":
+                    totals[goal][1] += count
+        rows = [{"career_goal": goal, "students": total, "job_ready": ready,
+                 "job_ready_share": round(ready / total, 2)}
+                for goal, (total, ready) in totals.items() if total]
+        return pd.DataFrame(rows).sort_values("career_goal", ignore_index=True) if rows else pd.DataFrame(rows)
+
+    def academic_overview(self):
+        """Average GPA and low/high GPA counts across all students"""
+        with self.lock:
+            count = sum(entry[0] for entry in self.numeric[("major", "gpa")].values())
+            total = sum(entry[1] for entry in self.numeric[("major", "gpa")].values())
+            low = len(self.members["gpa_band"].get(GPA_BANDS[0], ()))
+            high = len(self.members["gpa_band"].get(GPA_BANDS[2], ()))
+        average = total / count if count else 0.0
+        return (f"Academic Overview - Average GPA: {average:.2f}, Students with GPA < 7.0: {low}, "
+                f"Students with GPA >= 9.0: {high}")
+
+    def view(self, name):
+        if name == "gpa_by_major":
+            return self.gpa_by_major()
+        if name == "academic_warnings":
+            return self.distribution("academic_warnings")
+        if name == "stress_levels":
+            return self.distribution("stress_level")
+        if name == "job_readiness":
+            return self.job_readiness()
+        if name == "recent_progress":
+            return self.distribution("recent_progress")
+        raise KeyError(name)
+
+    def match_filters(self, user_query):
+        """(column, value) cohort filters named in the query"""
+        text = " ".join(tokenize(user_query))
+        filters = {}
+        for pattern, column, value in COHORT_PATTERNS:
+            if column not in filters and pattern.search(text):
+                filters[column] = value
+        words = set(tokenize(user_query))
+        for column in NAMED_VALUE_COLUMNS:
+            with self.lock:
+                values = [value for value, ids in self.members[column].items() if len(ids)]
+            for value in values:
+                value_tokens = tokenize(value)
+                if value_tokens and all(any(word.startswith(token) for word in words) for token in value_tokens):
+                    filters.setdefault(column, value)
+        return list(filters.items())
+
+    def answer(self, user_query, limit=25):
+        """Tables answering a cohort or summary question from the views, or [] if it is neither"""
+        text = user_query.lower()
+        filters = self.match_filters(user_query) if COHORT_INTENT_PATTERN.search(text) else []
+        if filters:
+            total, student_ids = self.cohort(filters, limit)
+            label = " and ".join(f"{column} = {value}" for column, value in filters)
+            summary = pd.DataFrame([{"cohort": label, "students": total, "listed": len(student_ids)}])
+            return [("cohort_summary", summary, None),
+                    ("cohort_members", self.cohort_frame(filters, student_ids), None)]
+
+        if SUMMARY_PATTERN.search(text):
+            words = set(tokenize(user_query))
+            names = [name for name, hints in VIEW_HINTS.items() if words & set(hints)]
+            return [(name, self.view(name), None) for name in names]
+        return []
+
+
+class AggregateViews(AggregateLookup):
+    """Materialized counts, cross-tabs and cohort memberships over the datasets.
+
+    Built once at load time with vectorized group-bys and then maintained per
+    row: with_changes() retracts each changed student's previous contribution
+    and adds the new one, so summary and cohort questions are answered from the
+    views in time proportional to the number of groups, never the number of
+    rows. A published views object is never modified; with_changes() returns a
+    new one that copies only the groups it touches.
+    """
+
+    def __init__(self, datasets):
+        self.lock = threading.Lock()
+        self.owned = None  # None: every group belongs to this object; else the (column, value) groups copied so far
+        self.names = {}
+        self.columns = {}
+        self.rows = {}
+        self.members = {column: defaultdict(set) for column in COHORT_COLUMNS}
+        self.pair_counts = {pair: defaultdict(int) for pair in PAIR_COUNTS}
+        self.numeric = {pair: defaultdict(lambda: [0, 0.0]) for pair in NUMERIC_BY_GROUP}
+        for file, df in datasets.items():
+            if file in VIEW_COLUMNS and "student_id" in df.columns:
+                self._build(file, df)
+
+    def _view_frame(self, file, df):
+        frame = df[["student_id"] + [c for c in VIEW_COLUMNS[file] if c in df.columns]].copy()
+        if "gpa" in frame.columns:
+            frame["gpa_band"] = frame["gpa"].map(gpa_band)
+        return frame
+
+    def _build(self, file, df):
+        frame = self._view_frame(file, df)
+        columns = [c for c in frame.columns if c != "student_id"]
+        ids = frame["student_id"].to_numpy()
+        self.columns[file] = tuple(columns)
+        self.rows[file] = dict(zip(ids.tolist(), zip(*(frame[c].tolist() for c in columns)))) if columns else {}
+        if "name" in df.columns:
+            self.names.update(zip(ids.tolist(), df["name"].tolist()))
+
+        for column in columns:
+            if column in self.members:
+                for value, positions in frame.groupby(column, observed=True).indices.items():
+                    self.members[column][value].update(ids[positions].tolist())
+        for a, b in PAIR_COUNTS:
+            if a in frame.columns and b in frame.columns:
+                for key, count in frame.groupby([a, b], observed=True).size().items():
+                    self.pair_counts[(a, b)][key] += int(count)
+        for group, value in NUMERIC_BY_GROUP:
+            if group in frame.columns and value in frame.columns:
+                totals = frame.groupby(group, observed=True)[value].agg(["count", "sum"])
+                for key, (count, total) in totals.iterrows():
+                    entry = self.numeric[(group, value)][key]
+                    entry[0] += int(count)
+                    entry[1] += float(total)
+
+    def _group(self, column, value):
+        """Member set of one group for writing, copied first if it is still shared with the previous views"""
+        if self.owned is None or (column, value) in self.owned:
+            return self.members[column][value]
+        self.owned.add((column, value))
+        copied = self.members[column][value] = set(self.members[column].get(value, ()))
+        return copied
+
+    def _apply(self, student_id, values, sign):
+        for column, value in values.items():
+            if column in self.members and _present(value):
+                if sign > 0:
+                    self._group(column, value).add(student_id)
+                else:
+                    self._group(column, value).discard(student_id)
+        for a, b in PAIR_COUNTS:
+            if _present(values.get(a)) and _present(values.get(b)):
+                self.pair_counts[(a, b)][(values[a], values[b])] += sign
+        for group, value in NUMERIC_BY_GROUP:
+            if _present(values.get(group)) and _present(values.get(value)):
+                entry = self.numeric[(group, value)][values[group]]
+                entry[0] += sign
+                entry[1] += sign * float(values[value])
+
+    # --- Incremental maintenance ---
+    def with_changes(self, file, rows, removed_ids=()):
+        """New views with one dataset's removed and new or changed rows applied; self is left untouched.
+
+        The result shares every group the change doesn't touch with this
+        object; touched member sets, that dataset's stored rows and the small
+        count tables are copied first, so in-flight readers of this snapshot
+        never see a half-applied reload.
+        """
+        views = AggregateViews.__new__(AggregateViews)
+        views.lock = threading.Lock()
+        views.owned = set()
+        views.names = self.names
+        views.columns = dict(self.columns)
+        views.rows = dict(self.rows)
+        if file in self.rows:
+            views.rows[file] = dict(self.rows[file])
+        views.members = {column: defaultdict(set, groups) for column, groups in self.members.items()}
+        views.pair_counts = {pair: defaultdict(int, counts) for pair, counts in self.pair_counts.items()}
+        views.numeric = {pair: defaultdict(lambda: [0, 0.0], {key: list(entry) for key, entry in totals.items()})
+                         for pair, totals in self.numeric.items()}
+        views._remove(file, removed_ids)
+        views._upsert(file, rows)
+        return views
+
+    def _upsert(self, file, df):
+        """Apply new or changed rows of one dataset, replacing each student's old contribution"""
+        if file not in VIEW_COLUMNS:
+            return
+        frame = self._view_frame(file, df)
+        columns = self.columns.setdefault(file, tuple(c for c in frame.columns if c != "student_id"))
+        stored = self.rows.setdefault(file, {})
+        for record in frame.to_dict("records"):
+            student_id = record["student_id"]
+            old = stored.get(student_id)
+            if old is not None:
+                self._apply(student_id, dict(zip(columns, old)), -1)
+            new = tuple(record.get(c) for c in columns)
+            stored[student_id] = new
+            self._apply(student_id, dict(zip(columns, new)), 1)
+        if "name" in df.columns:
+            self.names = {**self.names, **dict(zip(df["student_id"].tolist(), df["name"].tolist()))}
+
+    def _remove(self, file, student_ids):
+        """Retract the given students' rows of one dataset"""
+        stored = self.rows.get(file, {})
+        columns = self.columns.get(file, ())
+        for student_id in student_ids:
+            old = stored.pop(student_id, None)
+            if old is not None:
+                self._apply(student_id, dict(zip(columns, old)), -1)
+
+    # --- Cohorts ---
+    def cohort(self, filters, limit=25):
+        """(total, first `limit` student ids) of students matching every (column, value) filter"""
+        with self.lock:
+            sets = sorted((self.members[column].get(value, set()) for column, value in filters), key=len)
+            if not sets:
+                return 0, []
+            matched = sets[0].intersection(*sets[1:]) if len(sets) > 1 else sets[0]
+            return len(matched), heapq.nsmallest(limit, matched)
+
+    def cohort_frame(self, filters, student_ids):
+        rows = []
+        with self.lock:
+            for student_id in student_ids:
+                row = {"student_id": student_id, "name": self.names.get(student_id)}
+                for column, _ in filters:
+                    row[column] = self._value(student_id, column)
+                rows.append(row)
+        return pd.DataFrame(rows)
+
+    def _value(self, student_id, column):
+        for file, stored in self.rows.items():
+            columns = self.columns[file]
+            if column in columns and student_id in stored:
+                return stored[student_id][columns.index(column)]
+        return None
@@ -0,0 +1,167 @@
+"""FastAPI server for the Edutrack pipeline: uvicorn api:app
+
+Imports only the lightweight core; agents, datasets and the log DB are
+created in the startup hook, or on the first request when
+EDUTRACK_LAZY_STARTUP=1. serve.py runs several workers over one shared,
+memory-mapped copy of the datasets.
+"""
+import asyncio
+import json
+import os
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+
+import core
+from llm_scheduler import SchedulerOverloaded
+
+LAZY_STARTUP = os.environ.get("EDUTRACK_LAZY_STARTUP", "0") == "1"
+
+
+# --- FastAPI ---
+@asynccontextmanager
+async def lifespan(app):
+    if not LAZY_STARTUP:
+        await asyncio.get_running_loop().run_in_executor(None, core.startup)
+    yield
+    # Stop the dataset watcher and flush queued log rows before the worker exits
+    core.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+class Query(BaseModel):
+    message: str
+    multi_agent_mode: Optional[str] = None  # 'groupchat' or 'parallel'; server default when omitted
+    session_id: Optional[str] = None  # client-chosen id; turns with the same id share conversation memory
+
+
+async def admit(weight=1):
+    """Take request slots, or reject with 503 and Retry-After while the LLM scheduler is saturated"""
+    await asyncio.get_running_loop().run_in_executor(None, core.startup)
+    try:
+        core.admit_request(weight)
+    except SchedulerOverloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+
+@app.post("/ask")
+async def ask_edutrack(query: Query):
+    await admit()
+    # Blocking LLM and DB work runs on the pipeline pool, keeping the event loop free
+    loop = asyncio.get_running_loop()
+    try:
+        response, flow_info, metrics = await loop.run_in_executor(
+            core.pipeline_executor, core.answer_query, query.message, None, query.multi_agent_mode, None,
+            query.session_id)
+    finally:
+        core.release_request()
+    return {"response": response, "agent_flow": flow_info, "metrics": metrics}
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@app.post("/ask/stream")
+async def ask_edutrack_stream(query: Query):
+    """Server-sent events: 'stage' per flow step, 'token' deltas, then 'done' with the flow summary"""
+    loop = asyncio.get_running_loop()
+    await admit()
+    events = asyncio.Queue()
+    ctx = core.RequestContext()
+    ctx.event_sink = lambda event, data: loop.call_soon_threadsafe(events.put_nowait, (event, data))
+
+    def run_pipeline():
+        try:
+            response, flow_info, metrics = core.answer_query(query.message, None, query.multi_agent_mode, ctx,
+                                                              query.session_id)
+            ctx.emit("done", {"response": response, "agent_flow": flow_info, "metrics": metrics})
+        except Exception as e:
+            ctx.emit("error", {"error": str(e)})
+        finally:
+            core.release_request()
+
+    loop.run_in_executor(core.pipeline_executor, run_pipeline)
+
+    async def event_stream():
+        while True:
+            event, data = await events.get()
+            yield sse_event(event, data)
+            if event in ("done", "error"):
+                break
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+class BatchQuery(BaseModel):
+    messages: list  # questions; normalized duplicates are answered once
+    multi_agent_mode: Optional[str] = None
+
+
+@app.post("/ask/batch")
+async def ask_edutrack_batch(query: BatchQuery):
+    """Answer many questions with shared planning and lookups; results are in input order"""
+    if len(query.messages) > core.BATCH_MAX_SIZE:
+        raise HTTPException(status_code=413, detail=f"At most {core.BATCH_MAX_SIZE} messages per batch")
+    # A batch answers up to BATCH_CONCURRENCY questions at once, so it holds that many request slots
+    weight = max(1, min(len(query.messages), core.BATCH_CONCURRENCY))
+    await admit(weight)
+    loop = asyncio.get_running_loop()
+    try:
+        results, metrics = await loop.run_in_executor(
+            core.pipeline_executor, core.answer_batch, [str(message) for message in query.messages],
+            query.multi_agent_mode)
+    finally:
+        core.release_request(weight)
+    return {"results": results, "metrics": metrics}
+
+
+@app.delete("/sessions/{session_id}")
+async def drop_session(session_id: str):
+    """Forget a conversation's memory"""
+    await asyncio.get_running_loop().run_in_executor(None, core.startup)
+    if not core.sessions.drop(session_id):
+        raise HTTPException(status_code=404, detail="Unknown session")
+    return {"dropped": session_id}
+
+
+class ReloadRequest(BaseModel):
+    datasets: Optional[list] = None  # dataset names such as 'academic_data.csv'; all when omitted
+    force: bool = False  # reload even if the file looks unchanged
+
+
+@app.post("/datasets/reload")
+async def reload_datasets(request: ReloadRequest):
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, core.startup)
+    results = await loop.run_in_executor(None, core.dataset_manager.reload, request.datasets, request.force)
+    return {"results": results, "version": core.dataset_manager.current.version}
+
+
+@app.get("/datasets")
+async def dataset_status():
+    await asyncio.get_running_loop().run_in_executor(None, core.startup)
+    return core.dataset_manager.stats()
+
+
+@app.get("/logs/search")
+async def search_logs(q: str, limit: int = 20):
+    """Full-text search over logged questions and answers (every word must match)"""
+    return await asyncio.get_running_loop().run_in_executor(None, core.search_logs, q, min(limit, 200))
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus scrape endpoint; histogram_quantile() over the stage buckets gives p50/p95/p99"""
+    return PlainTextResponse(core.metrics_text(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/metrics/stages")
+async def stage_summary():
+    """Count, mean and p50/p95/p99 latency per stage and agent since the worker started"""
+    return core.tracer.summary()
@@ -0,0 +1,88 @@
+"""Micro-benchmark: iterrows keyword scan vs. inverted index lookup.
+
+Usage: python bench_lookup.py [--sizes 3000 100000 1000000] [--max-scan-rows N]
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from search_index import InvertedIndex
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Datasets")
+
+QUERIES = [
+    "What's my current GPA status?",
+    "Show me students with academic warnings",
+    "Give me career advice for my major",
+    "How is Priya T doing in Digital Logic?",
+]
+
+
+def scan_lookup(df, query_keywords):
+    """The original per-query scan from lookup_from_data"""
+    matches = []
+    for _, row in df.iterrows():
+        row_str = ' '.join(map(str, row.values)).lower()
+        if any(keyword in row_str for keyword in query_keywords):
+            matches.append(row.to_dict())
+    return matches
+
+
+def index_lookup(df, index, query_keywords):
+    row_ids = index.lookup(query_keywords)
+    return df.iloc[row_ids].to_dict("records") if len(row_ids) else []
+
+
+def scale_frame(df, num_rows):
+    """Tile a dataset up to num_rows with unique student ids and names"""
+    reps = -(-num_rows // len(df))
+    big = pd.concat([df] * reps, ignore_index=True).iloc[:num_rows].copy()
+    big["student_id"] = np.arange(1001, 1001 + num_rows)
+    suffix = pd.Series(np.arange(num_rows) // len(df)).astype(str)
+    big["name"] = big["name"].astype(str) + suffix.radd(" ").where(suffix != "0", "")
+    return big
+
+
+def time_it(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[3000, 100_000, 1_000_000])
+    parser.add_argument("--dataset", default="clean_academic_data.csv")
+    parser.add_argument("--max-scan-rows", type=int, default=100_000,
+                        help="skip the iterrows scan above this many rows (it takes minutes at 1M)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    base = pd.read_csv(os.path.join(DATA_DIR, args.dataset))
+    print(f"{'rows':>10} {'build (s)':>10} {'scan/query (ms)':>16} {'index/query (ms)':>17} {'speedup':>8}")
+    for size in args.sizes:
+        df = scale_frame(base, size)
+        start = time.perf_counter()
+        index = InvertedIndex(df)
+        build_time = time.perf_counter() - start
+
+        keyword_sets = [q.lower().split() for q in QUERIES]
+        index_time = sum(time_it(lambda k=k: index_lookup(df, index, k), args.repeat) for k in keyword_sets)
+        index_ms = index_time / len(QUERIES) * 1000
+
+        if size <= args.max_scan_rows:
+            scan_time = sum(time_it(lambda k=k: scan_lookup(df, k), 1) for k in keyword_sets)
+            scan_ms = scan_time / len(QUERIES) * 1000
+            print(f"{size:>10} {build_time:>10.2f} {scan_ms:>16.1f} {index_ms:>17.2f} {scan_ms / index_ms:>7.0f}x")
+        else:
+            print(f"{size:>10} {build_time:>10.2f} {'skipped':>16} {index_ms:>17.2f} {'-':>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Benchmark multi-agent answers: GroupChat vs. parallel fan-out + synthesis.
+
+Runs the same multi-agent question through both modes against the local stub
+LLM and reports wall-clock time and LLM requests per answer.
+
+Usage: python bench_multi_agent.py [--latency 0.3] [--runs 3]
+"""
+import argparse
+import logging
+import os
+import statistics
+import time
+
+import stub_llm
+
+QUESTION = "I'm stressed about my grades and unsure about internships, how do I get back on track?"
+ALL_AGENTS = ["academic", "career", "welfare", "performance"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8998)
+    args = parser.parse_args()
+
+    os.environ["EDUTRACK_LLM_BASE_URL"] = stub_llm.start_in_background(args.port, args.latency)
+    os.environ["EDUTRACK_CACHE_SIZE"] = "0"
+    os.environ["EDUTRACK_QUERY_INDEX_SIZE"] = "0"
+    stub_llm.set_replies({"router": {"mode": "llm"}, "selector": {"agents": ALL_AGENTS}})
+    logging.getLogger("autogen.oai.client").setLevel(logging.ERROR)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    import core
+    core.startup()
+
+    print(f"{'mode':>10} {'mean (s)':>9} {'min (s)':>8} {'LLM requests':>13}")
+    for mode in ["groupchat", "parallel"]:
+        times, requests = [], []
+        for _ in range(args.runs):
+            before = stub_llm.stats["requests"]
+            start = time.perf_counter()
+            core.hybrid_response(QUESTION, multi_agent_mode=mode)
+            times.append(time.perf_counter() - start)
+            requests.append(stub_llm.stats["requests"] - before)
+        print(f"{mode:>10} {statistics.mean(times):>9.2f} {min(times):>8.2f} {statistics.mean(requests):>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Benchmark planning calls: free-form replies vs. schema-constrained, length-capped JSON.
+
+Plans the same questions with the planning agents configured both ways
+against the local stub LLM acting as a reasoning model (a <think> preamble
+before every free-form planning reply) and reports planning latency,
+completion tokens per planning call and the share of replies that could not
+be parsed and fell back to the keyword heuristics.
+
+Usage: python bench_planning.py [--reasoning-words 150] [--token-rate 200] [--latency 0.1] [--questions 12]
+"""
+import argparse
+import logging
+import os
+import statistics
+
+import stub_llm
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+QUESTIONS = [
+    "Show me students with academic warnings in Computer Science",
+    "Give me career advice for my major",
+    "How can I raise my GPA given my attendance?",
+    "I'm stressed about exams, what should I do?",
+    "Which internships suit a data science student?",
+    "How do I set better weekly study goals?",
+]
+CONFIGURATIONS = {
+    # name: (structured output, max tokens per plan); core applies the cap only to structured replies
+    "free-form": (False, 80),
+    "structured": (True, 80),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reasoning-words", type=int, default=150, help="stub <think> words per free-form reply")
+    parser.add_argument("--token-rate", type=float, default=200, help="stub words per second")
+    parser.add_argument("--latency", type=float, default=0.1, help="stub seconds to the first token")
+    parser.add_argument("--questions", type=int, default=12)
+    parser.add_argument("--port", type=int, default=8996)
+    args = parser.parse_args()
+
+    os.environ["EDUTRACK_LLM_BASE_URL"] = stub_llm.start_in_background(args.port, args.latency, args.token_rate)
+    stub_llm.settings["reasoning_words"] = args.reasoning_words
+    os.environ.setdefault("EDUTRACK_DATA_DIR", os.path.join(HERE, "Datasets"))
+    os.environ.update(EDUTRACK_CACHE_SIZE="0", EDUTRACK_QUERY_INDEX_SIZE="0", EDUTRACK_FAST_PATH_MIN_EXAMPLES="0",
+                      EDUTRACK_DATASET_POLL_SECONDS="0")
+    logging.getLogger("autogen.oai.client").setLevel(logging.ERROR)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    import core
+    core.startup()
+
+    questions = [QUESTIONS[i % len(QUESTIONS)] + f" (#{i})" for i in range(args.questions)]
+    print(f"{'configuration':<14} {'mode':<11} {'mean (s)':>9} {'p95 (s)':>8} {'tokens/call':>12} {'parse failures':>15}")
+    for name, (structured, max_tokens) in CONFIGURATIONS.items():
+        core.PLANNING_STRUCTURED, core.PLANNING_MAX_TOKENS = structured, max_tokens
+        core._create_agents()  # rebuilds the planning agents' llm_config
+        for planning_mode in ("concurrent", "combined"):
+            times, tokens, calls, failures = [], 0, 0, 0
+            for question in questions:
+                ctx = core.RequestContext()
+                core.plan_query(ctx, question, planning_mode)
+                times.append(ctx.metrics["planning_time"])
+                tokens += ctx.metrics.get("planning_completion_tokens", 0)
+                calls += ctx.metrics["planning_calls"]
+                failures += ctx.metrics.get("planning_parse_failures", 0)
+            p95 = sorted(times)[min(len(times) - 1, int(len(times) * 0.95))]
+            print(f"{name:<14} {planning_mode:<11} {statistics.mean(times):>9.3f} {p95:>8.3f} "
+                  f"{tokens / max(1, calls):>12.1f} {f'{failures}/{calls}':>15}")
+    core.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Reload benchmark: full dataset reload vs. the DatasetManager's incremental reload.
+
+Writes all four datasets scaled to --students rows into a temporary directory,
+changes --change-rate of the academic rows (half modified, a quarter removed,
+a quarter new students) and times both ways of picking the change up.
+
+Usage: python bench_reload.py [--students 1000000] [--change-rate 0.01]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from bench_student_store import DATA_DIR, scale_frame
+from dataset_manager import DATASET_FILES, DatasetManager
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=1_000_000)
+    parser.add_argument("--change-rate", type=float, default=0.01)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        for filename in DATASET_FILES.values():
+            scale_frame(pd.read_csv(os.path.join(DATA_DIR, filename)), args.students).to_csv(
+                os.path.join(data_dir, filename), index=False)
+
+        start = time.perf_counter()
+        manager = DatasetManager(data_dir).load()
+        initial_load = time.perf_counter() - start
+
+        path = manager.path("academic_data.csv")
+        df = pd.read_csv(path)
+        rng = np.random.default_rng(0)
+        count = int(len(df) * args.change_rate)
+        rows = rng.choice(len(df), count, replace=False)
+        modified, removed = rows[:count // 2], rows[count // 2:count * 3 // 4]
+        df.loc[modified, "gpa"] = np.round(rng.uniform(4, 10, len(modified)), 1)
+        df.loc[modified, "academic_warnings"] = np.where(df.loc[modified, "gpa"] < 6, "Yes", "No")
+        added = df.iloc[:count - len(modified) - len(removed)].copy()
+        added["student_id"] = np.arange(len(added)) + 10_000_000
+        df = pd.concat([df.drop(index=removed), added], ignore_index=True)
+        df.to_csv(path, index=False)
+
+        start = time.perf_counter()
+        result = manager.reload(["academic_data.csv"])["academic_data.csv"]
+        incremental = time.perf_counter() - start
+
+        start = time.perf_counter()
+        DatasetManager(data_dir).load()
+        full = time.perf_counter() - start
+
+    print(f"students:            {args.students:,}")
+    print(f"changed rows:        {result.get('changed', 0):,} modified, {result.get('added', 0):,} added, "
+          f"{result.get('removed', 0):,} removed ({result['mode']})")
+    print(f"initial load:        {initial_load:.2f}s")
+    print(f"full reload:         {full:.2f}s")
+    print(f"incremental reload:  {incremental:.2f}s ({full / incremental:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Per-worker memory of private vs. shared (memory-mapped) datasets as workers are added.
+
+Tiles the CSVs up to --students rows in a temporary directory, then for each
+worker count starts that many processes which load the datasets (each its own
+copy, or attached from one shared_datasets cache), answer a few lookups that
+touch every structure, and report their memory once all are loaded. Pss
+divides shared pages among the processes mapping them; Private is what each
+worker holds alone. Figures are the increase over the worker's baseline
+after imports.
+
+Usage: python bench_shared_memory.py [--students 200000] [--workers 1 2 4]
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+
+from bench_student_store import scale_frame
+from dataset_manager import DATASET_FILES
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+QUERIES = ["How is Priya T doing?", "students with academic warnings in Computer Sci.", "average gpa by major",
+           "internship advice for data science", "high stress students"]
+
+
+def memory_kb():
+    """Rss, Pss and private kB of this process (Linux smaps_rollup)"""
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {"rss": fields["Rss"], "pss": fields["Pss"],
+            "private": fields["Private_Clean"] + fields["Private_Dirty"]}
+
+
+def worker(data_dir, shared_dir, loaded, release, results):
+    from dataset_manager import DatasetManager
+    from context_builder import build_context, content_keywords
+    before = memory_kb()
+    start = time.perf_counter()
+    snapshot = DatasetManager(data_dir, shared_dir=shared_dir).load().current
+    load_seconds = time.perf_counter() - start
+    # Touch every structure the pipeline reads, as requests would
+    for query in QUERIES:
+        snapshot.store.find_profiles(query)
+        snapshot.views.answer(query)
+        keywords = content_keywords(query)
+        for name, index in snapshot.indexes.items():
+            rows = index.lookup(keywords)
+            build_context(query, [(name, snapshot.datasets[name].iloc[rows], index.score_rows(keywords, rows))])
+    for df in list(snapshot.datasets.values()) + [snapshot.store.frame]:
+        df.to_csv(os.devnull, index=False)  # reads every column
+    loaded.wait()
+    after = memory_kb()
+    results.put({key: after[key] - before[key] for key in after} | {"load": load_seconds})
+    release.wait()
+
+
+def run(workers, data_dir, shared_dir):
+    context = multiprocessing.get_context("spawn")
+    loaded, release, results = context.Barrier(workers), context.Event(), context.Queue()
+    processes = [context.Process(target=worker, args=(data_dir, shared_dir, loaded, release, results))
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+    measured = [results.get() for _ in processes]
+    release.set()
+    for process in processes:
+        process.join()
+    return {key: sum(m[key] for m in measured) / len(measured) for key in measured[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=200_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="edutrack-shared-")
+    try:
+        data_dir = os.path.join(workdir, "data")
+        os.makedirs(data_dir)
+        for filename in DATASET_FILES.values():
+            df = scale_frame(pd.read_csv(os.path.join(HERE, "Datasets", filename)), args.students)
+            df.to_csv(os.path.join(data_dir, filename), index=False)
+        shared_dir = os.path.join(workdir, "shared")
+
+        start = time.perf_counter()
+        import shared_datasets
+        shared_datasets.build({name: os.path.join(data_dir, filename) for name, filename in DATASET_FILES.items()},
+                              shared_dir)
+        print(f"{args.students:,} students per dataset; shared cache built in {time.perf_counter() - start:.1f}s\n")
+
+        print(f"{'mode':<8} {'workers':>7} {'load s':>7} {'RSS MB':>8} {'PSS MB':>8} {'private MB':>11}")
+        for mode in ("private", "shared"):
+            for workers in args.workers:
+                result = run(workers, data_dir, shared_dir if mode == "shared" else None)
+                print(f"{mode:<8} {workers:>7} {result['load']:>7.2f} {result['rss'] / 1024:>8.1f} "
+                      f"{result['pss'] / 1024:>8.1f} {result['private'] / 1024:>11.1f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
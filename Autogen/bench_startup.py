@@ -0,0 +1,67 @@
+"""Cold-start benchmark: import time and resident memory per worker entry point.
+
+Each scenario runs in a fresh interpreter (in a temporary directory, so the
+log DB is not written into the repo) and reports wall time and RSS after it
+finishes. 'import api' is what a uvicorn worker pays before it can accept
+connections; 'api + startup' adds the agents, datasets and log DB.
+
+Usage: python bench_startup.py [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+SCENARIOS = {
+    "import core": "import core",
+    "import api": "import api",
+    "api + startup": "import api; api.core.startup()",
+    "streamlit UI (bare)": "import Autogen",
+}
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+{statement}
+seconds = time.perf_counter() - start
+try:
+    import psutil
+    rss_mb = psutil.Process().memory_info().rss / 1024 ** 2
+except ImportError:
+    import resource
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # peak, in KB on Linux
+heavy = [name for name in ("streamlit", "autogen", "openai", "pandas") if name in sys.modules]
+print(json.dumps({{"seconds": seconds, "rss_mb": rss_mb, "heavy": heavy}}))
+"""
+
+
+def run_scenario(statement, cwd):
+    env = dict(os.environ, PYTHONPATH=HERE, EDUTRACK_DATA_DIR=os.path.join(HERE, "Datasets"),
+               EDUTRACK_DATASET_POLL_SECONDS="0")
+    result = subprocess.run([sys.executable, "-c", PROBE.format(statement=statement)], cwd=cwd, env=env,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'scenario':<22} {'median (s)':>10} {'max (s)':>8} {'RSS (MB)':>9}  heavy modules loaded")
+    with tempfile.TemporaryDirectory() as cwd:
+        for name, statement in SCENARIOS.items():
+            runs = [run_scenario(statement, cwd) for _ in range(args.runs)]
+            seconds = [run["seconds"] for run in runs]
+            rss = statistics.median(run["rss_mb"] for run in runs)
+            heavy = ", ".join(runs[-1]["heavy"]) or "none"
+            print(f"{name:<22} {statistics.median(seconds):>10.3f} {max(seconds):>8.3f} {rss:>9.1f}  {heavy}")
+
+
+if __name__ == "__main__":
+    main()
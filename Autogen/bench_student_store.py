@@ -0,0 +1,78 @@
+"""Memory and lookup benchmark: four object-dtype DataFrames vs. the joined StudentStore.
+
+Usage: python bench_student_store.py [--students 1000000]
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from student_store import StudentStore
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Datasets")
+
+DATASET_FILES = {
+    "academic_data.csv": "clean_academic_data.csv",
+    "performance_data.csv": "performance_data_consistent.csv",
+    "welfare_data.csv": "welfare_data_consistent.csv",
+    "career_data.csv": "career_data_consistent.csv",
+}
+
+
+def scale_frame(df, num_rows):
+    """Tile a dataset up to num_rows with unique student ids"""
+    reps = -(-num_rows // len(df))
+    big = pd.concat([df] * reps, ignore_index=True).iloc[:num_rows].copy()
+    big["student_id"] = np.arange(1001, 1001 + num_rows)
+    # Plain Python objects, as pd.read_csv would produce for a file of this size
+    for column in big.columns:
+        if big[column].dtype == object:
+            big[column] = big[column].astype(str).astype(object)
+    return big
+
+
+def mb(num_bytes):
+    return f"{num_bytes / 1024 ** 2:,.1f} MB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--students", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    datasets = {
+        name: scale_frame(pd.read_csv(os.path.join(DATA_DIR, filename)), args.students)
+        for name, filename in DATASET_FILES.items()
+    }
+    frames_bytes = sum(int(df.memory_usage(deep=True).sum()) for df in datasets.values())
+
+    start = time.perf_counter()
+    store = StudentStore(datasets)
+    build_time = time.perf_counter() - start
+
+    query = "What is Priya T's situation?"
+    start = time.perf_counter()
+    positions = store.find_positions(query)
+    find_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    profile = store.get(1001 + args.students // 2)
+    get_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    for df in datasets.values():
+        df[df["name"] == "Priya T"]
+    scan_ms = (time.perf_counter() - start) * 1000
+
+    print(f"students:                 {args.students:,}")
+    print(f"four DataFrames:          {mb(frames_bytes)}")
+    print(f"StudentStore:             {mb(store.memory_usage())} (build {build_time:.2f}s)")
+    print(f"name match (store):       {find_ms:.2f} ms, {len(positions):,} students")
+    print(f"name match (4-frame scan): {scan_ms:.2f} ms")
+    print(f"profile by id:            {get_ms:.3f} ms -> {sorted(profile)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""Offline end-to-end benchmark suite against the local stub LLM.
+
+Drives hybrid_response directly and /ask through the ASGI app for each
+pipeline path (lookup, single-agent llm, multi-agent groupchat and parallel,
+both) and reports throughput, latency percentiles, LLM requests per query and
+resident memory. The stub's scripted router/selector/data_context replies are
+set per scenario so every run takes the intended path.
+
+Runs in a temporary directory with the reply cache, answer reuse and the
+fast-path classifier off, so every query pays for the full pipeline.
+--save writes the results as JSON; --compare exits non-zero when a scenario's
+p95 latency or LLM requests per query regress past --tolerance.
+
+Usage: python bench_suite.py [--queries 16] [--concurrency 4] [--latency 0.1] [--token-rate 200]
+                             [--targets hybrid api] [--scenarios lookup llm_single ...]
+                             [--save results.json] [--compare baseline.json]
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import stub_llm
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ALL_AGENTS = ["academic", "career", "welfare", "performance"]
+
+SCENARIOS = {
+    "lookup": {
+        "question": "Show me students with academic warnings in Computer Science",
+        "replies": {"router": "lookup", "selector": "['academic']", "data_context": "['academic_data.csv']"},
+    },
+    "llm_single": {
+        "question": "Give me career advice for my major",
+        "replies": {"router": "llm", "selector": "['career']", "data_context": "['career_data.csv']"},
+    },
+    "llm_groupchat": {
+        "question": "I'm stressed about my grades and unsure about internships, how do I get back on track?",
+        "replies": {"router": "llm", "selector": str(ALL_AGENTS), "data_context": "['academic_data.csv']"},
+        "multi_agent_mode": "groupchat",
+    },
+    "llm_parallel": {
+        "question": "I'm stressed about my grades and unsure about internships, how do I get back on track?",
+        "replies": {"router": "llm", "selector": str(ALL_AGENTS), "data_context": "['academic_data.csv']"},
+        "multi_agent_mode": "parallel",
+    },
+    "both": {
+        "question": "How can I raise my GPA given the academic records of students with warnings?",
+        "replies": {"router": "both", "selector": "['academic']", "data_context": "['academic_data.csv']"},
+    },
+}
+
+# Absolute slack (seconds) on top of --tolerance so tiny latencies don't flag noise
+LATENCY_SLACK = 0.05
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # peak, in KB on Linux
+
+
+def percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def scenario_replies(scenario):
+    replies = scenario["replies"]
+    mode = replies["router"]
+    selected = json.loads(replies["selector"].replace("'", '"'))
+    files = json.loads(replies["data_context"].replace("'", '"'))
+    # Each planning agent gets its JSON object; the combined planner gets the whole decision
+    return {"router": {"mode": mode}, "selector": {"agents": selected}, "data_context": {"datasets": files},
+            "planner": {"mode": mode, "agents": selected, "datasets": files}}
+
+
+def run_hybrid(core, scenario, queries, concurrency):
+    def one(_):
+        ctx = core.RequestContext()
+        start = time.perf_counter()
+        core.hybrid_response(scenario["question"], ctx=ctx, multi_agent_mode=scenario.get("multi_agent_mode"))
+        return time.perf_counter() - start, ctx.plan["mode"] if ctx.plan else None
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(queries)))
+    return [latency for latency, _ in results], {mode for _, mode in results}
+
+
+async def run_api(app, scenario, queries, concurrency):
+    import httpx
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(client):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post("/ask", json={"message": scenario["question"],
+                                                       "multi_agent_mode": scenario.get("multi_agent_mode")})
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://edutrack", timeout=300) as client:
+        await asyncio.gather(*(one(client) for _ in range(queries)))
+    return latencies, set()
+
+
+def run_scenario(target, name, core, app, args):
+    scenario = SCENARIOS[name]
+    stub_llm.set_replies(scenario_replies(scenario))
+    requests_before = stub_llm.stats["requests"]
+    start = time.perf_counter()
+    # GroupChat prints every message; keep the report readable unless --verbose
+    with contextlib.redirect_stdout(sys.stdout if args.verbose else open(os.devnull, "w")):
+        if target == "hybrid":
+            latencies, modes = run_hybrid(core, scenario, args.queries, args.concurrency)
+        else:
+            latencies, modes = asyncio.run(run_api(app, scenario, args.queries, args.concurrency))
+    elapsed = time.perf_counter() - start
+    expected = scenario["replies"]["router"]
+    if modes and modes != {expected}:
+        print(f"Warning: {name} ran in mode(s) {sorted(modes)}, expected {expected}")
+
+    ordered = sorted(latencies)
+    return {
+        "queries": len(latencies),
+        "throughput": round(len(latencies) / elapsed, 3),
+        "mean": round(statistics.mean(ordered), 4),
+        "p50": round(percentile(ordered, 0.5), 4),
+        "p95": round(percentile(ordered, 0.95), 4),
+        "p99": round(percentile(ordered, 0.99), 4),
+        "llm_per_query": round((stub_llm.stats["requests"] - requests_before) / len(latencies), 2),
+        "rss_mb": round(rss_mb(), 1),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Regressions of p95 latency or LLM requests per query against a saved run"""
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        if current["p95"] > previous["p95"] * (1 + tolerance) + LATENCY_SLACK:
+            regressions.append(f"{key}: p95 {previous['p95']:.3f}s -> {current['p95']:.3f}s")
+        if current["llm_per_query"] > previous["llm_per_query"]:
+            regressions.append(f"{key}: LLM/query {previous['llm_per_query']} -> {current['llm_per_query']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=16, help="queries per scenario and target")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.1, help="stub seconds to the first token")
+    parser.add_argument("--token-rate", type=float, default=200, help="stub words per second (0 = instant)")
+    parser.add_argument("--targets", nargs="+", choices=["hybrid", "api"], default=["hybrid", "api"])
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--port", type=int, default=8997)
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON from an earlier --save")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative p95 increase")
+    parser.add_argument("--verbose", action="store_true", help="show pipeline and GroupChat output")
+    args = parser.parse_args()
+
+    os.environ["EDUTRACK_LLM_BASE_URL"] = stub_llm.start_in_background(args.port, args.latency, args.token_rate)
+    os.environ["EDUTRACK_DATA_DIR"] = os.path.join(HERE, "Datasets")
+    os.environ.update(EDUTRACK_CACHE_SIZE="0", EDUTRACK_QUERY_INDEX_SIZE="0", EDUTRACK_FAST_PATH_MIN_EXAMPLES="0",
+                      EDUTRACK_DATASET_POLL_SECONDS="0", EDUTRACK_COALESCE="0")
+    os.environ.setdefault("EDUTRACK_PIPELINE_WORKERS", str(max(16, args.concurrency)))
+    logging.getLogger("autogen.oai.client").setLevel(logging.ERROR)  # stub model has no pricing entry
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    save, baseline = [os.path.abspath(path) if path else None for path in (args.save, args.compare)]
+    workdir = tempfile.mkdtemp(prefix="edutrack-bench-")
+    os.chdir(workdir)  # keeps the log DB out of the repo
+    import api  # imported after the stub is up so the agents pick up its base_url
+    start = time.perf_counter()
+    api.core.startup()
+    print(f"startup: {time.perf_counter() - start:.2f}s, RSS {rss_mb():.0f} MB, stub latency {args.latency}s, "
+          f"{args.token_rate:g} words/s, {args.queries} queries x concurrency {args.concurrency}\n")
+
+    results = {}
+    print(f"{'target':<7} {'scenario':<14} {'q/s':>7} {'mean':>7} {'p50':>7} {'p95':>7} {'p99':>7} "
+          f"{'LLM/q':>6} {'RSS MB':>7}")
+    for target in args.targets:
+        for name in args.scenarios:
+            result = run_scenario(target, name, api.core, api.app, args)
+            results[f"{target}/{name}"] = result
+            print(f"{target:<7} {name:<14} {result['throughput']:>7.2f} {result['mean']:>7.3f} {result['p50']:>7.3f} "
+                  f"{result['p95']:>7.3f} {result['p99']:>7.3f} {result['llm_per_query']:>6.1f} {result['rss_mb']:>7.0f}")
+    api.core.shutdown()
+
+    print("\nslowest stages (p95 ms):")
+    stages = sorted(api.core.tracer.summary().items(), key=lambda item: -item[1]["p95_ms"])
+    for stage, summary in stages[:8]:
+        print(f"  {stage:<32} {summary['p95_ms']:>9.1f}  ({summary['count']} spans)")
+
+    if save:
+        with open(save, "w") as f:
+            json.dump(results, f, indent=2)
+    if baseline:
+        with open(baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from search_index import tokenize
+
+# Words too common to identify rows; matching on them pulls in whole datasets
+STOPWORDS = {
+    "a", "about", "all", "am", "an", "and", "any", "are", "as", "at", "be", "by", "can", "could", "do",
+    "does", "for", "from", "give", "get", "has", "have", "how", "i", "in", "is", "it", "its", "list", "me",
+    "my", "of", "on", "or", "our", "please", "should", "show", "so", "students", "student", "tell", "that",
+    "the", "their", "them", "there", "these", "this", "to", "us", "want", "was", "we", "what", "whats",
+    "when", "which", "who", "why", "will", "with", "would", "you", "your",
+}
+
+# Always kept so rows stay attributable to a student
+IDENTITY_COLUMNS = ["student_id", "name"]
+
+# Query words that make a column relevant
+COLUMN_HINTS = {
+    "gpa": ["gpa", "cgpa", "grade", "grades", "marks", "score", "scores", "academic"],
+    "major": ["major", "branch", "department", "stream"],
+    "current_courses": ["course", "courses", "subject", "subjects", "class", "classes", "enrolled"],
+    "academic_warnings": ["warning", "warnings", "probation", "academic"],
+    "weak_subjects": ["weak", "weakness", "weaknesses", "struggling", "subject", "subjects"],
+    "strengths": ["strength", "strengths", "strong", "good"],
+    "recommended_actions": ["recommend", "recommended", "action", "actions", "improve", "advice"],
+    "recent_progress": ["progress", "improving", "declining", "trend", "performance"],
+    "stress_level": ["stress", "stressed", "pressure", "anxiety", "wellbeing", "welfare"],
+    "issues_reported": ["issue", "issues", "problem", "problems", "anxiety", "burnout", "depression",
+                        "sleep", "focus", "procrastination", "homesickness", "isolation"],
+    "mental_health_support": ["support", "counselling", "counseling", "therapy", "therapist", "mental", "health"],
+    "wellness_sessions": ["session", "sessions", "wellness"],
+    "career_goal": ["career", "goal", "goals", "job", "role", "roles"],
+    "internships_done": ["internship", "internships", "experience", "intern"],
+    "job_ready": ["ready", "readiness", "job", "placement", "placements"],
+    "suggested_paths": ["path", "paths", "suggest", "suggested", "next"],
+}
+
+# Distinct values at or below which a column is summarized by its most common values
+SUMMARY_MAX_CATEGORIES = 20
+
+
+def content_keywords(user_query):
+    """Query tokens with stopwords removed"""
+    return [token for token in dict.fromkeys(tokenize(user_query)) if token not in STOPWORDS]
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token); avoids a tokenizer download"""
+    return (len(text) + 3) // 4
+
+
+def relevant_columns(user_query, columns):
+    """Identity columns plus those the query hints at; all columns if none are hinted"""
+    words = set(tokenize(user_query))
+    hinted = [column for column in columns if words & set(COLUMN_HINTS.get(column, []))]
+    if not hinted:
+        return list(columns)
+    return [column for column in columns if column in IDENTITY_COLUMNS or column in hinted]
+
+
+def summarize(df):
+    """One line per column: numeric stats or the most common values"""
+    lines = []
+    for column in df.columns:
+        if column in IDENTITY_COLUMNS:
+            continue
+        series = df[column]
+        if pd.api.types.is_numeric_dtype(series):
+            lines.append(f"{column}: mean {series.mean():.2f}, min {series.min():g}, max {series.max():g}")
+        elif series.nunique(dropna=True) <= SUMMARY_MAX_CATEGORIES:
+            counts = series.value_counts()
+            counts = counts[counts > 0].head(5)  # categorical columns also count unused categories
+            lines.append(f"{column}: " + ", ".join(f"{value} {count}" for value, count in counts.items()))
+    return lines
+
+
+def naive_token_estimate(tables, sample_size=200):
+    """Tokens the old json.dumps(records, indent=2) prompt would have used, from a sample"""
+    total = 0
+    for _, df, _ in tables:
+        if not len(df):
+            continue
+        sample = df.head(sample_size).to_dict("records")
+        total += estimate_tokens(json.dumps(sample, indent=2, default=str)) * len(df) / len(sample)
+    return int(total)
+
+
+def build_context(user_query, tables, token_budget=1500, max_rows=40):
+    """Compact, budgeted data context for the interpreter prompt.
+
+    tables is a list of (label, DataFrame, scores) where scores (or None to
+    keep the given order) rank rows by relevance. Only query-relevant columns
+    are kept and rows are serialized as CSV. When more than max_rows match, an
+    aggregate summary over all matches leads the table and only the top rows
+    follow, within the overall token budget.
+    """
+    sections = []
+    used = 0
+    rows_included = 0
+
+    for label, df, scores in tables:
+        if not len(df):
+            continue
+        df = df[relevant_columns(user_query, df.columns)]
+        if scores is not None:
+            df = df.iloc[np.argsort(-np.asarray(scores), kind="stable")]
+
+        header = [f"[{label}] {len(df)} matching rows"]
+        if len(df) > max_rows:
+            header.append("Summary of all matches:")
+            header.extend(f"- {line}" for line in summarize(df))
+            header.append("Top rows by relevance:")
+        section = "\n".join(header)
+        used += estimate_tokens(section)
+
+        csv_lines = df.head(max_rows).to_csv(index=False).splitlines()
+        kept = [csv_lines[0]]
+        used += estimate_tokens(csv_lines[0])
+        for line in csv_lines[1:]:
+            cost = estimate_tokens(line) + 1
+            if used + cost > token_budget:
+                break
+            kept.append(line)
+            used += cost
+        rows_included += len(kept) - 1
+        sections.append(section + "\n" + "\n".join(kept))
+
+        if used >= token_budget:
+            break
+
+    text = "\n\n".join(sections)
+    return {
+        "text": text,
+        "rows_matched": sum(len(df) for _, df, _ in tables),
+        "rows_included": rows_included,
+        "tokens": estimate_tokens(text),
+        "naive_tokens": naive_token_estimate(tables),
+    }
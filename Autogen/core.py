@@ -0,0 +1,1383 @@
+"""Edutrack pipeline shared by the FastAPI server (api.py) and the Streamlit UI (Autogen.py).
+
+Importing this module only pulls in the standard library. Agents, datasets,
+caches and the log database are created by startup(), which runs on first
+use or from an app's startup hook; autogen, openai and pandas are imported
+there too, so a worker pays for them once it actually serves a request.
+"""
+import json
+import sqlite3
+from datetime import datetime
+import time
+import os
+import atexit
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import planning_output
+from llm_scheduler import LLMScheduler, PRIORITY_ANSWER, PRIORITY_BACKGROUND, PRIORITY_PLANNING
+from log_store import compact, encode_flow, init_db, search
+from singleflight import SingleFlight
+from tracing import Tracer
+
+# --- Tracing ---
+# Finished spans from every request, aggregated for the /metrics endpoint
+tracer = Tracer()
+TRACE_LOG = os.environ.get("EDUTRACK_TRACE_LOG", "1") == "1"  # store each request's spans with its log row
+
+
+# --- Request-scoped tracking ---
+class RequestContext:
+    """Flow log and metrics for one request, passed through the pipeline.
+
+    Each request gets its own context so concurrent requests never share
+    flow logs or metrics; the lock covers updates from planning threads.
+    """
+
+    def __init__(self):
+        self.agent_flow_log = []
+        self.session_agents = []
+        self.metrics = {}
+        self.plan = None  # preset by batch planning, otherwise set by hybrid_response
+        self.tables = None  # lookup results collected ahead of time for batch requests
+        self.session_id = None
+        self.memory = ""  # conversation summary and recent turns of the session, for answer prompts
+        self.trace = []  # finished spans, in completion order
+        self.started = time.perf_counter()
+        self.deadline = time.monotonic() + REQUEST_TIMEOUT  # LLM calls aren't started or retried past this
+        self.event_sink = None  # set by streaming endpoints to receive stage and token events
+        startup()
+        self.data = dataset_manager.current  # dataset snapshot used for the whole request
+        self.lock = threading.Lock()
+
+    def increment(self, key, amount=1):
+        with self.lock:
+            self.metrics[key] = self.metrics.get(key, 0) + amount
+
+    def emit(self, event, data):
+        if self.event_sink is not None:
+            self.event_sink(event, data)
+
+    def elapsed_ms(self):
+        return round((time.perf_counter() - self.started) * 1000, 1)
+
+    @contextmanager
+    def span(self, stage, agent, **attributes):
+        """Time a pipeline stage; yields the span dict so callers can add attributes or set status"""
+        record = {"stage": stage, "agent": agent, "start_ms": self.elapsed_ms(), "status": "ok", **attributes}
+        start = time.perf_counter()
+        try:
+            yield record
+        except Exception:
+            record["status"] = "error"
+            raise
+        finally:
+            record["duration_ms"] = round((time.perf_counter() - start) * 1000, 3)
+            self.add_span(record)
+
+    def add_span(self, record):
+        with self.lock:
+            self.trace.append(record)
+        tracer.record(record)
+
+
+def traced(stage, agent=None):
+    """Run a pipeline function taking ctx first inside a span.
+
+    Without `agent` the span is attributed to the agent passed right after ctx.
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(ctx, *args, **kwargs):
+            with ctx.span(stage, agent or getattr(args[0], 'name', 'unknown_agent')):
+                return func(ctx, *args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def log_agent_invocation(ctx, agent_name, action, details=""):
+    """Log agent invocations for flow tracking"""
+    timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
+    entry = {
+        "timestamp": timestamp,
+        "elapsed_ms": ctx.elapsed_ms(),
+        "agent": agent_name,
+        "action": action,
+        "details": details
+    }
+    with ctx.lock:
+        ctx.agent_flow_log.append(entry)
+        if agent_name not in ctx.session_agents:
+            ctx.session_agents.append(agent_name)
+    ctx.emit("stage", entry)
+
+
+def display_info(ctx):
+    """Display comprehensive information about agent invocations and communication flow"""
+    agent_flow_log = ctx.agent_flow_log
+    current_session_agents = ctx.session_agents
+    if not agent_flow_log:
+        return "No agent activity recorded for this session."
+
+    info_output = []
+    info_output.append("🤖 **AGENT FLOW ANALYSIS**")
+    info_output.append("=" * 50)
+
+    # Summary section
+    info_output.append(f"📊 **Session Summary:**")
+    info_output.append(f"   • Total Agents Invoked: {len(current_session_agents)}")
+    info_output.append(f"   • Active Agents: {', '.join(current_session_agents)}")
+    info_output.append(f"   • Total Communications: {len(agent_flow_log)}")
+    info_output.append("")
+
+    # Detailed flow
+    info_output.append("🔄 **Communication Flow:**")
+    for i, log_entry in enumerate(agent_flow_log, 1):
+        agent_emoji = {
+            "router": "🧭",
+            "planner": "🗺️",
+            "batch_planner": "🗺️",
+            "selector": "🎯",
+            "data_context": "📊",
+            "data_interpreter": "🔍",
+            "academic": "📚",
+            "career": "💼",
+            "welfare": "🏥",
+            "performance": "⚡",
+            "synthesizer": "🧩",
+            "memory": "🧠"
+        }.get(log_entry["agent"], "🤖")
+
+        info_output.append(f"   {i}. [{log_entry['timestamp']} +{log_entry['elapsed_ms']}ms] {agent_emoji} **{log_entry['agent'].upper()}**")
+        info_output.append(f"      Action: {log_entry['action']}")
+        if log_entry['details']:
+            info_output.append(f"      Details: {log_entry['details']}")
+        info_output.append("")
+
+    # Agent roles explanation
+    info_output.append("📋 **Agent Roles:**")
+    agent_descriptions = {
+        "router": "Determines query handling strategy (lookup/llm/both)",
+        "planner": "Plans mode, agents and datasets in a single call",
+        "batch_planner": "Plans a whole batch of questions in a single call",
+        "selector": "Selects appropriate specialized agents",
+        "data_context": "Identifies relevant datasets",
+        "data_interpreter": "Analyzes and interprets data",
+        "academic": "Handles academic performance queries",
+        "career": "Provides career guidance",
+        "welfare": "Manages well-being concerns",
+        "performance": "Focuses on performance improvement",
+        "synthesizer": "Merges parallel agent answers into one reply",
+        "memory": "Summarizes earlier turns of the conversation"
+    }
+
+    for agent in current_session_agents:
+        if agent in agent_descriptions:
+            info_output.append(f"   • **{agent}**: {agent_descriptions[agent]}")
+
+    return "\n".join(info_output)
+
+
+# --- LLM Configuration ---
+config = {
+    "base_url": os.environ.get("EDUTRACK_LLM_BASE_URL", "https://openrouter.ai/api/v1"),
+    "api_key": os.environ.get("EDUTRACK_LLM_API_KEY", "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"),  # Use your actual API key
+    "model": os.environ.get("EDUTRACK_LLM_MODEL", "deepseek/deepseek-r1-0528-qwen3-8b:free"),
+    "timeout": float(os.environ.get("EDUTRACK_LLM_TIMEOUT", "60")),  # seconds per HTTP call
+}
+
+# --- User Agent ---
+def make_user_proxy():
+    """Fresh user proxy per group chat so concurrent chats never share history"""
+    return UserProxyAgent(
+        name="user",
+        system_message="A human user seeking help with academics, career, welfare, or performance.",
+        code_execution_config=False,
+        human_input_mode="NEVER"
+    )
+
+# --- Agents ---
+# Created by startup(); the specialized agents come from agents.py
+SPECIALIZED_AGENTS = ["academic", "career", "welfare", "performance"]
+agents = {}
+router_agent = selector_agent = data_context_agent = planner_agent = batch_planner_agent = None
+synthesizer_agent = data_interpreter_agent = memory_agent = None
+agent_config = None
+
+# Bound by startup() so importing this module stays cheap
+AssistantAgent = ConversableAgent = UserProxyAgent = GroupChat = GroupChatManager = None
+pd = build_context = content_keywords = estimate_tokens = cache_key = normalize_text = negations = format_turns = None
+
+# --- Planning ---
+# 'concurrent' (default), 'combined' or 'sequential'; see plan_query
+PLANNING_MODE = os.environ.get("EDUTRACK_PLANNING_MODE", "concurrent")
+# Planning replies are small JSON objects: constrain them to a schema, cap their length (0 = no cap) and stop
+# at the first blank line. EDUTRACK_PLANNING_STRUCTURED=0 (providers without structured output) drops all
+# three: unconstrained, a reasoning model can spend the whole cap before it writes the JSON
+PLANNING_STRUCTURED = os.environ.get("EDUTRACK_PLANNING_STRUCTURED", "1") == "1"
+PLANNING_MAX_TOKENS = int(os.environ.get("EDUTRACK_PLANNING_MAX_TOKENS", "80"))  # per plan; batches get one per question
+PLANNING_STOP = ["\n\n"]
+planning_parse_failures = {}  # agent -> replies that could not be parsed
+planning_stats_lock = threading.Lock()
+
+# Requests run on a bounded worker pool; each may fan out up to three planning calls
+PIPELINE_WORKERS = int(os.environ.get("EDUTRACK_PIPELINE_WORKERS", "16"))
+pipeline_executor = ThreadPoolExecutor(max_workers=PIPELINE_WORKERS, thread_name_prefix="pipeline")
+planning_executor = ThreadPoolExecutor(max_workers=PIPELINE_WORKERS * 3, thread_name_prefix="planning")
+
+# --- Batch requests ---
+BATCH_PLAN_SIZE = int(os.environ.get("EDUTRACK_BATCH_PLAN_SIZE", "20"))  # questions per batch planning call
+BATCH_CONCURRENCY = int(os.environ.get("EDUTRACK_BATCH_CONCURRENCY", "4"))  # questions answered at once per batch
+BATCH_MAX_SIZE = int(os.environ.get("EDUTRACK_BATCH_MAX_SIZE", "200"))
+
+# --- Multi-agent answers ---
+# 'groupchat' (default) lets a manager pick speakers in turn; 'parallel' fans out and synthesizes once
+MULTI_AGENT_MODE = os.environ.get("EDUTRACK_MULTI_AGENT_MODE", "groupchat")
+agent_executor = ThreadPoolExecutor(max_workers=PIPELINE_WORKERS * len(SPECIALIZED_AGENTS),
+                                    thread_name_prefix="agents")
+
+# --- Data context ---
+# Approximate token budget and row cap for the data shown to the data interpreter
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("EDUTRACK_CONTEXT_TOKEN_BUDGET", "1500"))
+CONTEXT_MAX_ROWS = int(os.environ.get("EDUTRACK_CONTEXT_MAX_ROWS", "40"))
+
+# --- LLM scheduler ---
+# Every LLM call goes through one scheduler: request/token rate limits (0 = unlimited), priorities,
+# retries with jittered backoff and per-request deadlines; new requests get a 503 when its queue is full
+LLM_REQUESTS_PER_MINUTE = float(os.environ.get("EDUTRACK_LLM_RPM", "0"))
+LLM_TOKENS_PER_MINUTE = float(os.environ.get("EDUTRACK_LLM_TPM", "0"))
+LLM_MAX_CONCURRENCY = int(os.environ.get("EDUTRACK_LLM_MAX_CONCURRENCY", "32"))
+LLM_QUEUE_SIZE = int(os.environ.get("EDUTRACK_LLM_QUEUE_SIZE", "256"))
+MAX_ACTIVE_REQUESTS = int(os.environ.get("EDUTRACK_MAX_ACTIVE_REQUESTS", "64"))
+LLM_MAX_RETRIES = int(os.environ.get("EDUTRACK_LLM_MAX_RETRIES", "3"))
+REQUEST_TIMEOUT = float(os.environ.get("EDUTRACK_REQUEST_TIMEOUT", "120"))
+PLANNING_AGENTS = {"router", "selector", "data_context", "planner", "batch_planner"}
+GROUP_CHAT_CALLS = 15  # LLM requests per group chat (speaker selection + replies), as measured by bench_suite.py
+scheduler = None
+
+# --- Session memory ---
+# Sliding window of recent turns per session id, older turns folded into a summary; see session_memory.py
+SESSION_MAX = int(os.environ.get("EDUTRACK_SESSION_MAX", "1000"))
+SESSION_WINDOW_TURNS = int(os.environ.get("EDUTRACK_SESSION_WINDOW_TURNS", "6"))
+SESSION_TOKEN_THRESHOLD = int(os.environ.get("EDUTRACK_SESSION_TOKEN_THRESHOLD", "800"))
+SESSION_SUMMARY_TOKENS = int(os.environ.get("EDUTRACK_SESSION_SUMMARY_TOKENS", "300"))
+SESSION_IDLE_SECONDS = float(os.environ.get("EDUTRACK_SESSION_IDLE_SECONDS", "3600"))
+# Words that point back at a student named earlier in the conversation
+SESSION_REFERENTS = {"my", "me", "mine", "his", "her", "him", "their", "them", "same", "student"}
+sessions = None
+memory_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="memory")
+
+# --- Request coalescing ---
+# Concurrent identical queries share one pipeline run, and identical LLM calls share one completion;
+# set EDUTRACK_COALESCE=0 to run every request and call on its own (e.g. when benchmarking)
+COALESCE = os.environ.get("EDUTRACK_COALESCE", "1") == "1"
+request_flights = SingleFlight()
+llm_flights = SingleFlight()
+
+# --- Streaming ---
+# Agents whose long-form replies are streamed token by token on /ask/stream
+STREAMING_AGENTS = {"data_interpreter", "synthesizer", *SPECIALIZED_AGENTS}
+stream_client = agent_stream_client = None
+
+# --- Response cache ---
+# Replies keyed on (agent, system message, normalized messages); set EDUTRACK_CACHE_SIZE=0 to disable
+CACHE_SIZE = int(os.environ.get("EDUTRACK_CACHE_SIZE", "1024"))
+CACHE_TTL = float(os.environ.get("EDUTRACK_CACHE_TTL", "3600"))
+CACHE_DB = os.environ.get("EDUTRACK_CACHE_DB")  # e.g. llm_cache.db for on-disk persistence
+response_cache = None
+
+# --- Load Grounded Data ---
+# Each snapshot holds the frames plus their inverted keyword indexes, the
+# student store (all datasets joined by student_id) and the aggregate views.
+# Changed CSVs are picked up by polling or POST /datasets/reload and applied
+# incrementally; requests keep the snapshot they started with.
+DATA_DIR = os.environ.get("EDUTRACK_DATA_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "Datasets")
+DATASET_POLL_SECONDS = float(os.environ.get("EDUTRACK_DATASET_POLL_SECONDS", "5"))  # 0 disables watching
+# Set for multi-process serving (serve.py): all of the above is memory-mapped from this
+# directory and shared by every worker instead of built per process; see shared_datasets.py
+SHARED_DATA_DIR = os.environ.get("EDUTRACK_SHARED_DATA_DIR", "")
+dataset_manager = None
+
+
+def extract_content_from_response(response):
+    """Extract content from various response formats"""
+    if isinstance(response, dict):
+        return response.get("content") or response.get("message") or str(response)
+    elif isinstance(response, list) and response:
+        return response[-1].get("content") if isinstance(response[-1], dict) else str(response[-1])
+    return str(response)
+
+def stream_reply(ctx, agent, messages):
+    """Stream a completion for the agent, emitting token events; returns the full text"""
+    name = getattr(agent, 'name', 'unknown')
+    client, llm_config = (agent_stream_client, agent_config) if name in agents else (stream_client, config)
+    stream = client.chat.completions.create(
+        model=llm_config["model"],
+        messages=[{"role": "system", "content": agent.system_message}] + messages,
+        stream=True,
+    )
+    parts = []
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            delta = chunk.choices[0].delta.content
+            parts.append(delta)
+            ctx.emit("token", {"agent": name, "delta": delta})
+    return "".join(parts)
+
+
+def tracked_generate_reply(ctx, agent, messages):
+    """Wrap generate_reply in an LLM span, counting calls and serving repeats from the response cache.
+
+    Concurrent calls with the same agent and messages share one completion.
+    """
+    name = getattr(agent, 'name', 'unknown')
+    # Token counts are estimates (~4 characters per token); the pipeline doesn't see provider usage
+    prompt_tokens = estimate_tokens(agent.system_message) + sum(
+        estimate_tokens(str(message.get("content", ""))) for message in messages)
+    with ctx.span("llm", name, prompt_tokens=prompt_tokens) as span:
+        key = cache_key(agent, messages)
+        if response_cache is not None:
+            hit, reply = response_cache.get(key)
+            if hit:
+                span["status"] = "cache_hit"
+                ctx.increment("cache_hits")
+                if ctx.event_sink is not None and name in STREAMING_AGENTS:
+                    ctx.emit("token", {"agent": name, "delta": extract_content_from_response(reply)})
+                return reply
+            ctx.increment("cache_misses")
+
+        queued = time.perf_counter()
+
+        def call():
+            span["queued_ms"] = round((time.perf_counter() - queued) * 1000, 3)
+            if ctx.event_sink is not None and name in STREAMING_AGENTS:
+                return stream_reply(ctx, agent, messages)
+            # One-shot calls skip the termination/human-reply check: its per-sender auto-reply
+            # counter is shared by every request and would start prompting for input after 100 calls
+            return agent.generate_reply(messages, exclude=[ConversableAgent.check_termination_and_human_reply])
+
+        def scheduled_call():
+            ctx.increment("llm_calls")
+            priority = (PRIORITY_PLANNING if name in PLANNING_AGENTS else
+                        PRIORITY_BACKGROUND if name == "memory" else PRIORITY_ANSWER)
+            reply = scheduler.call(
+                call, priority,
+                prompt_tokens=prompt_tokens, deadline=ctx.deadline,
+                completion_tokens=lambda reply: estimate_tokens(extract_content_from_response(reply)) if reply else 0)
+            if response_cache is not None and reply is not None:
+                response_cache.put(key, reply)
+            return reply
+
+        reply, shared = llm_flights.do(key, scheduled_call) if COALESCE else (scheduled_call(), False)
+        if shared:
+            span["status"] = "coalesced"
+            ctx.increment("coalesced_llm_calls")
+            if ctx.event_sink is not None and name in STREAMING_AGENTS:
+                ctx.emit("token", {"agent": name, "delta": extract_content_from_response(reply)})
+            return reply
+        ctx.increment("llm_queue_ms", span["queued_ms"])
+        span["completion_tokens"] = estimate_tokens(extract_content_from_response(reply)) if reply is not None else 0
+        ctx.increment("prompt_tokens", prompt_tokens)
+        ctx.increment("completion_tokens", span["completion_tokens"])
+        if name in PLANNING_AGENTS:
+            ctx.increment("planning_completion_tokens", span["completion_tokens"])
+        return reply
+
+def record_parse_failure(ctx, agent_name):
+    """Count a planning reply that fell back to the keyword heuristics because it could not be parsed"""
+    ctx.increment("planning_parse_failures")
+    with planning_stats_lock:
+        planning_parse_failures[agent_name] = planning_parse_failures.get(agent_name, 0) + 1
+
+
+@traced("select_datasets", "data_context")
+def select_datasets(ctx, user_query):
+    """Ask the data context agent which datasets are relevant"""
+    # Log data context agent invocation
+    log_agent_invocation(ctx, "data_context", "Identifying relevant datasets", f"Query: {user_query[:50]}...")
+
+    try:
+        # Get relevant datasets
+        result = tracked_generate_reply(ctx, data_context_agent,[{"role": "user", "content": user_query}])
+        files = planning_output.parse_names(extract_content_from_response(result), "datasets")
+        log_agent_invocation(ctx, "data_context", "Dataset selection completed", f"Selected: {files}")
+    except Exception as e:
+        if isinstance(e, planning_output.PlanningParseError):
+            record_parse_failure(ctx, "data_context")
+        files = ["academic_data.csv"]  # Default fallback
+        log_agent_invocation(ctx, "data_context", "Dataset selection failed, using default", "Using academic_data.csv")
+    return files
+
+
+def search_datasets(ctx, user_query, files=None):
+    """Collect rows matching the query keywords from the selected datasets.
+
+    Returns a list of (dataset, matching rows, relevance scores) tables.
+    """
+    if files is None:
+        files = select_datasets(ctx, user_query)
+    return search_datasets_batch(ctx, [(user_query, files)])[0]
+
+
+def search_datasets_batch(ctx, requests):
+    """search_datasets for many (user_query, files) pairs, visiting each dataset once.
+
+    Each dataset's frame and index are fetched once and probed with the
+    keywords of every query that selected it; tables come back per query,
+    in that query's dataset order.
+    """
+    # Stopwords are dropped so words like "my" or "the" don't match whole datasets
+    keywords = [content_keywords(user_query) for user_query, _ in requests]
+    matches = [{} for _ in requests]
+    queries_by_file = {}
+    for i, (_, files) in enumerate(requests):
+        for file in files:
+            queries_by_file.setdefault(file, []).append(i)
+
+    for file, query_ids in queries_by_file.items():
+        if file not in ctx.data.datasets:
+            continue
+        df = ctx.data.datasets[file]
+        index = ctx.data.indexes[file]
+        for i in query_ids:
+            # Rows containing any query keyword, resolved via the inverted index
+            row_ids = index.lookup(keywords[i])
+            if len(row_ids):
+                matches[i][file] = (file, df.iloc[row_ids], index.score_rows(keywords[i], row_ids))
+
+    results = []
+    for (user_query, files), found in zip(requests, matches):
+        tables = [found[file] for file in files if file in found]
+        # If no specific matches, provide summary statistics for academic queries
+        if not tables and "academic" in user_query.lower():
+            for file in files:
+                if file in ctx.data.datasets and "gpa" in ctx.data.datasets[file].columns:
+                    summary = pd.DataFrame([{"summary": ctx.data.views.academic_overview()}])
+                    tables.append((file, summary, None))
+                    break
+        results.append(tables)
+    return results
+
+
+def direct_tables(ctx, user_query):
+    """Tables that need no keyword search: named students from the store, cohorts from the views"""
+    # Students named (or referenced by id) in the query resolve straight from the joined store
+    profiles = ctx.data.store.find_profiles(user_query)
+    if profiles:
+        log_agent_invocation(ctx, "data_context", "Student profile lookup",
+                             f"Matched {len(profiles)} student record(s)")
+        return [("student_profiles", pd.DataFrame(profiles), None)]
+    # Cohort and summary questions are answered from the precomputed views
+    tables = ctx.data.views.answer(user_query)
+    if tables:
+        log_agent_invocation(ctx, "data_context", "Aggregate view lookup",
+                             f"Answered from views: {[label for label, _, _ in tables]}")
+        return tables
+    # Follow-ups ("what about his attendance?") refer to the student named earlier in the session
+    if ctx.session_id is not None and SESSION_REFERENTS & set(user_query.lower().replace("?", " ").split()):
+        for question in reversed(sessions.recent_questions(ctx.session_id)):
+            profiles = ctx.data.store.find_profiles(question)
+            if profiles:
+                log_agent_invocation(ctx, "data_context", "Student profile lookup",
+                                     f"Matched {len(profiles)} student record(s) from the conversation")
+                return [("student_profiles", pd.DataFrame(profiles), None)]
+    return tables
+
+
+def with_conversation(ctx, prompt):
+    """Prefix an answer prompt with the session's summary and recent turns, if any"""
+    if not ctx.memory:
+        return prompt
+    return f"{ctx.memory}\n\nAnswer the student's latest message, using the conversation above for context.\n\n{prompt}"
+
+
+def summarize_session(summary, turns):
+    """Fold turns evicted from a session's window into its running summary (background, low priority)"""
+    ctx = RequestContext()
+    previous = f"Summary so far: {summary}\n\n" if summary else ""
+    prompt = f"{previous}New turns:\n{format_turns(turns)}\n\nUpdated summary:"
+    return extract_content_from_response(tracked_generate_reply(ctx, memory_agent, [{"role": "user", "content": prompt}]))
+
+
+@traced("lookup", "data_context")
+def lookup_from_data(ctx, user_query, files=None, tables=None):
+    """Enhanced data lookup with better filtering and interpretation.
+
+    `tables` skips collection when the matches were gathered ahead of time.
+    """
+    try:
+        if tables is None:
+            tables = direct_tables(ctx, user_query) or search_datasets(ctx, user_query, files)
+
+        if tables:
+            # Rank, project and serialize the matches within the prompt token budget
+            context = build_context(user_query, tables, CONTEXT_TOKEN_BUDGET, CONTEXT_MAX_ROWS)
+            ctx.metrics["context_tokens"] = context["tokens"]
+            ctx.metrics["prompt_tokens_saved"] = max(0, context["naive_tokens"] - context["tokens"])
+
+            # Log data interpreter invocation
+            log_agent_invocation(ctx, "data_interpreter", "Interpreting data",
+                                 f"Processing {context['rows_included']} of {context['rows_matched']} records "
+                                 f"(~{context['tokens']} tokens)")
+
+            # Use data interpreter to make sense of the data
+            interpretation_query = with_conversation(ctx, f"User asked: '{user_query}'\n\nRelevant data found:\n{context['text']}\n\nPlease provide insights and actionable advice based on this data.")
+
+            interpretation_result = tracked_generate_reply(ctx, data_interpreter_agent,[{"role": "user", "content": interpretation_query}])
+            log_agent_invocation(ctx, "data_interpreter", "Data interpretation completed",
+                                 "Generated insights and recommendations")
+            return extract_content_from_response(interpretation_result)
+
+        log_agent_invocation(ctx, "data_context", "No relevant data found", "No matching records in datasets")
+        return None
+    except Exception as e:
+        log_agent_invocation(ctx, "data_context", "Error occurred", f"Error: {str(e)}")
+        print(f"Data lookup error: {e}")
+        return None
+
+
+# --- DB Setup ---
+LOG_DB_PATH = "edutrack_logs.db"
+
+
+# One WAL-mode connection owned by a background thread; requests only enqueue rows.
+# Schema, full-text search and retention are in log_store.py
+LOG_QUEUE_SIZE = int(os.environ.get("EDUTRACK_LOG_QUEUE_SIZE", "10000"))
+# Rows older than this are rolled into daily aggregates (0 keeps everything)
+LOG_RETENTION_DAYS = int(os.environ.get("EDUTRACK_LOG_RETENTION_DAYS", "90"))
+LOG_COMPACT_INTERVAL = float(os.environ.get("EDUTRACK_LOG_COMPACT_INTERVAL", "3600"))
+log_writer = None
+
+# --- Fast-path classifier ---
+# Local model over the logged router/selector decisions; see fast_classifier.py
+FAST_PATH_THRESHOLD = float(os.environ.get("EDUTRACK_FAST_PATH_THRESHOLD", "0.85"))
+FAST_PATH_MODEL = os.environ.get("EDUTRACK_FAST_PATH_MODEL", "fast_classifier.npz")
+FAST_PATH_MIN_EXAMPLES = int(os.environ.get("EDUTRACK_FAST_PATH_MIN_EXAMPLES", "50"))  # 0 disables
+fast_classifier = None
+
+# --- Similar-question reuse ---
+NO_ANSWER_RESPONSE = "I couldn't find relevant information or generate a helpful response. Please rephrase your question."
+# Cosine similarity needed to return a stored answer / to reuse its mode and agent selection.
+# Answer reuse is opt-in (0 disables): trigram similarity can't tell "with" from "without"
+ANSWER_REUSE_THRESHOLD = float(os.environ.get("EDUTRACK_ANSWER_REUSE_THRESHOLD", "0"))
+PLAN_REUSE_THRESHOLD = float(os.environ.get("EDUTRACK_PLAN_REUSE_THRESHOLD", "0.8"))
+QUERY_INDEX_SIZE = int(os.environ.get("EDUTRACK_QUERY_INDEX_SIZE", "5000"))  # 0 disables reuse
+# Flow actions of error and fallback paths; answers produced through them are never indexed for reuse
+FALLBACK_ACTIONS = ("Response error", "Group chat failed", "Fallback to individual responses",
+                    "Synthesis failed, returning individual answers", "Error occurred", "Classification error",
+                    "Fallback classification used", "Selection error", "Fallback selection used",
+                    "Dataset selection failed, using default", "Planning failed, using keyword fallback")
+query_index = None
+
+
+def log_interaction(user_query, agent_response, agent_flow_log=None, trace=None):
+    # The flow is stored as compact entries; display_info() renders it for display only
+    flow = encode_flow(agent_flow_log) if agent_flow_log else None
+    trace_json = json.dumps(trace) if trace is not None and TRACE_LOG else None
+    if not log_writer.write(user_query, agent_response, flow, trace_json):
+        print("Warning: log queue full, interaction not logged")
+
+
+def keyword_classification(user_query):
+    """Keyword fallback for the router decision"""
+    if any(keyword in user_query.lower() for keyword in
+           ["what is my", "show me", "find", "gpa", "records", "data"]):
+        return "lookup"
+    elif any(
+            keyword in user_query.lower() for keyword in ["how to", "improve", "advice", "help me", "suggest"]):
+        return "llm"
+    return "both"
+
+
+def keyword_agent_selection(user_query):
+    """Keyword fallback for the selector decision"""
+    if any(keyword in user_query.lower() for keyword in ["academic", "study", "gpa", "course", "grade"]):
+        return ["academic"]
+    elif any(keyword in user_query.lower() for keyword in ["career", "job", "work", "professional"]):
+        return ["career"]
+    elif any(keyword in user_query.lower() for keyword in
+             ["stress", "mental", "health", "wellbeing", "welfare"]):
+        return ["welfare"]
+    elif any(keyword in user_query.lower() for keyword in ["performance", "improve", "productivity", "goal"]):
+        return ["performance"]
+    return ["academic"]  # Default
+
+
+@traced("classify", "router")
+def classify_query(ctx, user_query):
+    """Enhanced query classification"""
+    try:
+        log_agent_invocation(ctx, "router", "Classifying query", f"Analyzing: {user_query[:50]}...")
+
+        decision = tracked_generate_reply(ctx, router_agent, [{"role": "user", "content": user_query}])
+        try:
+            classification = planning_output.parse_mode(extract_content_from_response(decision))
+            log_agent_invocation(ctx, "router", "Classification completed", f"Result: {classification}")
+        except planning_output.PlanningParseError:
+            # Default logic based on keywords
+            record_parse_failure(ctx, "router")
+            classification = keyword_classification(user_query)
+            log_agent_invocation(ctx, "router", "Fallback classification used", f"Result: {classification}")
+
+        return classification
+    except Exception as e:
+        log_agent_invocation(ctx, "router", "Classification error", f"Error: {str(e)}")
+        print(f"Classification error: {e}")
+        return "llm"  # Default fallback
+
+
+@traced("select_agents", "selector")
+def select_agent_names(ctx, user_query):
+    """Ask the selector agent which specialized agents should respond"""
+    try:
+        log_agent_invocation(ctx, "selector", "Selecting agents", f"Analyzing query for agent selection")
+
+        result = tracked_generate_reply(ctx, selector_agent, [{"role": "user", "content": user_query}])
+        selector_response = extract_content_from_response(result)
+
+        try:
+            selected = planning_output.parse_names(selector_response, "agents")
+            log_agent_invocation(ctx, "selector", "Agent selection completed", f"Selected: {selected}")
+        except planning_output.PlanningParseError:
+            # Fallback logic based on keywords
+            record_parse_failure(ctx, "selector")
+            selected = keyword_agent_selection(user_query)
+            log_agent_invocation(ctx, "selector", "Fallback selection used", f"Selected: {selected}")
+
+        return [agent_name for agent_name in selected if agent_name in agents]
+    except Exception as e:
+        log_agent_invocation(ctx, "selector", "Selection error", f"Error: {str(e)}")
+        print(f"Routing error: {e}")
+        return ["academic"]  # Default fallback
+
+
+def route_to_agents(ctx, user_query):
+    """Enhanced agent routing"""
+    return [agents[agent_name] for agent_name in select_agent_names(ctx, user_query)]
+
+
+@traced("plan", "planner")
+def combined_plan(ctx, user_query):
+    """Single planning round-trip returning mode, agents and datasets together"""
+    log_agent_invocation(ctx, "planner", "Planning query", f"Analyzing: {user_query[:50]}...")
+    try:
+        result = tracked_generate_reply(ctx, planner_agent, [{"role": "user", "content": user_query}])
+        mode, selected, files = parse_plan(ctx, user_query,
+                                           planning_output.parse_plan(extract_content_from_response(result)))
+        log_agent_invocation(ctx, "planner", "Planning completed",
+                             f"Mode: {mode}, Agents: {selected}, Datasets: {files}")
+    except Exception as e:
+        if isinstance(e, planning_output.PlanningParseError):
+            record_parse_failure(ctx, "planner")
+        mode, selected, files = keyword_classification(user_query), [], []
+        log_agent_invocation(ctx, "planner", "Planning failed, using keyword fallback", f"Error: {str(e)}")
+
+    return {
+        "mode": mode,
+        "agents": selected or keyword_agent_selection(user_query),
+        "datasets": files or ["academic_data.csv"],
+    }
+
+
+def parse_plan(ctx, user_query, plan):
+    """Validated (mode, agents, datasets) from one planner JSON object"""
+    mode = str(plan.get("mode", "")).strip().lower()
+    if mode not in ["lookup", "llm", "both"]:
+        mode = keyword_classification(user_query)
+    selected = [name for name in plan.get("agents") or [] if name in agents]
+    files = [name for name in plan.get("datasets") or [] if name in ctx.data.datasets]
+    return mode, selected, files
+
+
+@traced("batch_planning", "batch_planner")
+def plan_batch(ctx, contexts, user_queries):
+    """Plan several questions with one batch_planner call per BATCH_PLAN_SIZE chunk.
+
+    Questions the reply doesn't cover (or a failed call) fall back to
+    plan_query on their own context. Each item's context gets its plan and
+    a 'Planning completed' flow entry, as combined planning would log.
+    """
+    plans = [None] * len(user_queries)
+    for offset in range(0, len(user_queries), BATCH_PLAN_SIZE):
+        chunk = user_queries[offset:offset + BATCH_PLAN_SIZE]
+        numbered = "\n".join(f"{i}. {user_query}" for i, user_query in enumerate(chunk, 1))
+        try:
+            result = tracked_generate_reply(ctx, batch_planner_agent, [{"role": "user", "content": numbered}])
+            decisions = planning_output.parse_batch_plan(extract_content_from_response(result))
+        except Exception as e:
+            if isinstance(e, planning_output.PlanningParseError):
+                record_parse_failure(ctx, "batch_planner")
+            print(f"Batch planning error: {e}")
+            decisions = []
+        for i, decision in enumerate(decisions[:len(chunk)]):
+            if not isinstance(decision, dict):
+                continue
+            item_ctx, user_query = contexts[offset + i], chunk[i]
+            mode, selected, files = parse_plan(item_ctx, user_query, decision)
+            log_agent_invocation(item_ctx, "planner", "Planning completed",
+                                 f"Mode: {mode}, Agents: {selected}, Datasets: {files} (batch of {len(user_queries)})")
+            plans[offset + i] = {
+                "mode": mode,
+                "agents": selected or keyword_agent_selection(user_query),
+                "datasets": files or ["academic_data.csv"],
+            }
+
+    for i, (item_ctx, user_query) in enumerate(zip(contexts, user_queries)):
+        if plans[i] is None:
+            plans[i] = plan_query(item_ctx, user_query)
+            continue
+        # Named students are served from the student store, so no dataset selection is needed
+        if item_ctx.data.store.find_positions(user_query):
+            plans[i]["datasets"] = None
+        item_ctx.metrics.update(planning_mode="batch", planning_calls=0)
+    return plans
+
+
+@traced("planning", "system")
+def plan_query(ctx, user_query, planning_mode=None):
+    """Decide mode, agents and datasets for a query.
+
+    'concurrent' issues the router, selector and data_context calls in parallel,
+    'combined' asks the planner agent for all three in one call, and 'sequential'
+    only makes the calls the router's decision needs, one after another.
+    """
+    planning_mode = planning_mode or PLANNING_MODE
+    start_time = time.time()
+    calls_before = ctx.metrics.get("llm_calls", 0)
+    # Named students are served from the student store, so no dataset selection is needed
+    needs_datasets = not ctx.data.store.find_positions(user_query)
+
+    # The local classifier decides mode and agents when confident; otherwise the LLMs do
+    prediction = fast_classifier.predict(user_query) if fast_classifier is not None else None
+    if prediction is not None:
+        ctx.metrics["fast_path_confidence"] = round(
+            min(prediction["mode_confidence"], prediction["agents_confidence"]), 3)
+
+    if prediction is not None and fast_classifier.is_confident(prediction):
+        planning_mode = "fast_path"
+        fast_classifier.record_decision()
+        log_agent_invocation(ctx, "router", "Fast-path classification",
+                             f"Result: {prediction['mode']} (confidence {prediction['mode_confidence']:.2f})")
+        log_agent_invocation(ctx, "selector", "Fast-path selection",
+                             f"Selected: {prediction['agents']} (confidence {prediction['agents_confidence']:.2f})")
+        plan = {"mode": prediction["mode"], "agents": prediction["agents"]}
+        if plan["mode"] in ["lookup", "both"] and needs_datasets:
+            plan["datasets"] = select_datasets(ctx, user_query)
+    elif planning_mode == "combined":
+        plan = combined_plan(ctx, user_query)
+    elif planning_mode == "concurrent":
+        futures = {
+            "mode": planning_executor.submit(classify_query, ctx, user_query),
+            "agents": planning_executor.submit(select_agent_names, ctx, user_query),
+        }
+        if needs_datasets:
+            futures["datasets"] = planning_executor.submit(select_datasets, ctx, user_query)
+        plan = {key: future.result() for key, future in futures.items()}
+    else:
+        plan = {"mode": classify_query(ctx, user_query)}
+        if plan["mode"] in ["lookup", "both"] and needs_datasets:
+            plan["datasets"] = select_datasets(ctx, user_query)
+        if plan["mode"] in ["llm", "both"]:
+            plan["agents"] = select_agent_names(ctx, user_query)
+
+    if not needs_datasets:
+        plan["datasets"] = None
+    plan.setdefault("datasets", None)
+    plan.setdefault("agents", [])
+    if prediction is not None and planning_mode != "fast_path":
+        fast_classifier.record_escalation(prediction, plan)
+
+    ctx.metrics["planning_mode"] = planning_mode
+    ctx.metrics["planning_calls"] = ctx.metrics.get("llm_calls", 0) - calls_before
+    ctx.metrics["planning_time"] = round(time.time() - start_time, 3)
+    return plan
+
+
+@traced("agent_response")
+def get_single_agent_response(ctx, agent, user_query, context_data=None):
+    """Enhanced single agent response with context"""
+    try:
+        agent_name = getattr(agent, 'name', 'unknown_agent')
+        log_agent_invocation(ctx, agent_name, "Generating response", "Single agent mode")
+
+        # Add context data if available
+        enhanced_query = user_query
+        if context_data:
+            enhanced_query = f"Context data: {context_data}\n\nUser query: {user_query}\n\nPlease provide advice considering both the context data and the user's question."
+        enhanced_query = with_conversation(ctx, enhanced_query)
+
+        response = tracked_generate_reply(ctx, agent, [{"role": "user", "content": enhanced_query}])
+        log_agent_invocation(ctx, agent_name, "Response completed", f"Generated response length: {len(str(response))} chars")
+        return extract_content_from_response(response)
+    except Exception as e:
+        agent_name = getattr(agent, 'name', 'unknown_agent')
+        log_agent_invocation(ctx, agent_name, "Response error", f"Error: {str(e)}")
+        return f"Error from {agent_name}: {e}"
+
+
+def fan_out_agent_responses(ctx, selected_agents, user_query, context_data=None):
+    """Query each agent concurrently with the same context; returns (name, reply) in input order"""
+    futures = [
+        agent_executor.submit(get_single_agent_response, ctx, agent, user_query, context_data)
+        for agent in selected_agents
+    ]
+    return [(getattr(agent, 'name', 'agent'), future.result()) for agent, future in zip(selected_agents, futures)]
+
+
+def format_agent_replies(replies):
+    return "\n\n".join([f"**{name}**: {reply}" for name, reply in replies])
+
+
+@traced("parallel_agents", "synthesizer")
+def get_parallel_agent_responses(ctx, selected_agents, user_query, context_data=None):
+    """Fan out to all selected agents at once, then merge their answers in one synthesis call"""
+    agent_names = [getattr(agent, 'name', 'unknown') for agent in selected_agents]
+    log_agent_invocation(ctx, "synthesizer", "Fanning out to agents", f"Agents: {agent_names}")
+    replies = fan_out_agent_responses(ctx, selected_agents, user_query, context_data)
+
+    try:
+        log_agent_invocation(ctx, "synthesizer", "Merging agent answers", f"{len(replies)} answers")
+        synthesis_query = f"User query: {user_query}\n\nAdvisor answers:\n\n{format_agent_replies(replies)}"
+        result = tracked_generate_reply(ctx, synthesizer_agent, [{"role": "user", "content": synthesis_query}])
+        merged = extract_content_from_response(result)
+        if merged and merged != "None":
+            log_agent_invocation(ctx, "synthesizer", "Synthesis completed", f"Merged length: {len(merged)} chars")
+            return merged
+        log_agent_invocation(ctx, "synthesizer", "Empty synthesis, returning individual answers")
+    except Exception as e:
+        log_agent_invocation(ctx, "synthesizer", "Synthesis failed, returning individual answers", f"Error: {str(e)}")
+    return format_agent_replies(replies)
+
+
+def forget_chat(agents, manager):
+    """Drop a finished group chat from the shared agents' per-peer state so their memory stays flat"""
+    for agent in agents:
+        for state in (agent._oai_messages, agent._consecutive_auto_reply_counter,
+                      agent._max_consecutive_auto_reply_dict, agent.reply_at_receive):
+            state.pop(manager, None)
+    manager.clear_history()
+
+
+@traced("group_chat", "group_chat")
+def get_multiple_agent_responses(ctx, selected_agents, user_query, context_data=None):
+    """Enhanced multiple agent responses"""
+    try:
+        agent_names = [getattr(agent, 'name', 'unknown') for agent in selected_agents]
+        log_agent_invocation(ctx, "group_chat", "Initiating group chat", f"Agents: {agent_names}")
+
+        # Prepare enhanced query with context
+        enhanced_query = user_query
+        if context_data:
+            enhanced_query = f"Context: {context_data}\n\nQuery: {user_query}"
+        enhanced_query = with_conversation(ctx, enhanced_query)
+
+        user = make_user_proxy()
+        group = GroupChat(
+            agents=[user] + selected_agents,
+            messages=[],
+            max_round=3,
+            speaker_selection_method="auto"
+        )
+        manager = GroupChatManager(groupchat=group, llm_config=config)
+        disable_client_retries(manager)
+        # The chat's calls happen inside autogen, so it takes one scheduler slot sized for the whole chat
+        try:
+            scheduler.call(lambda: user.initiate_chat(manager, message=enhanced_query, max_turns=3),
+                           PRIORITY_ANSWER, requests=GROUP_CHAT_CALLS, prompt_tokens=estimate_tokens(enhanced_query),
+                           deadline=ctx.deadline)
+        finally:
+            # The transcript stays in group.messages; the shared agents must not keep their copies
+            forget_chat(selected_agents, manager)
+
+        log_agent_invocation(ctx, "group_chat", "Group chat completed", f"Total messages: {len(group.messages)}")
+
+        messages = [msg for msg in group.messages if msg.get("role") == "assistant"]
+        if messages:
+            return "\n\n".join([f"**{msg.get('name', 'Assistant')}**: {msg['content']}" for msg in messages])
+        else:
+            log_agent_invocation(ctx, "group_chat", "Fallback to individual responses", "Group chat produced no messages")
+            # Fallback to individual responses
+            return format_agent_replies(fan_out_agent_responses(ctx, selected_agents, user_query, context_data))
+    except Exception as e:
+        log_agent_invocation(ctx, "group_chat", "Group chat failed", f"Error: {str(e)}")
+        print(f"Group chat failed: {e}")
+        # Fallback to individual responses
+        return format_agent_replies(fan_out_agent_responses(ctx, selected_agents, user_query, context_data))
+
+
+def finish_request(ctx):
+    """Stamp end time and total latency on the request's metrics and close the request span"""
+    ctx.metrics["end_time"] = time.time()
+    elapsed = ctx.metrics["end_time"] - ctx.metrics["start_time"]
+    ctx.metrics["total_time"] = round(elapsed, 3)
+    ctx.add_span({"stage": "request", "agent": "system", "start_ms": round(ctx.elapsed_ms() - elapsed * 1000, 1),
+                  "status": "reused" if "reused_answer" in ctx.metrics else
+                            "coalesced" if "coalesced" in ctx.metrics else "ok",
+                  "duration_ms": round(elapsed * 1000, 3)})
+
+
+def hybrid_response(user_query, planning_mode=None, ctx=None, multi_agent_mode=None):
+    """Answer a query, sharing the run of an identical query that is already in flight"""
+    if ctx is None:
+        ctx = RequestContext()
+    ctx.metrics["start_time"] = time.time()
+    for counter in ("llm_calls", "cache_hits", "cache_misses", "prompt_tokens", "completion_tokens", "llm_queue_ms",
+                    "coalesced_llm_calls"):
+        ctx.metrics.setdefault(counter, 0)
+
+    # Same normalized text, modes, dataset version and conversation means the same answer
+    key = (normalize_text(user_query), planning_mode or PLANNING_MODE, multi_agent_mode or MULTI_AGENT_MODE,
+           ctx.data.version, hash(ctx.memory))
+    def run():
+        return run_pipeline(ctx, user_query, planning_mode, multi_agent_mode)
+
+    response, shared = request_flights.do(key, run) if COALESCE else (run(), False)
+    if shared:
+        ctx.metrics["coalesced"] = True
+        log_agent_invocation(ctx, "system", "Coalesced with in-flight request",
+                             f"Shared the answer to: {user_query[:50]}")
+        if ctx.event_sink is not None:
+            ctx.emit("token", {"agent": "system", "delta": response})
+        finish_request(ctx)
+    return response
+
+
+def answer_reusable(ctx, user_query, match):
+    """Whether a near-duplicate's stored answer also answers user_query.
+
+    Similar wording isn't enough: the named students, cohort filters and
+    negations must be the same, and the answer must come from this data version.
+    """
+    other = match["query"]
+    return (match.get("version") == ctx.data.version
+            and negations(user_query) == negations(other)
+            and ctx.data.store.find_positions(user_query) == ctx.data.store.find_positions(other)
+            and set(ctx.data.views.match_filters(user_query)) == set(ctx.data.views.match_filters(other)))
+
+
+def run_pipeline(ctx, user_query, planning_mode=None, multi_agent_mode=None):
+    """Plan, look up and answer one query on its own context"""
+    log_agent_invocation(ctx, "system", "Query received", f"Processing: {user_query}")
+
+    # Near-duplicates of answered questions reuse the stored answer, or at least its plan
+    plan = ctx.plan
+    # Follow-ups in a conversation depend on what came before, so only stand-alone questions are matched
+    similarity, match = query_index.search(user_query) if query_index is not None and not ctx.memory else (0.0, None)
+    if match is not None:
+        if 0 < ANSWER_REUSE_THRESHOLD <= similarity and answer_reusable(ctx, user_query, match):
+            log_agent_invocation(ctx, "system", "Reused previous answer",
+                                 f"Similarity {similarity:.2f} to: {match['query'][:50]}")
+            ctx.metrics["reused_answer"] = round(similarity, 3)
+            finish_request(ctx)
+            return match["response"]
+        if plan is None and similarity >= PLAN_REUSE_THRESHOLD and match["plan"] is not None:
+            plan = match["plan"]
+            log_agent_invocation(ctx, "system", "Reused previous plan",
+                                 f"Similarity {similarity:.2f}, Mode: {plan['mode']}, Agents: {plan['agents']}")
+            ctx.metrics["reused_plan"] = round(similarity, 3)
+
+    if plan is None:
+        plan = plan_query(ctx, user_query, planning_mode)
+    ctx.plan = plan
+    mode = plan["mode"]
+
+    data_response = None
+    agent_response = None
+
+    if mode in ["lookup", "both"]:
+        data_response = lookup_from_data(ctx, user_query, plan["datasets"], ctx.tables)
+
+    if mode in ["llm", "both"]:
+        selected_agents = [agents[agent_name] for agent_name in plan["agents"]] or [agents["academic"]]
+        ctx.metrics["agents_invoked"] = len(selected_agents)
+        if len(selected_agents) == 1:
+            agent_response = get_single_agent_response(ctx, selected_agents[0], user_query, data_response)
+        elif selected_agents:
+            multi_agent_mode = multi_agent_mode or MULTI_AGENT_MODE
+            ctx.metrics["multi_agent_mode"] = multi_agent_mode
+            if multi_agent_mode == "parallel":
+                agent_response = get_parallel_agent_responses(ctx, selected_agents, user_query, data_response)
+            else:
+                agent_response = get_multiple_agent_responses(ctx, selected_agents, user_query, data_response)
+
+    finish_request(ctx)
+
+    log_agent_invocation(ctx, "system", "Response generation completed", f"Mode: {mode}")
+
+    if data_response and agent_response:
+        if mode == "both":
+            return f"**Data Insights:**\n{data_response}\n\n**Recommendations:**\n{agent_response}"
+        else:
+            return agent_response
+    elif data_response:
+        return data_response
+    elif agent_response:
+        return agent_response
+    else:
+        return NO_ANSWER_RESPONSE
+
+
+def search_logs(text, limit=20):
+    """Full-text search over logged questions and answers, newest first"""
+    startup()
+    conn = sqlite3.connect(LOG_DB_PATH)
+    try:
+        return search(conn, text, limit)
+    finally:
+        conn.close()
+
+
+def admit_request(weight=1):
+    """Fail fast with SchedulerOverloaded when the worker is saturated; pair with release_request"""
+    startup()
+    scheduler.admit(weight)
+
+
+def release_request(weight=1):
+    scheduler.release(weight)
+
+
+def metrics_text():
+    """Prometheus exposition: stage latency histograms, token counters, event counters and process gauges"""
+    gauges, counters = {}, {}
+    if log_writer is not None:
+        stats = log_writer.stats()
+        gauges["log_queue_depth"] = stats["queue_depth"]
+        counters["log_rows_dropped"] = stats["dropped"]
+    if response_cache is not None:
+        stats = response_cache.stats()
+        gauges.update(llm_cache_entries=stats["entries"], llm_cache_hit_rate=stats["hit_rate"])
+    if dataset_manager is not None:
+        gauges.update(dataset_version=dataset_manager.current.version,
+                      dataset_rows={name: len(df) for name, df in dataset_manager.current.datasets.items()})
+    counters.update(coalesced_requests=request_flights.stats()["coalesced"],
+                    coalesced_llm_calls=llm_flights.stats()["coalesced"])
+    if scheduler is not None:
+        stats = scheduler.stats()
+        gauges.update(llm_queue_depth=stats["queue_depth"], llm_in_flight=stats["in_flight"],
+                      active_requests=stats["active_requests"],
+                      llm_wait_p95_seconds=round(stats["wait_p95_ms"] / 1000, 4))
+        counters.update(llm_retries=stats["retries"], llm_rejected_requests=stats["rejected"],
+                        llm_deadline_exceeded=stats["deadline_exceeded"])
+    if sessions is not None:
+        stats = sessions.stats()
+        gauges.update(sessions=stats["sessions"], session_memory_tokens=stats["memory_tokens"])
+        counters.update(session_compactions=stats["compactions"], sessions_evicted=stats["evicted_sessions"])
+    if fast_classifier is not None:
+        gauges["fast_path_escalation_rate"] = fast_classifier.stats()["escalation_rate"]
+    with planning_stats_lock:
+        counters["planning_parse_failures"] = dict(planning_parse_failures)
+    return tracer.render(gauges, counters)
+
+
+def answer_query(user_query, planning_mode=None, multi_agent_mode=None, ctx=None, session_id=None):
+    """Run the pipeline for one request with its own context and log the interaction.
+
+    With a session_id, the session's summary and recent turns go into the
+    answer prompts and this turn is added to the session afterwards.
+    """
+    ctx = ctx or RequestContext()
+    if session_id:
+        ctx.session_id = session_id
+        ctx.memory = sessions.context(session_id)
+        ctx.metrics["session_memory_tokens"] = estimate_tokens(ctx.memory)
+    response = hybrid_response(user_query, planning_mode, ctx, multi_agent_mode)
+    if session_id:
+        sessions.add_turn(session_id, user_query, response)
+    flow_info = display_info(ctx)
+    log_interaction(user_query, response, ctx.agent_flow_log, ctx.trace)
+    ctx.metrics["log_queue_depth"] = log_writer.queue.qsize()
+    if fast_classifier is not None:
+        ctx.metrics["fast_path_escalation_rate"] = fast_classifier.stats()["escalation_rate"]
+    # Keep the similarity index in step with the log, skipping reused, coalesced, follow-up, empty and
+    # degraded answers: a transient LLM error must not become the answer to every similar question
+    degraded = any(entry["action"] in FALLBACK_ACTIONS for entry in ctx.agent_flow_log)
+    if (query_index is not None and "reused_answer" not in ctx.metrics and "coalesced" not in ctx.metrics
+            and not ctx.memory and not degraded and response != NO_ANSWER_RESPONSE):
+        query_index.add(user_query, response, ctx.plan, ctx.data.version)
+    return response, flow_info, ctx.metrics
+
+
+def answer_batch(user_queries, multi_agent_mode=None):
+    """Answer a list of questions, sharing work across the batch.
+
+    Questions that are equal after normalization run once. Planning takes one
+    batch_planner call per BATCH_PLAN_SIZE questions, keyword lookups visit
+    each dataset once for the whole batch, and the per-question agent calls
+    run at most BATCH_CONCURRENCY at a time. Returns (items, batch_metrics);
+    items are in input order, each with response, agent_flow, metrics and
+    duplicate_of (index of the first equal question, or None).
+    """
+    startup()
+    start_time = time.time()
+    first_index = {}
+    for i, user_query in enumerate(user_queries):
+        first_index.setdefault(normalize_text(user_query), i)
+    unique = list(first_index.values())
+    questions = [user_queries[i] for i in unique]
+
+    batch_ctx = RequestContext()
+    contexts = []
+    for _ in questions:
+        item_ctx = RequestContext()
+        item_ctx.data = batch_ctx.data  # one snapshot for the whole batch
+        contexts.append(item_ctx)
+    plans = plan_batch(batch_ctx, contexts, questions)
+
+    pending = []
+    for item_ctx, user_query, plan in zip(contexts, questions, plans):
+        item_ctx.plan = plan
+        if plan["mode"] in ["lookup", "both"]:
+            item_ctx.tables = direct_tables(item_ctx, user_query)
+            if not item_ctx.tables and plan["datasets"] is not None:
+                pending.append((item_ctx, user_query, plan["datasets"]))
+    if pending:
+        found = search_datasets_batch(batch_ctx, [(user_query, files) for _, user_query, files in pending])
+        for (item_ctx, _, _), tables in zip(pending, found):
+            item_ctx.tables = tables
+
+    with ThreadPoolExecutor(max_workers=max(1, min(BATCH_CONCURRENCY, len(questions))),
+                            thread_name_prefix="batch") as pool:
+        futures = [pool.submit(answer_query, user_query, None, multi_agent_mode, item_ctx)
+                   for user_query, item_ctx in zip(questions, contexts)]
+        answers = dict(zip(unique, [future.result() for future in futures]))
+
+    items = []
+    for i, user_query in enumerate(user_queries):
+        first = first_index[normalize_text(user_query)]
+        response, flow_info, metrics = answers[first]
+        items.append({"message": user_query, "response": response, "agent_flow": flow_info, "metrics": metrics,
+                      "duplicate_of": first if first != i else None})
+    planning_calls = batch_ctx.metrics.get("llm_calls", 0)
+    batch_metrics = {
+        "questions": len(user_queries),
+        "unique_questions": len(questions),
+        "batch_planning_calls": planning_calls,
+        "llm_calls": planning_calls + sum(answers[i][2].get("llm_calls", 0) for i in unique),
+        "total_time": round(time.time() - start_time, 3),
+    }
+    return items, batch_metrics
+
+
+# --- Startup ---
+_startup_lock = threading.Lock()
+_started = False
+
+
+def _create_agents():
+    global AssistantAgent, ConversableAgent, UserProxyAgent, GroupChat, GroupChatManager, agent_config
+    global agents, router_agent, selector_agent, data_context_agent, planner_agent, batch_planner_agent
+    global synthesizer_agent, data_interpreter_agent, memory_agent
+    from autogen import AssistantAgent, ConversableAgent, UserProxyAgent, GroupChat, GroupChatManager
+    from agents import academic, career, welfare, performance, config as agent_config
+    from dataset_manager import DATASET_FILES
+
+    agents = {
+        "academic": academic,
+        "career": career,
+        "welfare": welfare,
+        "performance": performance,
+    }
+
+    # --- Router & Selector Agents ---
+    router_agent = AssistantAgent(
+        name="router",
+        system_message=(
+            "You are a smart router agent. Analyze the user's question and decide how to handle it.\n"
+            "Categories:\n"
+            "- 'lookup': If the question asks for specific data like GPA, student records, performance metrics, or factual information from databases\n"
+            "- 'llm': If the question asks for advice, recommendations, explanations, or guidance\n"
+            "- 'both': If the question needs both data lookup AND reasoning/advice\n"
+            "Reply with ONLY a JSON object, e.g. {\"mode\": \"lookup\"}"
+        ),
+        llm_config=planning_config(planning_output.mode_schema())
+    )
+
+    selector_agent = AssistantAgent(
+        name="selector",
+        system_message=(
+            "You are an agent selector. Based on the user query, determine which specialized agents should respond.\n"
+            "Available agents:\n"
+            "- 'academic': For academic performance, GPA, courses, study strategies\n"
+            "- 'career': For career guidance, job prospects, professional development\n"
+            "- 'welfare': For mental health, well-being, stress management\n"
+            "- 'performance': For performance improvement, productivity, goal setting\n"
+            "Reply with ONLY a JSON object, e.g. {\"agents\": [\"academic\", \"performance\"]}"
+        ),
+        llm_config=planning_config(planning_output.agents_schema(SPECIALIZED_AGENTS))
+    )
+
+    data_context_agent = AssistantAgent(
+        name="data_context",
+        system_message=(
+            "You identify which datasets are relevant for a user query.\n"
+            "Available datasets:\n"
+            "- 'academic_data.csv': Student academic records, GPA, courses, warnings\n"
+            "- 'performance_data.csv': Performance metrics and evaluations\n"
+            "- 'welfare_data.csv': Well-being and health data\n"
+            "- 'career_data.csv': Career-related information\n"
+            "Reply with ONLY a JSON object, e.g. {\"datasets\": [\"academic_data.csv\"]}"
+        ),
+        llm_config=planning_config(planning_output.datasets_schema(DATASET_FILES))
+    )
+
+    # Combined planner: mode, agents and datasets in one round-trip
+    planner_agent = AssistantAgent(
+        name="planner",
+        system_message=(
+            "You plan how to answer a student's question.\n"
+            "Decide:\n"
+            "- mode: 'lookup' for specific data (GPA, records, metrics), 'llm' for advice or guidance, "
+            "'both' if it needs data and advice\n"
+            "- agents: any of 'academic', 'career', 'welfare', 'performance'\n"
+            "- datasets: any of 'academic_data.csv', 'performance_data.csv', 'welfare_data.csv', 'career_data.csv'\n"
+            "Reply with ONLY a JSON object, e.g. "
+            "{\"mode\": \"both\", \"agents\": [\"academic\"], \"datasets\": [\"academic_data.csv\"]}"
+        ),
+        llm_config=planning_config(planning_output.plan_schema(SPECIALIZED_AGENTS, DATASET_FILES))
+    )
+
+    batch_planner_agent = AssistantAgent(
+        name="batch_planner",
+        system_message=(
+            "You plan how to answer a numbered list of student questions.\n"
+            "For each question decide:\n"
+            "- mode: 'lookup' for specific data (GPA, records, metrics), 'llm' for advice or guidance, "
+            "'both' if it needs data and advice\n"
+            "- agents: any of 'academic', 'career', 'welfare', 'performance'\n"
+            "- datasets: any of 'academic_data.csv', 'performance_data.csv', 'welfare_data.csv', 'career_data.csv'\n"
+            "Reply with ONLY a JSON object whose plans array holds one object per question, in the same order, e.g. "
+            "{\"plans\": [{\"mode\": \"both\", \"agents\": [\"academic\"], \"datasets\": [\"academic_data.csv\"]}, "
+            "{\"mode\": \"llm\", \"agents\": [\"career\"], \"datasets\": []}]}"
+        ),
+        llm_config=planning_config(planning_output.batch_plan_schema(SPECIALIZED_AGENTS, DATASET_FILES),
+                                   PLANNING_MAX_TOKENS * BATCH_PLAN_SIZE)
+    )
+
+    synthesizer_agent = AssistantAgent(
+        name="synthesizer",
+        system_message=(
+            "You merge answers from several student advisors (academic, career, welfare, performance) "
+            "into one coherent reply.\n"
+            "Keep every concrete recommendation, remove repetition, and resolve contradictions.\n"
+            "Be concise and do not add new advice."
+        ),
+        llm_config=config
+    )
+
+    # Data interpretation agent
+    data_interpreter_agent = AssistantAgent(
+        name="data_interpreter",
+        system_message=(
+            "You are a data interpretation specialist. Your job is to:\n"
+            "1. Analyze the provided data records\n"
+            "2. Extract meaningful insights relevant to the user's query\n"
+            "3. Present the information in a clear, helpful format\n"
+            "4. Identify patterns, trends, or specific answers to the user's question\n"
+            "Always provide actionable insights based on the data."
+        ),
+        llm_config=config
+    )
+
+    # Summarizes turns that slide out of a session's window
+    memory_agent = AssistantAgent(
+        name="memory",
+        system_message=(
+            "You maintain a running summary of a conversation between a student and the Edutrack advisors.\n"
+            "Merge the new turns into the summary. Keep names, student IDs, courses, figures and advice "
+            "already given; drop greetings and repetition.\n"
+            "Reply with the updated summary only, in at most 150 words."
+        ),
+        llm_config=config
+    )
+
+    for agent in [*agents.values(), router_agent, selector_agent, data_context_agent, planner_agent,
+                  batch_planner_agent, synthesizer_agent, data_interpreter_agent, memory_agent]:
+        disable_client_retries(agent)
+
+
+def planning_config(schema, max_tokens=None):
+    """LLM config for a planning agent: replies constrained to schema and capped at max_tokens, when structured"""
+    llm_config = dict(config)
+    if not PLANNING_STRUCTURED:
+        return llm_config
+    llm_config["response_format"] = schema
+    # autogen's config schema has no `stop`; extra_body puts it in the request as is
+    llm_config["extra_body"] = {"stop": PLANNING_STOP}
+    max_tokens = PLANNING_MAX_TOKENS if max_tokens is None else max_tokens
+    if max_tokens > 0:
+        llm_config["max_tokens"] = max_tokens
+    return llm_config
+
+
+def disable_client_retries(agent):
+    """Leave retries to the scheduler; autogen's config schema rejects max_retries, so set it on the clients"""
+    for client in getattr(getattr(agent, "client", None), "_clients", None) or []:
+        if hasattr(client, "_oai_client"):
+            client._oai_client.max_retries = 0
+
+
+def startup():
+    """Create agents, clients, caches, datasets and the log DB once; safe to call from any thread"""
+    global _started, pd, build_context, content_keywords, estimate_tokens, cache_key, normalize_text, negations
+    global format_turns
+    global stream_client, agent_stream_client
+    global response_cache, scheduler, dataset_manager, log_writer, fast_classifier, query_index, sessions
+    if _started:
+        return
+    with _startup_lock:
+        if _started:
+            return
+        import pandas as pd
+        from openai import OpenAI
+        from context_builder import build_context, content_keywords, estimate_tokens
+        from dataset_manager import DatasetManager
+        from fast_classifier import FastClassifier, load_examples
+        from llm_cache import ResponseCache, cache_key, normalize_text
+        from log_writer import LogWriter
+        from session_memory import SessionStore, format_turns
+        from similarity_index import QueryIndex, negations
+
+        _create_agents()
+        stream_client = OpenAI(base_url=config["base_url"], api_key=config["api_key"],
+                               timeout=config["timeout"], max_retries=0)
+        agent_stream_client = OpenAI(base_url=agent_config["base_url"], api_key=agent_config["api_key"],
+                                     timeout=agent_config["timeout"], max_retries=0)
+        scheduler = LLMScheduler(LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE, LLM_MAX_CONCURRENCY,
+                                 LLM_QUEUE_SIZE, MAX_ACTIVE_REQUESTS, LLM_MAX_RETRIES)
+        response_cache = ResponseCache(CACHE_SIZE, CACHE_TTL, CACHE_DB) if CACHE_SIZE > 0 else None
+        sessions = SessionStore(SESSION_MAX, SESSION_WINDOW_TURNS, SESSION_TOKEN_THRESHOLD, SESSION_SUMMARY_TOKENS,
+                                idle_seconds=SESSION_IDLE_SECONDS, summarize=summarize_session,
+                                executor=memory_executor)
+
+        dataset_manager = DatasetManager(DATA_DIR, poll_interval=DATASET_POLL_SECONDS,
+                                         shared_dir=SHARED_DATA_DIR or None).load().start_watching()
+
+        retention = (lambda conn: compact(conn, LOG_RETENTION_DAYS)) if LOG_RETENTION_DAYS > 0 else None
+        log_writer = LogWriter(LOG_DB_PATH, init_db=init_db, max_queue=LOG_QUEUE_SIZE, maintenance=retention,
+                               maintenance_interval=LOG_COMPACT_INTERVAL).start()
+        atexit.register(log_writer.close)
+
+        if FAST_PATH_MIN_EXAMPLES > 0:
+            if os.path.exists(FAST_PATH_MODEL):
+                fast_classifier = FastClassifier.load(FAST_PATH_MODEL, threshold=FAST_PATH_THRESHOLD)
+            else:
+                training_examples = load_examples(LOG_DB_PATH)
+                if len(training_examples) >= FAST_PATH_MIN_EXAMPLES:
+                    fast_classifier = FastClassifier(threshold=FAST_PATH_THRESHOLD).train(training_examples)
+
+        query_index = QueryIndex(max_entries=QUERY_INDEX_SIZE) if QUERY_INDEX_SIZE > 0 else None
+        if query_index is not None:
+            query_index.load_from_db(LOG_DB_PATH, skip_responses=(NO_ANSWER_RESPONSE,),
+                                     skip_actions=FALLBACK_ACTIONS)
+        _started = True
+
+
+def shutdown():
+    """Stop the dataset watcher and flush queued log rows"""
+    if dataset_manager is not None:
+        dataset_manager.stop()
+    if log_writer is not None:
+        log_writer.close()
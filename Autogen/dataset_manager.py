@@ -0,0 +1,260 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from aggregates import AggregateViews
+from search_index import InvertedIndex
+from student_store import StudentStore
+
+# Dataset name used throughout the pipeline -> CSV file name
+DATASET_FILES = {
+    "academic_data.csv": "clean_academic_data.csv",
+    "performance_data.csv": "performance_data_consistent.csv",
+    "welfare_data.csv": "welfare_data_consistent.csv",
+    "career_data.csv": "career_data_consistent.csv",
+}
+# The bundled CSVs, found relative to this file rather than the working directory
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Datasets")
+
+
+class DatasetSnapshot:
+    """One consistent version of the frames and the structures derived from them"""
+
+    def __init__(self, version, datasets, indexes, store, views):
+        self.version = version
+        self.datasets = datasets
+        self.indexes = indexes
+        self.store = store
+        self.views = views
+
+
+def diff_frames(old, new, key="student_id"):
+    """Positions of changed, removed and added rows between two versions of a dataset.
+
+    Returns (changed, removed, common_new, added): changed and removed are
+    sorted positions in old, common_new the new positions of every surviving
+    old row (in old order) and added the new positions of unseen keys.
+    """
+    old_ids = pd.Index(old[key])
+    new_ids = pd.Index(new[key])
+    new_positions = new_ids.get_indexer(old_ids)
+    removed = np.flatnonzero(new_positions < 0)
+    common_old = np.flatnonzero(new_positions >= 0)
+    common_new = new_positions[common_old]
+
+    before = old.iloc[common_old].reset_index(drop=True)
+    after = new.iloc[common_new][list(old.columns)].reset_index(drop=True)
+    # Only rows with an unequal cell need the NaN == NaN recheck
+    candidates = np.flatnonzero(~(before == after).all(axis=1).to_numpy())
+    before, after = before.iloc[candidates], after.iloc[candidates]
+    same = (before == after) | (before.isna() & after.isna())
+    changed = common_old[candidates[~same.all(axis=1).to_numpy()]]
+    added = np.flatnonzero(~new_ids.isin(old_ids))
+    return changed, removed, common_new, added
+
+
+def swap_remove_layout(old_size, removed, common_new, added):
+    """Row layout for the new frame that keeps every unchanged row at its old position.
+
+    Removed rows leave holes that are filled with added rows first, then with
+    rows moved in from the tail. Returns (sources, stale, fresh): the new-file
+    position for each row of the merged frame, old positions whose rows left
+    their slot (removed or moved) and merged positions holding a row new to
+    its slot (added or moved).
+    """
+    new_size = old_size - len(removed) + len(added)
+    sources = np.full(max(old_size, new_size), -1, dtype=np.int64)
+    surviving = np.ones(old_size, dtype=bool)
+    surviving[removed] = False
+    sources[np.flatnonzero(surviving)] = common_new
+
+    holes = removed[removed < new_size]
+    tail = np.flatnonzero(surviving[new_size:]) + new_size
+    filled_by_added = min(len(holes), len(added))
+    sources[holes[:filled_by_added]] = added[:filled_by_added]
+    sources[holes[filled_by_added:]] = sources[tail]
+    sources[old_size:new_size] = added[filled_by_added:]
+
+    stale = np.concatenate([removed, tail])
+    fresh = np.concatenate([holes, np.arange(old_size, new_size)])
+    return sources[:new_size], stale, fresh
+
+
+class DatasetManager:
+    """Loads the CSV datasets and hot-reloads them without a restart.
+
+    A reload reads the new file, diffs it against the current frame by
+    student_id and applies only the changed, added and removed rows to the
+    keyword index, the joined student store and the aggregate views. The new
+    versions are published as a fresh DatasetSnapshot in a single reference
+    swap, so a request that took a snapshot keeps reading the version it
+    started with; that includes the aggregate views, which are copied on write
+    and share every untouched group with the previous version.
+
+    With shared_dir set, datasets and everything derived from them are
+    memory-mapped from a cache built once by shared_datasets.build() and
+    shared by every process using that directory; a changed file then
+    builds and attaches a new cache version instead of an incremental update.
+    """
+
+    def __init__(self, data_dir=DEFAULT_DATA_DIR, files=None, poll_interval=0.0, shared_dir=None):
+        self.data_dir = data_dir
+        self.files = dict(files or DATASET_FILES)
+        self.poll_interval = poll_interval
+        self.shared_dir = shared_dir
+        self.current = DatasetSnapshot(0, {}, {}, StudentStore({}), AggregateViews({}))
+        self.reload_lock = threading.Lock()
+        self.signatures = {}
+        self.history = []
+        self.watcher = None
+        self.stopping = threading.Event()
+
+    def path(self, name):
+        return os.path.join(self.data_dir, self.files[name])
+
+    def _signature(self, name):
+        try:
+            stat = os.stat(self.path(name))
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def load(self):
+        """Full load of every dataset; missing files are skipped with a warning"""
+        if self.shared_dir:
+            self.current = self._shared_snapshot(self.current.version + 1)
+            return self
+        datasets = {}
+        for name in self.files:
+            try:
+                datasets[name] = pd.read_csv(self.path(name))
+                self.signatures[name] = self._signature(name)
+            except (FileNotFoundError, pd.errors.ParserError, pd.errors.EmptyDataError) as e:
+                print(f"Warning: Could not load some datasets: {e}")
+        self.current = self._full_snapshot(datasets, self.current.version + 1)
+        return self
+
+    def _shared_snapshot(self, version):
+        # Imported here so the default mode doesn't need pyarrow
+        import shared_datasets
+        for name in self.files:
+            self.signatures[name] = self._signature(name)
+        directory = shared_datasets.build({name: self.path(name) for name in self.files}, self.shared_dir)
+        return DatasetSnapshot(version, *shared_datasets.attach(directory))
+
+    def _full_snapshot(self, datasets, version):
+        indexes = {name: InvertedIndex(df) for name, df in datasets.items()}
+        return DatasetSnapshot(version, datasets, indexes, StudentStore(datasets), AggregateViews(datasets))
+
+    def reload(self, names=None, force=False):
+        """Reload changed files (or `names`); returns per-dataset change counts and timings"""
+        results = {}
+        with self.reload_lock:
+            if self.shared_dir:
+                return self._reload_shared(names, force)
+            for name in names or list(self.files):
+                if name not in self.files:
+                    results[name] = {"error": "unknown dataset"}
+                    continue
+                signature = self._signature(name)
+                if not force and signature is not None and signature == self.signatures.get(name):
+                    continue
+                start = time.perf_counter()
+                try:
+                    new = pd.read_csv(self.path(name))
+                    result = self._apply(name, new)
+                except (FileNotFoundError, pd.errors.ParserError, pd.errors.EmptyDataError, KeyError) as e:
+                    print(f"Warning: Could not reload {name}: {e}")
+                    # Remember the broken version so the watcher doesn't retry it every poll
+                    self.signatures[name] = signature
+                    results[name] = {"error": str(e)}
+                    continue
+                self.signatures[name] = signature
+                result["seconds"] = round(time.perf_counter() - start, 4)
+                result["version"] = self.current.version
+                results[name] = result
+                self.history = (self.history + [dict(result, dataset=name)])[-20:]
+        return results
+
+    def _reload_shared(self, names, force):
+        names = [name for name in names or list(self.files)
+                 if name in self.files and (force or self._signature(name) != self.signatures.get(name))]
+        if not names:
+            return {}
+        start = time.perf_counter()
+        try:
+            snapshot = self._shared_snapshot(self.current.version + 1)
+        except Exception as e:  # a failed build must not stop the watcher; keep serving the current version
+            print(f"Warning: Could not reload shared datasets: {e}")
+            return {name: {"error": str(e)} for name in names}
+        self.current = snapshot
+        seconds = round(time.perf_counter() - start, 4)
+        results = {name: {"mode": "shared", "rows": len(snapshot.datasets.get(name, ())), "seconds": seconds,
+                          "version": snapshot.version} for name in names}
+        self.history = (self.history + [dict(result, dataset=name) for name, result in results.items()])[-20:]
+        return results
+
+    def _apply(self, name, new):
+        snapshot = self.current
+        old = snapshot.datasets.get(name)
+        datasets = dict(snapshot.datasets)
+
+        # Unknown datasets, schema changes and duplicate ids fall back to a full rebuild
+        if (old is None or list(new.columns) != list(old.columns) or "student_id" not in new.columns
+                or new["student_id"].duplicated().any()):
+            datasets[name] = new
+            self.current = self._full_snapshot(datasets, snapshot.version + 1)
+            return {"mode": "full", "rows": len(new)}
+
+        changed, removed, common_new, added = diff_frames(old, new)
+        if not len(changed) and not len(removed) and not len(added):
+            return {"mode": "unchanged", "rows": len(new)}
+
+        sources, stale, fresh = swap_remove_layout(len(old), removed, common_new, added)
+        merged = new.iloc[sources].reset_index(drop=True)
+        fresh = np.union1d(changed[changed < len(merged)], fresh)
+        rows = merged.iloc[fresh]
+        removed_ids = old["student_id"].to_numpy()[removed]
+
+        indexes = dict(snapshot.indexes)
+        indexes[name] = snapshot.indexes[name].with_changes(old, np.union1d(changed, stale), merged, fresh)
+        store = snapshot.store.with_changes(name, rows, removed_ids)
+        datasets[name] = merged
+
+        views = snapshot.views.with_changes(name, rows, removed_ids)
+        self.current = DatasetSnapshot(snapshot.version + 1, datasets, indexes, store, views)
+        return {"mode": "incremental", "rows": len(merged), "changed": len(changed),
+                "added": len(added), "removed": len(removed)}
+
+    # --- File watching ---
+    def start_watching(self):
+        if self.poll_interval <= 0 or self.watcher is not None:
+            return self
+        self.watcher = threading.Thread(target=self._watch, name="dataset-watcher", daemon=True)
+        self.watcher.start()
+        return self
+
+    def _watch(self):
+        while not self.stopping.wait(self.poll_interval):
+            changed = [name for name in self.files if self._signature(name) != self.signatures.get(name)]
+            if changed:
+                self.reload(changed)
+
+    def stop(self):
+        self.stopping.set()
+        if self.watcher is not None:
+            self.watcher.join()
+            self.watcher = None
+
+    def stats(self):
+        snapshot = self.current
+        return {
+            "version": snapshot.version,
+            "rows": {name: len(df) for name, df in snapshot.datasets.items()},
+            "watching": self.watcher is not None,
+            "shared": bool(self.shared_dir),
+            "recent_reloads": list(self.history),
+        }
@@ -0,0 +1,250 @@
+"""Local fast-path classifier for the router and selector decisions.
+
+Hashed word uni/bigram features feed two small linear models: a softmax over
+lookup/llm/both and one logistic output per specialized agent. Both are
+trained from the LLM decisions recorded in the `flow` column of the logs
+table (or the rendered `agent_flow` text of older rows), so predictions need
+no network and take microseconds.
+
+Usage: python fast_classifier.py [--db edutrack_logs.db] [--out fast_classifier.npz]
+"""
+import argparse
+import ast
+import random
+import re
+import sqlite3
+import threading
+import zlib
+
+import numpy as np
+
+from log_store import decode_flow, flow_decisions
+from search_index import tokenize
+
+MODES = ["lookup", "llm", "both"]
+AGENTS = ["academic", "career", "welfare", "performance"]
+
+# LLM decisions as rendered by display_info() in rows logged before the `flow` column;
+# fallbacks and fast-path decisions are not labels
+ROUTER_PATTERN = re.compile(r"\*\*ROUTER\*\*\s+Action: Classification completed\s+Details: Result: (\w+)")
+SELECTOR_PATTERN = re.compile(r"\*\*SELECTOR\*\*\s+Action: Agent selection completed\s+Details: Selected: (\[[^\]]*\])")
+PLANNER_PATTERN = re.compile(
+    r"\*\*PLANNER\*\*\s+Action: Planning completed\s+Details: Mode: (\w+), Agents: (\[[^\]]*\])"
+)
+
+
+def parse_flow_labels(agent_flow, flow=None):
+    """Extract (mode, agents) decided by the LLM from a logged flow; either may be None.
+
+    `flow` is the structured column; agent_flow is the rendered text older rows have instead.
+    """
+    selected = None
+    if flow:
+        mode, agents_text = flow_decisions(decode_flow(flow))
+    else:
+        text = agent_flow or ""
+        router = ROUTER_PATTERN.search(text)
+        selector = SELECTOR_PATTERN.search(text)
+        planner = PLANNER_PATTERN.search(text)
+        mode = router.group(1) if router else planner.group(1) if planner else None
+        agents_text = selector.group(1) if selector else planner.group(2) if planner else None
+    if agents_text:
+        try:
+            selected = [name for name in ast.literal_eval(agents_text) if name in AGENTS]
+        except (ValueError, SyntaxError):
+            selected = None
+    if mode not in MODES:
+        mode = None
+    return mode, selected or None
+
+
+def load_examples(db_path, limit=20_000):
+    """(query, mode, agents) training examples from the most recent logged interactions"""
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute(
+            "SELECT user_query, agent_flow, flow FROM logs ORDER BY id DESC LIMIT ?", (limit,)
+        ).fetchall()
+    finally:
+        conn.close()
+    examples = []
+    for user_query, agent_flow, flow in rows:
+        mode, selected = parse_flow_labels(agent_flow, flow)
+        if user_query and (mode or selected):
+            examples.append((user_query, mode, selected))
+    return examples
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def _softmax(x):
+    e = np.exp(x - x.max())
+    return e / e.sum()
+
+
+class FastClassifier:
+    def __init__(self, dim=2 ** 16, threshold=0.85):
+        self.dim = dim
+        self.threshold = threshold
+        self.mode_weights = np.zeros((dim, len(MODES)), dtype=np.float32)
+        self.mode_bias = np.zeros(len(MODES), dtype=np.float32)
+        self.agent_weights = np.zeros((dim, len(AGENTS)), dtype=np.float32)
+        self.agent_bias = np.zeros(len(AGENTS), dtype=np.float32)
+        self.trained_examples = 0
+        self.lock = threading.Lock()
+        self.decisions = 0
+        self.escalations = 0
+        self.mode_checks = 0
+        self.mode_agreements = 0
+        self.agent_checks = 0
+        self.agent_agreements = 0
+
+    def features(self, text):
+        tokens = tokenize(text)
+        grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        return np.array(sorted({zlib.crc32(g.encode("utf-8")) % self.dim for g in grams}), dtype=np.int64)
+
+    def train(self, examples, epochs=15, learning_rate=0.2, l2=1e-4, seed=0):
+        """SGD over sparse features; examples are (query, mode or None, agents or None)"""
+        prepared = [(self.features(query), mode, selected) for query, mode, selected in examples]
+        rng = random.Random(seed)
+        for _ in range(epochs):
+            rng.shuffle(prepared)
+            for features, mode, selected in prepared:
+                if not len(features):
+                    continue
+                if mode is not None:
+                    probs = _softmax(self.mode_weights[features].sum(axis=0) + self.mode_bias)
+                    grad = probs
+                    grad[MODES.index(mode)] -= 1.0
+                    self.mode_weights[features] *= (1 - learning_rate * l2)
+                    self.mode_weights[features] -= learning_rate * grad
+                    self.mode_bias -= learning_rate * grad
+                if selected is not None:
+                    target = np.array([name in selected for name in AGENTS], dtype=np.float32)
+                    grad = _sigmoid(self.agent_weights[features].sum(axis=0) + self.agent_bias) - target
+                    self.agent_weights[features] *= (1 - learning_rate * l2)
+                    self.agent_weights[features] -= learning_rate * grad
+                    self.agent_bias -= learning_rate * grad
+        self.trained_examples += len(prepared)
+        return self
+
+    def predict(self, text):
+        """Mode and agents with confidences (max class probability / least certain agent)"""
+        features = self.features(text)
+        mode_probs = _softmax(self.mode_weights[features].sum(axis=0) + self.mode_bias)
+        agent_probs = _sigmoid(self.agent_weights[features].sum(axis=0) + self.agent_bias)
+        selected = [name for name, p in zip(AGENTS, agent_probs) if p >= 0.5]
+        if not selected:
+            selected = [AGENTS[int(np.argmax(agent_probs))]]
+        return {
+            "mode": MODES[int(np.argmax(mode_probs))],
+            "mode_confidence": float(mode_probs.max()),
+            "agents": selected,
+            "agents_confidence": float(np.maximum(agent_probs, 1 - agent_probs).min()),
+        }
+
+    def is_confident(self, prediction):
+        return (self.trained_examples > 0
+                and prediction["mode_confidence"] >= self.threshold
+                and prediction["agents_confidence"] >= self.threshold)
+
+    def record_decision(self):
+        with self.lock:
+            self.decisions += 1
+
+    def record_escalation(self, prediction, plan):
+        """Count an escalation and whether the local guess matched the LLM's plan"""
+        with self.lock:
+            self.escalations += 1
+            if plan.get("mode"):
+                self.mode_checks += 1
+                self.mode_agreements += prediction["mode"] == plan["mode"]
+            if plan.get("agents"):
+                self.agent_checks += 1
+                self.agent_agreements += sorted(prediction["agents"]) == sorted(plan["agents"])
+
+    def stats(self):
+        with self.lock:
+            total = self.decisions + self.escalations
+            return {
+                "threshold": self.threshold,
+                "trained_examples": self.trained_examples,
+                "fast_path_decisions": self.decisions,
+                "escalations": self.escalations,
+                "escalation_rate": round(self.escalations / total, 3) if total else 0.0,
+                "mode_agreement_with_llm": round(self.mode_agreements / self.mode_checks, 3) if self.mode_checks else None,
+                "agent_agreement_with_llm": round(self.agent_agreements / self.agent_checks, 3) if self.agent_checks else None,
+            }
+
+    def evaluate(self, examples):
+        """Accuracy against LLM labels, overall and on the confident (fast-path) subset"""
+        mode_total = mode_correct = agent_total = agent_correct = 0
+        confident = confident_correct = 0
+        for query, mode, selected in examples:
+            prediction = self.predict(query)
+            mode_ok = mode is None or prediction["mode"] == mode
+            agents_ok = selected is None or sorted(prediction["agents"]) == sorted(selected)
+            if mode is not None:
+                mode_total += 1
+                mode_correct += mode_ok
+            if selected is not None:
+                agent_total += 1
+                agent_correct += agents_ok
+            if self.is_confident(prediction):
+                confident += 1
+                confident_correct += mode_ok and agents_ok
+        return {
+            "examples": len(examples),
+            "mode_accuracy": round(mode_correct / mode_total, 3) if mode_total else None,
+            "agent_accuracy": round(agent_correct / agent_total, 3) if agent_total else None,
+            "fast_path_coverage": round(confident / len(examples), 3) if examples else None,
+            "fast_path_accuracy": round(confident_correct / confident, 3) if confident else None,
+        }
+
+    def save(self, path):
+        np.savez_compressed(
+            path, mode_weights=self.mode_weights, mode_bias=self.mode_bias,
+            agent_weights=self.agent_weights, agent_bias=self.agent_bias,
+            trained_examples=np.array(self.trained_examples),
+        )
+
+    @classmethod
+    def load(cls, path, threshold=0.85):
+        data = np.load(path)
+        classifier = cls(dim=data["mode_weights"].shape[0], threshold=threshold)
+        classifier.mode_weights = data["mode_weights"]
+        classifier.mode_bias = data["mode_bias"]
+        classifier.agent_weights = data["agent_weights"]
+        classifier.agent_bias = data["agent_bias"]
+        classifier.trained_examples = int(data["trained_examples"])
+        return classifier
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="edutrack_logs.db")
+    parser.add_argument("--out", default="fast_classifier.npz")
+    parser.add_argument("--threshold", type=float, default=0.85)
+    parser.add_argument("--holdout", type=float, default=0.2, help="share of examples kept for evaluation")
+    args = parser.parse_args()
+
+    examples = load_examples(args.db)
+    if not examples:
+        print("No labelled interactions found in the logs table.")
+        return
+    random.Random(0).shuffle(examples)
+    split = int(len(examples) * (1 - args.holdout))
+    classifier = FastClassifier(threshold=args.threshold).train(examples[:split])
+    print(f"trained on {split} examples")
+    print("held-out:", classifier.evaluate(examples[split:]))
+
+    final = FastClassifier(threshold=args.threshold).train(examples)
+    final.save(args.out)
+    print(f"saved model trained on all {len(examples)} examples to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_text(text):
+    """Collapse whitespace and case so trivially different prompts share a key"""
+    return " ".join(str(text).lower().split())
+
+
+def cache_key(agent, messages):
+    """Key on agent name, a hash of its system message and the normalized messages"""
+    system_message = getattr(agent, "system_message", "") or ""
+    payload = {
+        "agent": getattr(agent, "name", "unknown"),
+        "system": hashlib.sha256(system_message.encode("utf-8")).hexdigest(),
+        "messages": [
+            [message.get("role", ""), normalize_text(message.get("content") or "")]
+            for message in messages
+        ],
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """LRU + TTL cache of agent replies, optionally persisted to SQLite.
+
+    The in-memory LRU serves hot entries; with db_path set, entries are written
+    through to SQLite and a memory miss falls back to disk, so the cache
+    survives restarts.
+    """
+
+    def __init__(self, max_entries=1024, ttl_seconds=3600, db_path=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.conn = None
+        if db_path:
+            self.conn = sqlite3.connect(db_path, check_same_thread=False)
+            self.conn.execute('''CREATE TABLE IF NOT EXISTS llm_cache (
+                                    key TEXT PRIMARY KEY,
+                                    reply TEXT,
+                                    created REAL
+                                )''')
+            self.conn.commit()
+
+    def _expired(self, created):
+        return self.ttl_seconds is not None and time.time() - created > self.ttl_seconds
+
+    def get(self, key):
+        """Return (hit, reply)"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and self._expired(entry[1]):
+                del self.entries[key]
+                entry = None
+            if entry is None and self.conn is not None:
+                row = self.conn.execute("SELECT reply, created FROM llm_cache WHERE key = ?", (key,)).fetchone()
+                if row and not self._expired(row[1]):
+                    entry = (json.loads(row[0]), row[1])
+                    self._remember(key, entry)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[0]
+
+    def put(self, key, reply):
+        entry = (reply, time.time())
+        with self.lock:
+            self._remember(key, entry)
+            if self.conn is not None:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, reply, created) VALUES (?, ?, ?)",
+                    (key, json.dumps(reply), entry[1])
+                )
+                self.conn.commit()
+
+    def _remember(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            if self.conn is not None:
+                self.conn.execute("DELETE FROM llm_cache")
+                self.conn.commit()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
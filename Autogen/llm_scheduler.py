@@ -0,0 +1,222 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+from collections import deque
+
+# Lower runs first: routing/planning decisions gate everything after them
+PRIORITY_PLANNING = 0
+PRIORITY_ANSWER = 1
+PRIORITY_BACKGROUND = 2  # e.g. session summaries, which no request is waiting on
+
+
+class SchedulerOverloaded(Exception):
+    """Raised by admit() when the scheduler is saturated; retry_after is a hint in seconds"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"LLM scheduler is saturated, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(TimeoutError):
+    """The call could not be started (or retried) before its deadline"""
+
+
+class TokenBucket:
+    """Refills `rate` units per second up to `capacity`; the level may go negative to record debt"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount, now):
+        """Seconds until `amount` units are available (0.0 if they are now)"""
+        if self.rate <= 0:
+            return 0.0
+        self._refill(now)
+        amount = min(amount, self.capacity)  # larger requests would never fit
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount, now):
+        if self.rate > 0:
+            self._refill(now)
+            self.level -= amount
+
+
+def default_retry_delay(error):
+    """Server-suggested delay for retryable errors (0.0 if none given), or None if not retryable.
+
+    Rate limits (429), server errors (5xx), timeouts and connection errors
+    are retryable; everything else fails immediately.
+    """
+    status = getattr(error, "status_code", None)
+    if status is None and not any(name in type(error).__name__ for name in ("Timeout", "Connection")):
+        return None
+    if status is not None and status != 429 and status < 500:
+        return None
+    response = getattr(error, "response", None)
+    header = response.headers.get("retry-after") if response is not None else None
+    try:
+        return max(0.0, float(header)) if header is not None else 0.0
+    except ValueError:
+        return 0.0
+
+
+class LLMScheduler:
+    """Central gate for LLM calls: rate limits, priorities, retries and deadlines.
+
+    Calls wait in a priority queue (planning before long-form answers, FIFO
+    within a priority) until a concurrency slot is free and the request and
+    token buckets allow them; prompt tokens are charged up front and
+    completion tokens after the call. Retryable failures back off
+    exponentially with full jitter, honouring Retry-After, until max_retries
+    or the call's deadline.
+
+    admit()/release() bracket whole requests: a new request fails fast once
+    max_requests are active or max_queue calls are already waiting.
+    """
+
+    def __init__(self, requests_per_minute=0, tokens_per_minute=0, max_concurrency=16, max_queue=256,
+                 max_requests=64, max_retries=3, backoff_base=0.5, backoff_max=20.0,
+                 retry_delay=default_retry_delay):
+        # Buckets hold one second's worth, so bursts can't run ahead of the per-minute limit
+        self.requests = TokenBucket(requests_per_minute / 60, max(1, requests_per_minute / 60))
+        self.tokens = TokenBucket(tokens_per_minute / 60, max(1, tokens_per_minute / 60))
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_requests = max_requests
+        self.active_requests = 0
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_delay = retry_delay
+        self.condition = threading.Condition()
+        self.waiting = []  # heap of (priority, sequence)
+        self.sequence = itertools.count()
+        self.in_flight = 0
+        self.waits = deque(maxlen=2048)
+        self.counters = {"calls": 0, "rejected": 0, "retries": 0, "deadline_exceeded": 0, "failed": 0}
+        self.max_queue_depth = 0
+
+    # --- Admission ---
+    def admit(self, weight=1):
+        """Take `weight` request slots or raise SchedulerOverloaded; pair with release(weight)"""
+        with self.condition:
+            depth = len(self.waiting)
+            if depth < self.max_queue and (self.active_requests == 0
+                                           or self.active_requests + weight <= self.max_requests):
+                self.active_requests += weight
+                return
+            self.counters["rejected"] += 1
+        raise SchedulerOverloaded(self.retry_after_hint(depth))
+
+    def release(self, weight=1):
+        with self.condition:
+            self.active_requests -= weight
+
+    def retry_after_hint(self, depth):
+        """Seconds for the queued calls to drain at the request rate, or the recent p95 wait if unlimited"""
+        rate = self.requests.rate
+        if rate > 0:
+            return max(1, int(depth / rate + 0.999))
+        waits = sorted(self.waits)
+        return max(1, int(waits[int(len(waits) * 0.95)] + 0.999)) if waits else 1
+
+    # --- Scheduling ---
+    def _acquire(self, priority, requests, tokens, deadline):
+        start = time.monotonic()
+        with self.condition:
+            entry = (priority, next(self.sequence))
+            heapq.heappush(self.waiting, entry)
+            self.max_queue_depth = max(self.max_queue_depth, len(self.waiting))
+            try:
+                while True:
+                    now = time.monotonic()
+                    delay = None
+                    if self.waiting[0] == entry and self.in_flight < self.max_concurrency:
+                        delay = max(self.requests.delay(requests, now), self.tokens.delay(tokens, now))
+                        if delay == 0.0:
+                            break
+                    remaining = deadline - now if deadline is not None else None
+                    if remaining is not None and remaining <= 0:
+                        self.counters["deadline_exceeded"] += 1
+                        raise DeadlineExceeded("LLM call deadline passed while queued")
+                    timeouts = [t for t in (delay, remaining) if t]
+                    self.condition.wait(min(timeouts) if timeouts else None)
+                heapq.heappop(self.waiting)
+                self.requests.take(requests, now)
+                self.tokens.take(tokens, now)
+                self.in_flight += 1
+            except BaseException:
+                self.waiting.remove(entry)
+                heapq.heapify(self.waiting)
+                self.condition.notify_all()
+                raise
+            self.waits.append(time.monotonic() - start)
+            # The next waiter may be able to start too
+            self.condition.notify_all()
+
+    def _release(self, completion_tokens):
+        with self.condition:
+            self.in_flight -= 1
+            self.tokens.take(completion_tokens, time.monotonic())
+            self.condition.notify_all()
+
+    def call(self, func, priority=PRIORITY_ANSWER, requests=1, prompt_tokens=0, deadline=None,
+             completion_tokens=None):
+        """Run func() once admitted, retrying retryable errors; `deadline` is a time.monotonic() value.
+
+        `completion_tokens(result)` reports the tokens to charge after a
+        successful call.
+        """
+        with self.condition:
+            self.counters["calls"] += 1
+        attempt = 0
+        while True:
+            self._acquire(priority, requests, prompt_tokens, deadline)
+            used = 0
+            try:
+                result = func()
+                used = completion_tokens(result) if completion_tokens is not None else 0
+                return result
+            except Exception as error:
+                hint = self.retry_delay(error)
+                if hint is None or attempt >= self.max_retries:
+                    with self.condition:
+                        self.counters["failed"] += 1
+                    raise
+                # Full jitter, but never sooner than the server asked for
+                backoff = max(hint, random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt)))
+                if deadline is not None and time.monotonic() + backoff >= deadline:
+                    with self.condition:
+                        self.counters["deadline_exceeded"] += 1
+                    raise DeadlineExceeded(f"no time left to retry: {error}") from error
+            finally:
+                self._release(used)
+            attempt += 1
+            with self.condition:
+                self.counters["retries"] += 1
+            time.sleep(backoff)
+
+    def stats(self):
+        with self.condition:
+            waits = sorted(self.waits)
+            return {
+                "queue_depth": len(self.waiting),
+                "max_queue_depth": self.max_queue_depth,
+                "queue_capacity": self.max_queue,
+                "in_flight": self.in_flight,
+                "active_requests": self.active_requests,
+                "max_requests": self.max_requests,
+                **self.counters,
+                "wait_p50_ms": round(waits[len(waits) // 2] * 1000, 2) if waits else 0.0,
+                "wait_p95_ms": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000, 2) if waits else 0.0,
+                "wait_max_ms": round(waits[-1] * 1000, 2) if waits else 0.0,
+            }
@@ -0,0 +1,76 @@
+"""Load test for /ask against the local stub LLM.
+
+Starts stub_llm in-process, points the app at it and fires batches of /ask
+requests at increasing concurrency, reporting throughput and latency.
+
+Usage: python load_test.py [--levels 1 4 16 32] [--requests 32] [--latency 0.2]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import time
+
+import httpx
+
+import stub_llm
+
+QUESTIONS = [
+    "How can I improve my academic performance?",
+    "What's my current GPA status?",
+    "Give me career advice for my major",
+    "How to manage academic stress?",
+]
+
+
+async def run_level(app, concurrency, num_requests):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(client, i):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post("/ask", json={"message": QUESTIONS[i % len(QUESTIONS)]})
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://edutrack", timeout=300) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(one(client, i) for i in range(num_requests)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    return num_requests / elapsed, statistics.median(latencies), p95
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 4, 16, 32])
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--port", type=int, default=8999)
+    args = parser.parse_args()
+
+    os.environ["EDUTRACK_LLM_BASE_URL"] = stub_llm.start_in_background(args.port, args.latency)
+    os.environ.setdefault("EDUTRACK_PIPELINE_WORKERS", str(max(args.levels)))
+    # Measure the full pipeline: repeated questions would otherwise be served by the reply cache,
+    # the answer index or an identical request already in flight
+    os.environ.setdefault("EDUTRACK_CACHE_SIZE", "0")
+    os.environ.setdefault("EDUTRACK_QUERY_INDEX_SIZE", "0")
+    os.environ.setdefault("EDUTRACK_COALESCE", "0")
+    logging.getLogger("autogen.oai.client").setLevel(logging.ERROR)  # stub model has no pricing entry
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    import api  # imported after the stub is up so the agents pick up its base_url
+    api.core.startup()
+
+    print(f"{'concurrency':>11} {'req/s':>8} {'p50 (s)':>8} {'p95 (s)':>8}")
+    for level in args.levels:
+        throughput, p50, p95 = asyncio.run(run_level(api.app, level, args.requests))
+        print(f"{level:>11} {throughput:>8.2f} {p50:>8.2f} {p95:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
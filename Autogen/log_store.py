@@ -0,0 +1,296 @@
+"""Schema, full-text search and retention for the interaction log database.
+
+Each row of `logs` stores the question, the answer, the request's flow as a
+compact JSON list of [elapsed_ms, agent, action, details] entries (`flow`)
+and optionally its trace spans. Rows written before `flow` existed keep the
+rendered display_info() text in `agent_flow`.
+
+An external-content FTS5 table (`logs_fts`) indexes questions and answers and
+is kept in step by triggers. compact() rolls rows older than the retention
+window into per-day aggregates (`log_daily`), reading older rows' flows back
+from their rendered text, deletes them and returns the freed pages to the
+filesystem, so the file stays bounded by the window.
+
+Usage: python log_store.py [--db edutrack_logs.db] search "academic warning"
+       python log_store.py [--db edutrack_logs.db] compact [--days 90]
+"""
+import argparse
+import json
+import re
+import sqlite3
+import time
+
+FLOW_FIELDS = ("elapsed_ms", "agent", "action", "details")
+PLANNER_DETAILS = re.compile(r"Mode: (\w+), Agents: (\[[^\]]*\])")
+# One entry's header in the rendered agent_flow text: "3. [12:00:01.250 +830.5ms] 🧭 **ROUTER**"
+RENDERED_ENTRY = re.compile(r"^\s*\d+\. \[(\d+):(\d+):([\d.]+)(?: \+([\d.]+)ms)?\] \S+ \*\*(\w+)\*\*\s*$")
+COMPACT_CHUNK = 5000  # rows aggregated and deleted per transaction
+
+
+def encode_flow(entries):
+    """Compact JSON for a request's agent_flow_log entries"""
+    return json.dumps([[entry[field] for field in FLOW_FIELDS] for entry in entries],
+                      ensure_ascii=False, separators=(",", ":"))
+
+
+def decode_flow(text):
+    return [dict(zip(FLOW_FIELDS, entry)) for entry in json.loads(text)] if text else []
+
+
+def decode_rendered_flow(text):
+    """Flow entries parsed back from the display_info() text of rows that have no `flow`.
+
+    The oldest rows carry only wall-clock times, so elapsed_ms is then measured
+    from the first entry.
+    """
+    entries, first = [], None
+    for line in (text or "").splitlines():
+        match = RENDERED_ENTRY.match(line)
+        if match:
+            hours, minutes, seconds, elapsed, agent = match.groups()
+            if elapsed is None:
+                clock = (int(hours) * 60 + int(minutes)) * 60 + float(seconds)
+                first = clock if first is None else first
+                elapsed = ((clock - first) % 86400) * 1000
+            entries.append({"elapsed_ms": float(elapsed), "agent": agent.lower(), "action": None, "details": None})
+            continue
+        line = line.strip()
+        if entries and line.startswith("Action: ") and entries[-1]["action"] is None:
+            entries[-1]["action"] = line[len("Action: "):]
+        elif entries and line.startswith("Details: ") and entries[-1]["details"] is None:
+            entries[-1]["details"] = line[len("Details: "):]
+    return entries
+
+
+def flow_decisions(entries):
+    """(mode, agents_text) decided by the LLM router/selector or planner; either may be None.
+
+    Fallbacks and fast-path decisions are logged under other actions, so they
+    are not picked up. agents_text is the logged list literal.
+    """
+    mode = agents_text = None
+    for entry in entries:
+        agent, action, details = entry["agent"], entry["action"], entry["details"] or ""
+        if agent == "router" and action == "Classification completed" and details.startswith("Result: "):
+            mode = details[len("Result: "):].strip() or None
+        elif agent == "selector" and action == "Agent selection completed" and details.startswith("Selected: "):
+            agents_text = details[len("Selected: "):]
+        elif agent == "planner" and action == "Planning completed":
+            match = PLANNER_DETAILS.match(details)
+            if match:
+                mode = mode or match.group(1)
+                agents_text = agents_text or match.group(2)
+    return mode, agents_text
+
+
+# --- Schema ---
+def init_db(conn):
+    """Create or migrate the logs table, its indexes, the FTS index and the daily aggregates"""
+    # Only takes effect on a new file; compact() converts older ones once
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    cursor = conn.cursor()
+
+    # Create table if it doesn't exist
+    cursor.execute('''CREATE TABLE IF NOT EXISTS logs (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        user_query TEXT,
+                        agent_response TEXT,
+                        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+                    )''')
+
+    # Check if agent_flow column exists, if not add it
+    cursor.execute("PRAGMA table_info(logs)")
+    columns = [column[1] for column in cursor.fetchall()]
+
+    if 'agent_flow' not in columns:
+        cursor.execute("ALTER TABLE logs ADD COLUMN agent_flow TEXT")  # rendered flow, rows before `flow`
+        print("Added agent_flow column to existing database")
+    if 'trace' not in columns:
+        cursor.execute("ALTER TABLE logs ADD COLUMN trace TEXT")  # JSON list of the request's spans
+    if 'flow' not in columns:
+        cursor.execute("ALTER TABLE logs ADD COLUMN flow TEXT")  # encode_flow() of the request's flow
+    cursor.execute("CREATE INDEX IF NOT EXISTS logs_timestamp ON logs (timestamp)")
+
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'logs_fts'")
+    new_index = cursor.fetchone() is None
+    cursor.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS logs_fts USING fts5(
+                        user_query, agent_response, content='logs', content_rowid='id',
+                        tokenize='unicode61 remove_diacritics 2'
+                    )''')
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS logs_fts_insert AFTER INSERT ON logs BEGIN
+                        INSERT INTO logs_fts (rowid, user_query, agent_response)
+                        VALUES (new.id, new.user_query, new.agent_response);
+                    END''')
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS logs_fts_delete AFTER DELETE ON logs BEGIN
+                        INSERT INTO logs_fts (logs_fts, rowid, user_query, agent_response)
+                        VALUES ('delete', old.id, old.user_query, old.agent_response);
+                    END''')
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS logs_fts_update AFTER UPDATE OF user_query, agent_response ON logs
+                    BEGIN
+                        INSERT INTO logs_fts (logs_fts, rowid, user_query, agent_response)
+                        VALUES ('delete', old.id, old.user_query, old.agent_response);
+                        INSERT INTO logs_fts (rowid, user_query, agent_response)
+                        VALUES (new.id, new.user_query, new.agent_response);
+                    END''')
+    if new_index:
+        # Index the rows logged before the FTS table existed
+        cursor.execute("INSERT INTO logs_fts (logs_fts) VALUES ('rebuild')")
+
+    cursor.execute('''CREATE TABLE IF NOT EXISTS log_daily (
+                        day TEXT PRIMARY KEY,
+                        interactions INTEGER NOT NULL,
+                        modes TEXT,
+                        agents TEXT,
+                        total_ms REAL,
+                        response_chars INTEGER
+                    )''')
+
+    conn.commit()
+
+
+# --- Search ---
+def match_expression(text):
+    """FTS5 query matching every word of free text.
+
+    Whole words only: prefix terms expand to every indexed word they start,
+    which turns short prefixes into scans of most of the index.
+    """
+    words = re.findall(r"\w+", text.lower())
+    return " ".join(f'"{word}"' for word in words)
+
+
+def snippet(text, words, width=160):
+    """The part of text around the first matched word"""
+    text = text or ""
+    lowered = text.lower()
+    positions = [position for position in (lowered.find(word) for word in words) if position >= 0]
+    start = max(0, min(positions, default=0) - width // 4)
+    if start:
+        start = lowered.rfind(" ", 0, start) + 1  # back to a word boundary
+    return ("… " if start else "") + text[start:start + width] + (" …" if start + width < len(text) else "")
+
+
+def search(conn, text, limit=20):
+    """Logged interactions whose question or answer contains every word of text, newest first.
+
+    FTS5 walks its doclists in rowid order and stops after `limit` matches,
+    so this stays fast however many rows a common word hits. bm25() ranking
+    would need each word's document count, a full doclist scan per word.
+    """
+    expression = match_expression(text)
+    if not expression:
+        return []
+    rows = conn.execute(
+        '''SELECT logs.id, logs.timestamp, logs.user_query, logs.agent_response
+           FROM (SELECT rowid FROM logs_fts WHERE logs_fts MATCH ? ORDER BY rowid DESC LIMIT ?) AS matches
+           JOIN logs ON logs.id = matches.rowid
+           ORDER BY logs.id DESC''',
+        (expression, limit)
+    ).fetchall()
+    words = re.findall(r"\w+", text.lower())
+    return [{"id": row_id, "timestamp": timestamp, "user_query": user_query, "snippet": snippet(response, words)}
+            for row_id, timestamp, user_query, response in rows]
+
+
+# --- Retention ---
+def _merge_counts(stored, counts):
+    merged = json.loads(stored) if stored else {}
+    for key, count in counts.items():
+        merged[key] = merged.get(key, 0) + count
+    return json.dumps(merged, sort_keys=True)
+
+
+def _roll_up(conn, rows):
+    """Add rows of (id, day, response_chars, flow, agent_flow) to log_daily"""
+    days = {}
+    for _, day, response_chars, flow, agent_flow in rows:
+        aggregate = days.setdefault(day, {"interactions": 0, "modes": {}, "agents": {}, "total_ms": 0.0,
+                                          "response_chars": 0})
+        aggregate["interactions"] += 1
+        aggregate["response_chars"] += response_chars or 0
+        try:
+            entries = decode_flow(flow)
+        except (ValueError, TypeError):
+            entries = []
+        if not entries:
+            entries = decode_rendered_flow(agent_flow)
+        if entries:
+            aggregate["total_ms"] += entries[-1]["elapsed_ms"] or 0
+            mode, _ = flow_decisions(entries)
+            if mode:
+                aggregate["modes"][mode] = aggregate["modes"].get(mode, 0) + 1
+            for agent in {entry["agent"] for entry in entries}:
+                aggregate["agents"][agent] = aggregate["agents"].get(agent, 0) + 1
+    for day, aggregate in days.items():
+        stored = conn.execute("SELECT interactions, modes, agents, total_ms, response_chars FROM log_daily "
+                              "WHERE day = ?", (day,)).fetchone()
+        interactions, modes, agents, total_ms, response_chars = stored or (0, None, None, 0.0, 0)
+        conn.execute(
+            "INSERT OR REPLACE INTO log_daily (day, interactions, modes, agents, total_ms, response_chars) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (day, interactions + aggregate["interactions"], _merge_counts(modes, aggregate["modes"]),
+             _merge_counts(agents, aggregate["agents"]), total_ms + aggregate["total_ms"],
+             response_chars + aggregate["response_chars"])
+        )
+
+
+def compact(conn, retention_days):
+    """Roll rows older than retention_days into log_daily, delete them and release the freed pages"""
+    start = time.perf_counter()
+    cutoff = conn.execute("SELECT datetime('now', ?)", (f"-{retention_days} days",)).fetchone()[0]
+    compacted = 0
+    while True:
+        with conn:
+            rows = conn.execute(
+                "SELECT id, date(timestamp), length(agent_response), flow, agent_flow FROM logs "
+                "WHERE timestamp < ? ORDER BY timestamp LIMIT ?", (cutoff, COMPACT_CHUNK)
+            ).fetchall()
+            if not rows:
+                break
+            _roll_up(conn, rows)
+            conn.executemany("DELETE FROM logs WHERE id = ?", [(row[0],) for row in rows])
+        compacted += len(rows)
+
+    freed = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        # Files created before incremental auto-vacuum need one full VACUUM to switch over
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("VACUUM")
+    elif compacted:
+        with conn:
+            conn.execute("INSERT INTO logs_fts (logs_fts) VALUES ('optimize')")
+        conn.execute("PRAGMA incremental_vacuum")
+    # Truncate the WAL too, or the deletes just move the growth there
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return {"rows_compacted": compacted, "pages_freed": freed, "cutoff": cutoff,
+            "duration_ms": round((time.perf_counter() - start) * 1000, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="edutrack_logs.db")
+    commands = parser.add_subparsers(dest="command", required=True)
+    search_parser = commands.add_parser("search", help="full-text search over questions and answers")
+    search_parser.add_argument("text")
+    search_parser.add_argument("--limit", type=int, default=20)
+    compact_parser = commands.add_parser("compact", help="roll old rows into daily aggregates and vacuum")
+    compact_parser.add_argument("--days", type=int, default=90)
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    try:
+        init_db(conn)
+        if args.command == "search":
+            start = time.perf_counter()
+            results = search(conn, args.text, args.limit)
+            for result in results:
+                print(f"#{result['id']} [{result['timestamp']}] {result['user_query']}\n    {result['snippet']}")
+            print(f"{len(results)} result(s) in {(time.perf_counter() - start) * 1000:.2f} ms")
+        else:
+            print(compact(conn, args.days))
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
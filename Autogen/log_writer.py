@@ -0,0 +1,149 @@
+import queue
+import sqlite3
+import threading
+import time
+
+_STOP = object()
+
+
+class LogWriter:
+    """Background SQLite writer for interaction logs.
+
+    One connection in WAL mode is owned by a daemon thread that drains a
+    bounded queue and inserts rows in batched transactions, so callers only
+    pay for a queue put. When the queue is full new rows are dropped and
+    counted rather than blocking the request path.
+
+    `maintenance(conn)` (e.g. retention compaction) runs on the same thread
+    at start and then every maintenance_interval seconds, so it never
+    contends with the inserts for the write lock.
+    """
+
+    def __init__(self, db_path, init_db=None, max_queue=10_000, batch_size=200, flush_interval=0.2,
+                 maintenance=None, maintenance_interval=3600):
+        self.db_path = db_path
+        self.init_db = init_db
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.conn = None
+        self.thread = None
+        self.lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.errors = 0
+        self.max_depth = 0
+        self.last_batch_ms = 0.0
+        self.maintenance = maintenance
+        self.maintenance_interval = maintenance_interval
+        self.last_maintenance = None
+
+    def start(self):
+        if self.thread is not None:
+            return self
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        if self.init_db is not None:
+            self.init_db(self.conn)
+        self.thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self.thread.start()
+        return self
+
+    def write(self, user_query, agent_response, flow, trace=None):
+        """Queue one log row; returns False if it was dropped because the queue is full"""
+        try:
+            self.queue.put_nowait((user_query, agent_response, flow, trace))
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+            return False
+        depth = self.queue.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+        return True
+
+    def _run(self):
+        stopping = False
+        next_maintenance = time.monotonic()
+        while not stopping:
+            if self.maintenance is not None and time.monotonic() >= next_maintenance:
+                self._maintain()
+                next_maintenance = time.monotonic() + self.maintenance_interval
+            try:
+                item = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = []
+            while True:
+                if item is _STOP:
+                    stopping = True
+                else:
+                    batch.append(item)
+                if stopping or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._insert(batch)
+            for _ in range(len(batch) + (1 if stopping else 0)):
+                self.queue.task_done()
+
+    def _maintain(self):
+        try:
+            result = self.maintenance(self.conn)
+        except sqlite3.Error as e:
+            with self.lock:
+                self.errors += 1
+            print(f"Log maintenance error: {e}")
+            return
+        with self.lock:
+            self.last_maintenance = result
+
+    def _insert(self, batch):
+        start = time.perf_counter()
+        try:
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT INTO logs (user_query, agent_response, flow, trace) VALUES (?, ?, ?, ?)", batch
+                )
+        except sqlite3.Error as e:
+            with self.lock:
+                self.errors += 1
+            print(f"Log writer error: {e}")
+            return
+        with self.lock:
+            self.written += len(batch)
+            self.batches += 1
+            self.last_batch_ms = round((time.perf_counter() - start) * 1000, 3)
+
+    def flush(self):
+        """Block until every queued row has been written"""
+        if self.thread is not None:
+            self.queue.join()
+
+    def close(self):
+        """Flush pending rows, stop the writer thread and close the connection"""
+        if self.thread is None:
+            return
+        self.queue.put(_STOP)
+        self.thread.join()
+        self.thread = None
+        self.conn.close()
+
+    def stats(self):
+        with self.lock:
+            return {
+                "queue_depth": self.queue.qsize(),
+                "max_queue_depth": self.max_depth,
+                "queue_capacity": self.queue.maxsize,
+                "written": self.written,
+                "dropped": self.dropped,
+                "batches": self.batches,
+                "errors": self.errors,
+                "last_batch_ms": self.last_batch_ms,
+                "last_maintenance": self.last_maintenance,
+            }
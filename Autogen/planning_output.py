@@ -0,0 +1,120 @@
+"""JSON schemas for the planning agents' replies and a safe parser for them.
+
+The router, selector, data_context and planner agents are asked for small
+JSON objects, constrained by these schemas where the provider supports
+structured output. parse_reply() reads a reply without eval(): it skips a
+leading <think> block or code fence and decodes the first JSON value. The
+Python list literals older prompts asked for (['academic']) are still
+accepted, through ast.literal_eval, which only builds literals.
+"""
+import ast
+import json
+import re
+
+MODES = ("lookup", "llm", "both")
+THINK_BLOCK = re.compile(r"<think>.*?</think>", re.DOTALL | re.IGNORECASE)
+CODE_FENCE = re.compile(r"```[a-zA-Z]*")
+_decoder = json.JSONDecoder()
+
+
+class PlanningParseError(ValueError):
+    """A planning reply held no value of the expected shape"""
+
+
+# --- Schemas ---
+def _object(**properties):
+    # Strict structured output needs every property required and no others allowed
+    return {"type": "object", "properties": properties, "required": list(properties),
+            "additionalProperties": False}
+
+
+def _names(values):
+    return {"type": "array", "items": {"type": "string", "enum": list(values)}}
+
+
+def mode_schema():
+    return _object(mode={"type": "string", "enum": list(MODES)})
+
+
+def agents_schema(agent_names):
+    return _object(agents=_names(agent_names))
+
+
+def datasets_schema(dataset_names):
+    return _object(datasets=_names(dataset_names))
+
+
+def plan_schema(agent_names, dataset_names):
+    return _object(mode={"type": "string", "enum": list(MODES)}, agents=_names(agent_names),
+                   datasets=_names(dataset_names))
+
+
+def batch_plan_schema(agent_names, dataset_names):
+    return _object(plans={"type": "array", "items": plan_schema(agent_names, dataset_names)})
+
+
+# --- Parsing ---
+def _strip(text):
+    text = THINK_BLOCK.sub("", text or "")
+    if "<think>" in text.lower():
+        raise PlanningParseError("reply ended inside its reasoning")
+    return CODE_FENCE.sub("", text).strip()
+
+
+def parse_reply(text):
+    """First JSON object or array in a reply (or a Python list/dict literal)"""
+    text = _strip(text)
+    starts = [position for position in (text.find("{"), text.find("[")) if position >= 0]
+    if not starts:
+        raise PlanningParseError(f"no JSON in reply: {text[:80]!r}")
+    start = min(starts)
+    try:
+        return _decoder.raw_decode(text, start)[0]
+    except json.JSONDecodeError:
+        pass
+    end = text.rfind("]" if text[start] == "[" else "}")
+    try:
+        return ast.literal_eval(text[start:end + 1])
+    except (ValueError, SyntaxError, MemoryError, RecursionError) as e:
+        raise PlanningParseError(f"unparseable reply: {text[:80]!r}") from e
+
+
+def parse_mode(text):
+    """'lookup', 'llm' or 'both' from {"mode": ...} or a bare word"""
+    stripped = _strip(text)
+    word = stripped.strip(" \t\n'\".").lower()
+    if word in MODES:
+        return word
+    value = parse_reply(stripped)
+    mode = str(value.get("mode", "") if isinstance(value, dict) else "").strip().lower()
+    if mode not in MODES:
+        raise PlanningParseError(f"no valid mode in reply: {stripped[:80]!r}")
+    return mode
+
+
+def parse_names(text, key):
+    """List of strings from {key: [...]} or a bare list"""
+    value = parse_reply(text)
+    if isinstance(value, dict):
+        value = value.get(key)
+    if not isinstance(value, list) or not all(isinstance(name, str) for name in value):
+        raise PlanningParseError(f"expected a list of {key}: {str(text)[:80]!r}")
+    return value
+
+
+def parse_plan(text):
+    """The planner's {"mode", "agents", "datasets"} object"""
+    value = parse_reply(text)
+    if not isinstance(value, dict):
+        raise PlanningParseError("planner did not return a JSON object")
+    return value
+
+
+def parse_batch_plan(text):
+    """The batch planner's list of plan objects, from {"plans": [...]} or a bare array"""
+    value = parse_reply(text)
+    if isinstance(value, dict):
+        value = value.get("plans")
+    if not isinstance(value, list):
+        raise PlanningParseError("batch planner did not return a list of plans")
+    return value
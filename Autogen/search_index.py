@@ -0,0 +1,134 @@
+import re
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+# Words and numbers (including decimals such as GPA values like "5.6")
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:\.[0-9]+)*")
+
+EMPTY_ROWS = np.empty(0, dtype=np.int64)
+
+
+def tokenize(text):
+    """Split text into lowercase search tokens"""
+    return TOKEN_PATTERN.findall(str(text).lower())
+
+
+class KeywordIndex:
+    """Keyword lookup and scoring over token -> sorted row id postings.
+
+    Read-only; subclasses provide columns, num_rows and rows_for_token().
+    """
+
+    def lookup(self, keywords, match="any"):
+        """Return sorted row ids matching any (union) or all (intersection) keywords"""
+        tokens = set()
+        for keyword in keywords:
+            tokens.update(tokenize(keyword))
+        if not tokens:
+            return EMPTY_ROWS
+
+        row_sets = [self.rows_for_token(token) for token in tokens]
+        if match == "all":
+            row_sets.sort(key=len)
+            result = row_sets[0]
+            for rows in row_sets[1:]:
+                if not len(result):
+                    break
+                result = np.intersect1d(result, rows, assume_unique=True)
+            return result
+
+        non_empty = [rows for rows in row_sets if len(rows)]
+        if not non_empty:
+            return EMPTY_ROWS
+        if len(non_empty) == 1:
+            return non_empty[0]
+        return np.unique(np.concatenate(non_empty))
+
+    def score_rows(self, keywords, row_ids):
+        """Relevance of each row: IDF-weighted count of the keywords it contains"""
+        tokens = set()
+        for keyword in keywords:
+            tokens.update(tokenize(keyword))
+        scores = np.zeros(len(row_ids))
+        for token in tokens:
+            rows = self.rows_for_token(token)
+            if len(rows):
+                idf = np.log1p(self.num_rows / len(rows))
+                scores += idf * np.isin(row_ids, rows, assume_unique=True)
+        return scores
+
+
+class InvertedIndex(KeywordIndex):
+    """Token -> row id postings for one dataset, built once at load time"""
+
+    def __init__(self, df, columns=None):
+        self.columns = list(columns) if columns is not None else list(df.columns)
+        self.num_rows = len(df)
+        self.postings = self._merge(self._chunks(df), {})
+
+    def _chunks(self, df, positions=None):
+        """Token -> row id chunks for df, whose rows sit at `positions` (default 0..n-1)"""
+        chunks = defaultdict(list)
+        for column in self.columns:
+            values = df[column].astype(str).str.lower().to_numpy()
+            # Tokenize each distinct cell value once; categorical columns
+            # (major, stress_level, career_goal, ...) have only a few of them
+            codes, uniques = pd.factorize(values)
+            order = np.argsort(codes, kind="stable")
+            bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+            if positions is not None:
+                order = np.asarray(positions, dtype=np.int64)[order]
+            for code, value in enumerate(uniques):
+                rows = order[bounds[code]:bounds[code + 1]]
+                for token in set(tokenize(value)):
+                    chunks[token].append(rows)
+        return chunks
+
+    @staticmethod
+    def _merge(chunks, postings):
+        for token, row_chunks in chunks.items():
+            rows = np.sort(row_chunks[0]) if len(row_chunks) == 1 else np.unique(np.concatenate(row_chunks))
+            rows = rows.astype(np.int64)
+            existing = postings.get(token)
+            if existing is not None:
+                # Both sides are sorted and disjoint, so inserting keeps the postings sorted
+                rows = np.insert(existing, np.searchsorted(existing, rows), rows)
+            postings[token] = rows
+        return postings
+
+    def with_changes(self, old_df, stale, new_df, fresh):
+        """Index for new_df derived from this one without re-tokenizing unchanged rows.
+
+        stale are positions in old_df whose rows changed, moved or were removed;
+        every other row must keep its position in new_df. fresh are the
+        positions in new_df to tokenize. This index is left untouched for
+        in-flight readers.
+        """
+        stale = np.asarray(stale, dtype=np.int64)
+        is_stale = np.zeros(max(len(old_df), 1), dtype=bool)
+        is_stale[stale] = True
+        postings = dict(self.postings)
+
+        for token in self._chunks(old_df.iloc[stale], stale):
+            rows = postings[token]
+            rows = rows[~is_stale[rows]]
+            if len(rows):
+                postings[token] = rows
+            else:
+                del postings[token]
+
+        fresh = np.asarray(fresh, dtype=np.int64)
+        index = InvertedIndex.__new__(InvertedIndex)
+        index.columns = self.columns
+        index.num_rows = len(new_df)
+        index.postings = self._merge(index._chunks(new_df.iloc[fresh], fresh), postings)
+        return index
+
+    def rows_for_token(self, token):
+        return self.postings.get(token, EMPTY_ROWS)
+
+def build_indexes(datasets):
+    """Build one inverted index per loaded dataset"""
+    return {name: InvertedIndex(df) for name, df in datasets.items()}
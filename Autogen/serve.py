@@ -0,0 +1,42 @@
+"""Multi-process API server sharing one memory-mapped copy of the datasets.
+
+Builds the shared dataset cache (shared_datasets.py) once in this process,
+then starts uvicorn workers with EDUTRACK_SHARED_DATA_DIR pointing at it, so
+each worker attaches the datasets, indexes, student store and cohort views
+instead of loading its own copy. Agents, LLM clients and the log writer are
+still per worker; they hold configuration and connections, not data.
+
+Usage: python serve.py [--workers 4] [--host 0.0.0.0] [--port 8000] [--shared-dir .edutrack_shared]
+"""
+import argparse
+import os
+import time
+
+import uvicorn
+
+import shared_datasets
+from dataset_manager import DATASET_FILES, DEFAULT_DATA_DIR
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--shared-dir", default=os.environ.get("EDUTRACK_SHARED_DATA_DIR") or ".edutrack_shared")
+    args = parser.parse_args()
+
+    data_dir = os.environ.get("EDUTRACK_DATA_DIR") or DEFAULT_DATA_DIR
+    shared_dir = os.path.abspath(args.shared_dir)
+    start = time.perf_counter()
+    directory = shared_datasets.build({name: os.path.join(data_dir, filename)
+                                       for name, filename in DATASET_FILES.items()}, shared_dir)
+    print(f"Shared datasets ready in {time.perf_counter() - start:.2f}s: {directory}")
+
+    # Inherited by the workers, which attach to the cache in core.startup()
+    os.environ["EDUTRACK_SHARED_DATA_DIR"] = shared_dir
+    uvicorn.run("api:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
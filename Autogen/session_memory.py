@@ -0,0 +1,159 @@
+import threading
+import time
+from collections import OrderedDict
+
+from context_builder import estimate_tokens
+
+
+def clip(text, max_tokens):
+    """Cut text to about max_tokens, marking the cut"""
+    limit = max_tokens * 4
+    return text if len(text) <= limit else text[:limit].rstrip() + " …"
+
+
+def format_turns(turns):
+    return "\n".join(f"Student: {question}\nEdutrack: {answer}" for question, answer in turns)
+
+
+class Session:
+    def __init__(self):
+        self.turns = []  # recent (question, answer) pairs, oldest first
+        self.pending = []  # turns evicted from the window, not yet folded into the summary
+        self.summary = ""
+        self.compacting = False
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()
+
+    def tokens(self):
+        return (estimate_tokens(self.summary) + estimate_tokens(format_turns(self.pending))
+                + estimate_tokens(format_turns(self.turns)))
+
+
+class SessionStore:
+    """Per-session conversation memory with bounded prompt size and process memory.
+
+    Each session keeps a sliding window of recent turns. When the window
+    exceeds window_turns or token_threshold, the oldest turns are evicted and
+    folded into a running summary by `summarize(summary, turns)` (on the
+    caller's executor, one compaction per session at a time); until then they
+    stay in `pending`. Answers are clipped per turn and the summary is capped,
+    so a session never grows past roughly token_threshold + summary_tokens.
+    Sessions idle longer than idle_seconds, or beyond max_sessions in LRU
+    order, are dropped.
+    """
+
+    def __init__(self, max_sessions=1000, window_turns=6, token_threshold=800, summary_tokens=300,
+                 turn_tokens=300, idle_seconds=3600, summarize=None, executor=None):
+        self.max_sessions = max_sessions
+        self.window_turns = window_turns
+        self.token_threshold = token_threshold
+        self.summary_tokens = summary_tokens
+        self.turn_tokens = turn_tokens
+        self.idle_seconds = idle_seconds
+        self.summarize = summarize
+        self.executor = executor
+        self.sessions = OrderedDict()
+        self.lock = threading.Lock()
+        self.evicted_sessions = 0
+        self.compactions = 0
+
+    def _session(self, session_id, create=True):
+        now = time.monotonic()
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is not None:
+                self.sessions.move_to_end(session_id)
+            elif create:
+                session = self.sessions[session_id] = Session()
+            # Least recently used first: drop idle sessions and any over the cap
+            while self.sessions:
+                oldest_id, oldest = next(iter(self.sessions.items()))
+                if oldest_id != session_id and (len(self.sessions) > self.max_sessions
+                                                or now - oldest.last_used > self.idle_seconds):
+                    del self.sessions[oldest_id]
+                    self.evicted_sessions += 1
+                else:
+                    break
+        if session is not None:
+            session.last_used = now
+        return session
+
+    def context(self, session_id):
+        """Summary plus recent turns as prompt text ('' for a new or unknown session)"""
+        session = self._session(session_id, create=False)
+        if session is None:
+            return ""
+        with session.lock:
+            parts = []
+            if session.summary:
+                parts.append(f"Conversation summary: {session.summary}")
+            recent = session.pending + session.turns
+            if recent:
+                parts.append("Recent conversation:\n" + format_turns(recent))
+            return "\n".join(parts)
+
+    def recent_questions(self, session_id):
+        """The student's questions still in the window, newest last"""
+        session = self._session(session_id, create=False)
+        if session is None:
+            return []
+        with session.lock:
+            return [question for question, _ in session.pending + session.turns]
+
+    def add_turn(self, session_id, question, answer):
+        """Record a turn; evicts old turns from the window and schedules their compaction"""
+        session = self._session(session_id)
+        with session.lock:
+            session.turns.append((clip(question, self.turn_tokens), clip(answer, self.turn_tokens)))
+            while len(session.turns) > 1 and (len(session.turns) > self.window_turns or
+                                              estimate_tokens(format_turns(session.turns)) > self.token_threshold):
+                session.pending.append(session.turns.pop(0))
+            start = bool(session.pending) and not session.compacting
+            if start:
+                session.compacting = True
+        if start:
+            if self.executor is not None:
+                self.executor.submit(self._compact, session)
+            else:
+                self._compact(session)
+
+    def _compact(self, session):
+        """Fold pending turns into the summary until none are left"""
+        while True:
+            with session.lock:
+                batch = list(session.pending)
+                summary = session.summary
+                if not batch:
+                    session.compacting = False
+                    return
+            try:
+                updated = self.summarize(summary, batch) if self.summarize is not None else None
+            except Exception as e:
+                print(f"Session summary error: {e}")
+                updated = None
+            if not updated:
+                # Extractive fallback: keep each evicted question with the start of its answer
+                updated = " ".join([summary] + [f"Asked: {q} Answered: {a[:160]}" for q, a in batch]).strip()
+            with session.lock:
+                # Keep the most recent part of the summary within the cap
+                limit = self.summary_tokens * 4
+                session.summary = updated if len(updated) <= limit else "… " + updated[-limit:].lstrip()
+                del session.pending[:len(batch)]
+                self.compactions += 1
+
+    def drop(self, session_id):
+        with self.lock:
+            return self.sessions.pop(session_id, None) is not None
+
+    def stats(self):
+        with self.lock:
+            sessions = list(self.sessions.values())
+            evicted, compactions = self.evicted_sessions, self.compactions
+        tokens = [session.tokens() for session in sessions]
+        return {
+            "sessions": len(sessions),
+            "memory_tokens": sum(tokens),
+            "max_session_tokens": max(tokens, default=0),
+            "evicted_sessions": evicted,
+            "compactions": compactions,
+        }
@@ -0,0 +1,357 @@
+"""Datasets and their derived structures in shared, memory-mapped files.
+
+build() converts the CSVs once into a versioned cache directory: every
+dataset and the joined student frame as uncompressed Arrow IPC files, and
+the keyword postings, id/name lookups and cohort memberships as flat NumPy
+arrays. attach() maps them read-only, so every worker process serving from
+the same directory reads one copy of the pages through the OS page cache.
+Numeric and free-text columns are used in place; what each worker keeps
+privately is small: the codes of categorical columns, their categories and
+the per-group totals of the aggregate views. The attached objects implement
+only the read side (KeywordIndex, StudentLookup, AggregateLookup); they are
+replaced by a new version, never updated in place.
+
+A cache directory is named after the CSV signatures, so a changed file
+builds a new one next to it and workers move over as they notice the change.
+Builds take a lock file in the shared directory: the first worker to notice
+a change builds the new version and the others wait, then attach to it.
+
+Usage: python shared_datasets.py [--data-dir Datasets] [--shared-dir .edutrack_shared]
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from aggregates import COHORT_COLUMNS, AggregateLookup, AggregateViews, gpa_band
+from search_index import InvertedIndex, KeywordIndex
+from student_store import StudentLookup, StudentStore, compact_column
+
+try:
+    import fcntl
+except ImportError:  # Windows: concurrent builds of one version still publish only one copy
+    fcntl = None
+
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+LOCK = ".lock"
+
+
+def signature(paths):
+    """Cache directory name for these files as they are on disk now"""
+    digest = hashlib.sha1(str(FORMAT_VERSION).encode())
+    for name, path in sorted(paths.items()):
+        try:
+            stat = os.stat(path)
+            digest.update(f"{name}|{os.path.abspath(path)}|{stat.st_mtime_ns}|{stat.st_size}".encode())
+        except OSError:
+            digest.update(f"{name}|missing".encode())
+    return digest.hexdigest()[:16]
+
+
+# --- Columnar files ---
+def _arrow_column(series):
+    """Arrow array that converts back to pandas without copying its values where possible"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return pa.array(series)  # dictionary array; only the small codes are copied on attach
+    if series.dtype == object:
+        return pa.array(series.astype("string[python]"), type=pa.large_string())
+    # NaN stays a value rather than a null, so float columns map zero-copy
+    return pa.array(series.to_numpy())
+
+
+def write_frame(path, df):
+    table = pa.table({column: _arrow_column(df[column]) for column in df.columns})
+    with ipc.new_file(path, table.schema) as writer:
+        writer.write_table(table)
+
+
+def read_frame(path):
+    """DataFrame over a memory-mapped Arrow file; text columns stay Arrow-backed"""
+    table = ipc.open_file(pa.memory_map(path, "r")).read_all()
+    return table.to_pandas(split_blocks=True, self_destruct=False,
+                           types_mapper={pa.large_string(): pd.ArrowDtype(pa.large_string())}.get)
+
+
+def _save(directory, name, array):
+    np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(array))
+
+
+def _load(directory, name):
+    return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+
+
+def _csr(groups, dtype=np.int64):
+    """(sorted keys, bounds, values) for a {key: sorted values} mapping"""
+    keys = sorted(groups)
+    sizes = [len(groups[key]) for key in keys]
+    bounds = np.zeros(len(keys) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=bounds[1:])
+    values = np.concatenate([np.asarray(groups[key], dtype=dtype) for key in keys]) if keys else np.empty(0, dtype)
+    return keys, bounds, values
+
+
+def _byte_keys(keys):
+    """Sorted keys as a fixed-width bytes array, searchable with np.searchsorted"""
+    encoded = [key.encode() for key in keys]
+    return np.array(encoded, dtype=f"S{max((len(key) for key in encoded), default=1)}")
+
+
+def _find(sorted_keys, keys):
+    """Position of each key in a sorted fixed-width bytes array, -1 where missing"""
+    if not len(sorted_keys) or not len(keys):
+        return np.full(len(keys), -1, dtype=np.int64)
+    encoded = [key.encode() for key in keys]
+    # Longer keys would be truncated to the array's width and could falsely match
+    fits = np.array([len(key) <= sorted_keys.dtype.itemsize for key in encoded])
+    probe = np.array(encoded, dtype=sorted_keys.dtype)
+    positions = np.minimum(np.searchsorted(sorted_keys, probe), len(sorted_keys) - 1)
+    return np.where(fits & (sorted_keys[positions] == probe), positions, -1)
+
+
+# --- Build ---
+@contextmanager
+def build_lock(shared_dir):
+    """Hold shared_dir's lock file, so one process at a time builds and prunes"""
+    os.makedirs(shared_dir, exist_ok=True)
+    with open(os.path.join(shared_dir, LOCK), "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)  # released when the file is closed
+        yield
+
+
+def build(paths, shared_dir):
+    """Convert the CSVs at paths ({dataset: csv path}) into shared_dir once; returns the cache directory"""
+    directory = os.path.join(shared_dir, signature(paths))
+    if os.path.exists(os.path.join(directory, MANIFEST)):
+        return directory
+    with build_lock(shared_dir):
+        # Whoever held the lock before us may have built this version already
+        if not os.path.exists(os.path.join(directory, MANIFEST)):
+            _write(paths, shared_dir, directory)
+            prune(shared_dir, keep=os.path.basename(directory))
+    return directory
+
+
+def _write(paths, shared_dir, directory):
+    raw = {}
+    for name, path in paths.items():
+        try:
+            raw[name] = pd.read_csv(path)
+        except (FileNotFoundError, pd.errors.ParserError, pd.errors.EmptyDataError) as e:
+            print(f"Warning: Could not load some datasets: {e}")
+    # As in plain mode, the store joins the raw frames and compacts the result: filling names across
+    # already-compacted frames would mix categoricals with different categories
+    store = StudentStore(raw)
+    views = AggregateViews(raw)
+    datasets = {name: pd.DataFrame({column: compact_column(df[column]) for column in df.columns})
+                for name, df in raw.items()}
+
+    staging = tempfile.mkdtemp(prefix=".build-", dir=shared_dir)
+    try:
+        _stage(staging, datasets, store, views)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    try:
+        os.rename(staging, directory)
+    except OSError:
+        # Another process published the same version first; use theirs
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def _stage(staging, datasets, store, views):
+    manifest = {"format": FORMAT_VERSION, "datasets": {}}
+    for i, (name, df) in enumerate(datasets.items()):
+        prefix = f"dataset{i}"
+        write_frame(os.path.join(staging, f"{prefix}.arrow"), df)
+        index = InvertedIndex(df)
+        tokens, bounds, rows = _csr(index.postings)
+        _save(staging, f"{prefix}-tokens", _byte_keys(tokens))
+        _save(staging, f"{prefix}-bounds", bounds)
+        _save(staging, f"{prefix}-rows", rows)
+        manifest["datasets"][name] = {"prefix": prefix, "columns": index.columns}
+
+    write_frame(os.path.join(staging, "store.arrow"), store.frame)
+    ids = store.id_index.to_numpy(dtype=np.int64)
+    id_order = np.argsort(ids, kind="stable")
+    _save(staging, "store-ids", ids[id_order])
+    _save(staging, "store-id-order", id_order)
+    # Names and tokens are ASCII after normalization, so str order is the byte order searchsorted needs
+    names, name_bounds, name_order = _csr({
+        name: store._name_order[store._name_bounds[code]:store._name_bounds[code + 1]]
+        for code, name in enumerate(store.name_index)
+    })
+    _save(staging, "store-names", _byte_keys(names))
+    _save(staging, "store-name-bounds", name_bounds)
+    _save(staging, "store-name-order", name_order)
+    manifest["store"] = {"column_sources": store.column_sources, "dataset_order": store.dataset_order,
+                         "max_name_tokens": store.max_name_tokens}
+
+    manifest["views"] = {
+        "members": {},
+        "pair_counts": {f"{a}|{b}": [[x, y, count] for (x, y), count in counts.items()]
+                        for (a, b), counts in views.pair_counts.items()},
+        "numeric": {f"{group}|{value}": [[key, count, total] for key, (count, total) in totals.items()]
+                    for (group, value), totals in views.numeric.items()},
+    }
+    for column, members in views.members.items():
+        values, bounds, student_ids = _csr({value: sorted(ids) for value, ids in members.items() if ids})
+        _save(staging, f"cohort-{column}-bounds", bounds)
+        _save(staging, f"cohort-{column}-ids", student_ids)
+        manifest["views"]["members"][column] = values
+
+    with open(os.path.join(staging, MANIFEST), "w") as f:
+        json.dump(manifest, f, default=str)
+
+
+def prune(shared_dir, keep):
+    """Remove other cache versions; workers still mapping them keep their pages until they move over.
+
+    Only published versions (directories holding a manifest) are removed, so
+    builds in progress and anything else kept in shared_dir are left alone.
+    """
+    for entry in os.listdir(shared_dir):
+        path = os.path.join(shared_dir, entry)
+        if entry != keep and not entry.startswith(".build-") and os.path.isfile(os.path.join(path, MANIFEST)):
+            # Windows refuses to delete files that are still mapped; they go on a later build
+            shutil.rmtree(path, ignore_errors=True)
+
+
+# --- Attach ---
+class SharedInvertedIndex(KeywordIndex):
+    """Read-only keyword index over memory-mapped CSR postings"""
+
+    def __init__(self, directory, prefix, columns, num_rows):
+        self.columns = columns
+        self.num_rows = num_rows
+        self.tokens = _load(directory, f"{prefix}-tokens")
+        self.bounds = _load(directory, f"{prefix}-bounds")
+        self.rows = _load(directory, f"{prefix}-rows")
+
+    def rows_for_token(self, token):
+        position = _find(self.tokens, [token])[0]
+        if position < 0:
+            return np.empty(0, dtype=np.int64)
+        return self.rows[self.bounds[position]:self.bounds[position + 1]]
+
+
+class SharedStudentStore(StudentLookup):
+    """Read-only joined frame with id and name lookups over memory-mapped arrays"""
+
+    def __init__(self, directory, manifest, profile_cache_size=10_000):
+        self.frame = read_frame(os.path.join(directory, "store.arrow"))
+        self.column_sources = manifest["column_sources"]
+        self.dataset_order = manifest["dataset_order"]
+        self.max_name_tokens = manifest["max_name_tokens"]
+        self.sorted_ids = _load(directory, "store-ids")
+        self.id_order = _load(directory, "store-id-order")
+        self.names = _load(directory, "store-names")
+        self._name_bounds = _load(directory, "store-name-bounds")
+        self._name_order = _load(directory, "store-name-order")
+        self._profile_cache_size = profile_cache_size
+        self._profiles = OrderedDict()
+
+    def _name_codes(self, names):
+        return _find(self.names, names)
+
+    def positions_for_ids(self, student_ids):
+        """Frame position of each id, -1 where unknown"""
+        student_ids = np.asarray(student_ids, dtype=np.int64)
+        if not len(self.sorted_ids):
+            return np.full(len(student_ids), -1, dtype=np.int64)
+        slots = np.minimum(np.searchsorted(self.sorted_ids, student_ids), len(self.sorted_ids) - 1)
+        return np.where(self.sorted_ids[slots] == student_ids, self.id_order[slots], -1)
+
+    def position_for_id(self, student_id):
+        try:
+            position = self.positions_for_ids([int(student_id)])[0]
+        except (TypeError, ValueError, OverflowError):
+            return None
+        return int(position) if position >= 0 else None
+
+    def memory_usage(self):
+        """Bytes of this worker's private copies (categorical codes and categories)"""
+        return int(sum(self.frame[column].memory_usage(deep=True) for column in self.frame.columns
+                       if isinstance(self.frame[column].dtype, pd.CategoricalDtype)))
+
+
+class SharedAggregateViews(AggregateLookup):
+    """Read-only views: cohort memberships as memory-mapped sorted id arrays, totals in memory.
+
+    Values for cohort listings are read from the shared student store.
+    """
+
+    def __init__(self, directory, manifest, store):
+        self.lock = threading.Lock()
+        self.store = store
+        self.members = {column: defaultdict(lambda: np.empty(0, dtype=np.int64)) for column in COHORT_COLUMNS}
+        for column, values in manifest["members"].items():
+            bounds = _load(directory, f"cohort-{column}-bounds")
+            student_ids = _load(directory, f"cohort-{column}-ids")
+            for i, value in enumerate(values):
+                self.members[column][value] = student_ids[bounds[i]:bounds[i + 1]]
+        self.pair_counts = {tuple(key.split("|")): defaultdict(int, {(x, y): count for x, y, count in entries})
+                            for key, entries in manifest["pair_counts"].items()}
+        self.numeric = {tuple(key.split("|")): defaultdict(lambda: [0, 0.0],
+                                                           {group: [count, total] for group, count, total in entries})
+                        for key, entries in manifest["numeric"].items()}
+
+    def cohort(self, filters, limit=25):
+        arrays = sorted((self.members[column].get(value, np.empty(0, dtype=np.int64)) for column, value in filters),
+                        key=len)
+        if not arrays:
+            return 0, []
+        matched = arrays[0]
+        for student_ids in arrays[1:]:
+            matched = np.intersect1d(matched, student_ids, assume_unique=True)
+        return len(matched), [int(student_id) for student_id in matched[:limit]]
+
+    def cohort_frame(self, filters, student_ids):
+        positions = self.store.positions_for_ids(student_ids)
+        rows = []
+        for student_id, position in zip(student_ids, positions):
+            record = self.store.frame.iloc[int(position)] if position >= 0 else {}
+            row = {"student_id": student_id, "name": record.get("name")}
+            for column, _ in filters:
+                row[column] = gpa_band(record.get("gpa")) if column == "gpa_band" else record.get(column)
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+
+def attach(directory):
+    """(datasets, indexes, store, views) over a cache directory built by build()"""
+    with open(os.path.join(directory, MANIFEST)) as f:
+        manifest = json.load(f)
+    datasets, indexes = {}, {}
+    for name, entry in manifest["datasets"].items():
+        df = read_frame(os.path.join(directory, f"{entry['prefix']}.arrow"))
+        datasets[name] = df
+        indexes[name] = SharedInvertedIndex(directory, entry["prefix"], entry["columns"], len(df))
+    store = SharedStudentStore(directory, manifest["store"])
+    views = SharedAggregateViews(directory, manifest["views"], store)
+    return datasets, indexes, store, views
+
+
+def main():
+    from dataset_manager import DATASET_FILES, DEFAULT_DATA_DIR
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", default=os.environ.get("EDUTRACK_DATA_DIR") or DEFAULT_DATA_DIR)
+    parser.add_argument("--shared-dir", default=os.environ.get("EDUTRACK_SHARED_DATA_DIR") or ".edutrack_shared")
+    args = parser.parse_args()
+    paths = {name: os.path.join(args.data_dir, filename) for name, filename in DATASET_FILES.items()}
+    print(build(paths, args.shared_dir))
+
+
+if __name__ == "__main__":
+    main()
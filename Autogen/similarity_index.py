@@ -0,0 +1,108 @@
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+import numpy as np
+
+
+def char_ngrams(text, n=3):
+    """Character n-grams of each word, padded so short words still contribute"""
+    grams = []
+    for word in str(text).lower().split():
+        word = f" {''.join(ch for ch in word if ch.isalnum())} "
+        if len(word) <= n:
+            grams.append(word)
+        else:
+            grams.extend(word[i:i + n] for i in range(len(word) - n + 1))
+    return grams
+
+
+# Words that flip a question's meaning while barely changing its trigrams
+NEGATIONS = {"no", "not", "non", "none", "never", "nor", "without"}
+
+
+def negations(text):
+    """Negation words in text; n't contractions count as 'not'"""
+    return frozenset(re.findall(r"[a-z]+", str(text).lower().replace("n't", " not"))) & NEGATIONS
+
+
+class QueryIndex:
+    """Bounded in-memory similarity index over past queries.
+
+    Queries are embedded as hashed character-trigram vectors (log-scaled,
+    L2-normalized) in a fixed-size float32 matrix, so search is one
+    matrix-vector product with no network or GPU. When full, the least
+    recently used entry is overwritten.
+    """
+
+    def __init__(self, dim=1024, max_entries=5000):
+        self.dim = dim
+        self.max_entries = max_entries
+        self.vectors = np.zeros((max_entries, dim), dtype=np.float32)
+        self.last_used = np.full(max_entries, -np.inf)
+        self.entries = [None] * max_entries
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def embed(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for gram in char_ngrams(text):
+            vector[zlib.crc32(gram.encode("utf-8")) % self.dim] += 1.0
+        np.log1p(vector, out=vector)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def add(self, query, response, plan=None, version=None):
+        """Store a query with its answer, plan and the dataset version it was answered on"""
+        vector = self.embed(query)
+        with self.lock:
+            if self.size < self.max_entries:
+                slot = self.size
+                self.size += 1
+            else:
+                slot = int(np.argmin(self.last_used))
+            self.vectors[slot] = vector
+            self.last_used[slot] = time.time()
+            self.entries[slot] = {"query": query, "response": response, "plan": plan, "version": version}
+
+    def search(self, query):
+        """Return (similarity, entry) for the closest past query, or (0.0, None)"""
+        vector = self.embed(query)
+        with self.lock:
+            if not self.size:
+                return 0.0, None
+            scores = self.vectors[:self.size] @ vector
+            slot = int(np.argmax(scores))
+            self.last_used[slot] = time.time()
+            return float(scores[slot]), self.entries[slot]
+
+    def load_from_db(self, db_path, skip_responses=(), skip_actions=()):
+        """Seed the index with the most recent logged interactions.
+
+        Rows whose flow mentions any of skip_actions (error and fallback
+        paths) are left out, as are responses in skip_responses.
+        """
+        try:
+            conn = sqlite3.connect(db_path)
+            # `flow` holds the JSON flow, `agent_flow` the rendered text of older rows; both contain the actions
+            rows = conn.execute(
+                "SELECT user_query, agent_response, COALESCE(flow, agent_flow) FROM logs ORDER BY id DESC LIMIT ?",
+                (self.max_entries,)
+            ).fetchall()
+            conn.close()
+        except sqlite3.Error as e:
+            print(f"Warning: Could not load query history: {e}")
+            return 0
+        loaded = 0
+        for user_query, agent_response, flow in reversed(rows):
+            if any(action in (flow or "") for action in skip_actions):
+                continue
+            if user_query and agent_response and agent_response not in skip_responses:
+                self.add(user_query, agent_response)
+                loaded += 1
+        return loaded
+
+    def __len__(self):
+        return self.size
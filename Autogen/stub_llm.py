@@ -0,0 +1,213 @@
+"""Local OpenAI-compatible stub LLM for offline load tests.
+
+Serves /v1/chat/completions with a fixed time to first token, a token rate
+for the rest of the reply and scripted replies for the planning agents, so the
+pipeline can be exercised without network access.
+
+Usage: python stub_llm.py [--port 8999] [--latency 0.2] [--token-rate 100] [--script replies.json]
+Then point the app at it: EDUTRACK_LLM_BASE_URL=http://127.0.0.1:8999/v1
+
+A script file maps a role name (router, selector, data_context, planner) or a
+phrase from an agent's system message to the reply it should get.
+
+--reasoning-words mimics a reasoning model: scripted replies start with a
+<think> block of that many words unless the request constrains the reply
+with a response_format. max_tokens and stop are honoured.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Phrase from each planning agent's system message, by role name used in script files
+ROLE_PHRASES = {
+    "router": "smart router agent",
+    "selector": "agent selector",
+    "data_context": "identify which datasets",
+    "planner": "plan how to answer",
+}
+
+# Scripted replies keyed by a phrase from each planning agent's system message
+SCRIPTED_REPLIES = {
+    "smart router agent": json.dumps({"mode": "both"}),
+    "agent selector": json.dumps({"agents": ["academic"]}),
+    "identify which datasets": json.dumps({"datasets": ["academic_data.csv"]}),
+    "plan how to answer": json.dumps({"mode": "both", "agents": ["academic"], "datasets": ["academic_data.csv"]}),
+}
+
+DEFAULT_REPLY = (
+    "Focus on consistent weekly revision, meet your advisor about weak subjects, "
+    "and schedule short breaks to keep stress manageable."
+)
+
+# The batch planner gets the planner's scripted decision once per numbered question
+BATCH_PLANNER_PHRASE = "numbered list of student questions"
+NUMBERED_LINE_PATTERN = re.compile(r"^\s*\d+\.", re.MULTILINE)
+
+# GroupChat "auto" speaker selection asks to pick the next role from a bracketed list
+SPEAKER_LIST_PATTERN = re.compile(r"select the next role from \[([^\]]*)\]")
+
+settings = {
+    "latency": float(os.environ.get("STUB_LLM_LATENCY", "0.2")),  # seconds before the first token
+    "token_rate": float(os.environ.get("STUB_LLM_TOKEN_RATE", "100")),  # words per second after the first; 0 = instant
+    "fail_rate": float(os.environ.get("STUB_LLM_FAIL_RATE", "0")),  # fraction of requests answered with a 429
+    "reasoning_words": int(os.environ.get("STUB_LLM_REASONING_WORDS", "0")),  # <think> words before free-form replies
+}
+stats = {"requests": 0, "rate_limited": 0}
+speaker_turns = itertools.count()
+
+app = FastAPI()
+
+
+def token_delay():
+    return 1 / settings["token_rate"] if settings["token_rate"] > 0 else 0.0
+
+
+def set_replies(replies):
+    """Override scripted replies; keys are role names from ROLE_PHRASES or system-message phrases"""
+    for key, reply in replies.items():
+        SCRIPTED_REPLIES[ROLE_PHRASES.get(key, key.lower())] = reply if isinstance(reply, str) else json.dumps(reply)
+
+
+def scripted_reply(messages):
+    last_text = str(messages[-1].get("content") or "") if messages else ""
+    speakers = SPEAKER_LIST_PATTERN.search(last_text)
+    if speakers:
+        # Rotate through the non-user roles so every advisor gets a turn
+        roles = [role.strip() for role in speakers.group(1).split(",") if role.strip() != "user"]
+        return roles[next(speaker_turns) % len(roles)] if roles else "user"
+
+    system_text = " ".join(m.get("content") or "" for m in messages if m.get("role") == "system").lower()
+    if BATCH_PLANNER_PHRASE in system_text:
+        decision = json.loads(SCRIPTED_REPLIES[ROLE_PHRASES["planner"]])
+        return json.dumps({"plans": [decision] * len(NUMBERED_LINE_PATTERN.findall(last_text))})
+    for phrase, reply in SCRIPTED_REPLIES.items():
+        if phrase in system_text:
+            return reply
+    return DEFAULT_REPLY
+
+
+def shape_reply(body, content):
+    """Add the reasoning preamble and apply max_tokens (in words) and stop; returns (content, finish_reason)"""
+    if settings["reasoning_words"] and content != DEFAULT_REPLY and not body.get("response_format"):
+        content = "<think>\n" + " ".join(["hmm,"] * settings["reasoning_words"]) + "\n</think>\n" + content
+    for stop in body.get("stop") or []:
+        if stop in content:
+            content = content[:content.index(stop)]
+    words = content.split(" ")
+    max_tokens = body.get("max_tokens") or body.get("max_completion_tokens")
+    if max_tokens and len(words) > max_tokens:
+        return " ".join(words[:max_tokens]), "length"
+    return content, "stop"
+
+
+async def stream_chunks(completion_id, model, content):
+    """Yield the reply word by word as chat.completion.chunk server-sent events"""
+    words = content.split(" ")
+    for i, word in enumerate(words):
+        delta = {"content": word if i == 0 else f" {word}"}
+        if i == 0:
+            delta["role"] = "assistant"
+        chunk = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": None}],
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+        await asyncio.sleep(token_delay())
+    final = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+    }
+    yield f"data: {json.dumps(final)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    stats["requests"] += 1
+    if settings["fail_rate"] and random.random() < settings["fail_rate"]:
+        stats["rate_limited"] += 1
+        return JSONResponse({"error": {"message": "Rate limit exceeded", "code": 429}}, status_code=429,
+                            headers={"Retry-After": "0"})
+    await asyncio.sleep(settings["latency"])
+    content, finish_reason = shape_reply(body, scripted_reply(body.get("messages", [])))
+    if body.get("stream"):
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        return StreamingResponse(stream_chunks(completion_id, body.get("model", "stub"), content),
+                                 media_type="text/event-stream")
+    prompt_tokens = sum(len(str(m.get("content") or "").split()) for m in body.get("messages", []))
+    completion_tokens = len(content.split())
+    # Non-streaming callers still wait for the whole reply to be generated
+    await asyncio.sleep(token_delay() * max(0, completion_tokens - 1))
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": finish_reason,
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def start_in_background(port=8999, latency=None, token_rate=None):
+    """Run the stub in a daemon thread and return its base_url once it is serving"""
+    if latency is not None:
+        settings["latency"] = latency
+    if token_rate is not None:
+        settings["token_rate"] = token_rate
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", access_log=False))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8999)
+    parser.add_argument("--latency", type=float, default=settings["latency"], help="seconds to the first token")
+    parser.add_argument("--token-rate", type=float, default=settings["token_rate"],
+                        help="words per second for the rest of the reply (0 = instant)")
+    parser.add_argument("--fail-rate", type=float, default=settings["fail_rate"],
+                        help="fraction of requests answered with 429 Too Many Requests")
+    parser.add_argument("--reasoning-words", type=int, default=settings["reasoning_words"],
+                        help="words of <think> preamble before scripted replies without a response_format")
+    parser.add_argument("--script", help="JSON file of scripted replies by role or system-message phrase")
+    args = parser.parse_args()
+    settings["latency"] = args.latency
+    settings["token_rate"] = args.token_rate
+    settings["fail_rate"] = args.fail_rate
+    settings["reasoning_words"] = args.reasoning_words
+    if args.script:
+        with open(args.script) as f:
+            set_replies(json.load(f))
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning", access_log=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+import re
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Object columns with at most this share of distinct values are stored as categoricals
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+
+NAME_CLEAN_PATTERN = re.compile(r"[^a-z0-9 ]+")
+
+
+def normalize_name(text):
+    """Lowercase, drop possessives and punctuation, collapse whitespace"""
+    text = str(text).lower().replace("'s ", " ").replace("’s ", " ")
+    text = re.sub(r"['’]s$", "", text)
+    return " ".join(NAME_CLEAN_PATTERN.sub(" ", text).split())
+
+
+def compact_column(series):
+    """Downcast numeric columns and turn repetitive text columns into categoricals"""
+    if pd.api.types.is_integer_dtype(series):
+        return pd.to_numeric(series, downcast="integer")
+    if series.dtype == object:
+        if series.nunique(dropna=True) <= max(1, len(series) * CATEGORY_MAX_UNIQUE_RATIO):
+            return series.astype("category")
+    return series
+
+
+def _updated_column(series, positions, values, appended):
+    """Copy of a frame column with values written at positions and appended at the end"""
+    size = len(series)
+    if not len(positions) and not len(appended):
+        return series
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        written = pd.Index(np.concatenate([np.asarray(values, dtype=object), np.asarray(appended, dtype=object)]))
+        missing = written.dropna().unique().difference(series.cat.categories)
+        categories = series.cat.categories.append(missing) if len(missing) else series.cat.categories
+        codes = np.concatenate([series.cat.codes.to_numpy().astype(np.int32), np.full(len(appended), -1, np.int32)])
+        codes[positions] = categories.get_indexer(pd.Index(values, dtype=object))
+        codes[size:] = categories.get_indexer(pd.Index(appended, dtype=object))
+        return pd.Series(pd.Categorical.from_codes(codes, categories), name=series.name)
+
+    written = pd.Series(np.concatenate([np.asarray(values, dtype=object), np.asarray(appended, dtype=object)]))
+    written = written.infer_objects()
+    if pd.api.types.is_numeric_dtype(series.dtype) and pd.api.types.is_numeric_dtype(written.dtype):
+        dtype = np.result_type(series.dtype, written.dtype)
+        if np.issubdtype(dtype, np.integer) and written.isna().any():
+            dtype = np.float64
+    else:
+        dtype = object
+    array = np.empty(size + len(appended), dtype=dtype)
+    array[:size] = series.to_numpy(dtype=dtype)
+    array[positions] = np.asarray(values, dtype=object) if dtype == object else np.asarray(values, dtype=dtype)
+    array[size:] = np.asarray(appended, dtype=object) if dtype == object else np.asarray(appended, dtype=dtype)
+    return pd.Series(array, name=series.name)
+
+
+class StudentLookup:
+    """Id, name and profile lookups over a joined student frame.
+
+    Read-only; subclasses provide frame, position_for_id(), _name_codes(),
+    the name CSR arrays (_name_order, _name_bounds), max_name_tokens and
+    the profile cache.
+    """
+
+    def __len__(self):
+        return len(self.frame)
+
+    def positions_for_name(self, name):
+        code = self._name_codes([normalize_name(name)])[0]
+        if code < 0:
+            return np.empty(0, dtype=np.int64)
+        return self._name_order[self._name_bounds[code]:self._name_bounds[code + 1]]
+
+    def profile(self, position):
+        """Joined record for one student, materialized on first access"""
+        if position in self._profiles:
+            self._profiles.move_to_end(position)
+            return self._profiles[position]
+        record = self.frame.iloc[[position]].to_dict("records")[0]
+        record = {key: value for key, value in record.items() if not pd.isna(value)}
+        self._profiles[position] = record
+        if len(self._profiles) > self._profile_cache_size:
+            self._profiles.popitem(last=False)
+        return record
+
+    def get(self, student_id):
+        position = self.position_for_id(student_id)
+        return None if position is None else self.profile(position)
+
+    def find_positions(self, user_query):
+        """Positions of students whose id or name is mentioned in the query"""
+        tokens = normalize_name(user_query).split()
+        positions = []
+        for token in tokens:
+            if token.isdigit():
+                position = self.position_for_id(token)
+                if position is not None:
+                    positions.append(position)
+
+        ngrams = [
+            " ".join(tokens[start:start + size])
+            for size in range(self.max_name_tokens, 0, -1)
+            for start in range(len(tokens) - size + 1)
+        ]
+        if ngrams:
+            for code in self._name_codes(ngrams):
+                if code >= 0:
+                    positions.extend(self._name_order[self._name_bounds[code]:self._name_bounds[code + 1]])
+        return list(dict.fromkeys(int(position) for position in positions))
+
+    def find_profiles(self, user_query, limit=25):
+        return [self.profile(position) for position in self.find_positions(user_query)[:limit]]
+
+
+class StudentStore(StudentLookup):
+    """The grounded datasets joined into one typed frame keyed by student_id"""
+
+    def __init__(self, datasets, profile_cache_size=10_000):
+        self.column_sources = {}
+        self.dataset_order = []
+        self._profile_cache_size = profile_cache_size
+        frame = self._join(datasets)
+        self._set_frame(frame, frame["name"].astype(str).map(normalize_name).to_numpy())
+
+    def _set_frame(self, frame, normalized_names, id_index=None):
+        self.frame = frame
+        self.id_index = id_index if id_index is not None else pd.Index(frame["student_id"])
+
+        # name -> positions as a CSR layout over factorized normalized names
+        self._normalized_names = normalized_names
+        codes, uniques = pd.factorize(normalized_names)
+        self.name_index = pd.Index(uniques)
+        self._name_order = np.argsort(codes, kind="stable")
+        self._name_bounds = np.searchsorted(codes[self._name_order], np.arange(len(uniques) + 1))
+        self.max_name_tokens = max((len(name.split()) for name in uniques), default=0)
+
+        self._profiles = OrderedDict()
+
+    def _join(self, datasets):
+        merged = None
+        for dataset_name, df in datasets.items():
+            if "student_id" not in df.columns:
+                continue
+            self.dataset_order.append(dataset_name)
+            for column in df.columns:
+                if column not in ("student_id", "name"):
+                    self.column_sources[column] = dataset_name
+            if merged is None:
+                merged = df
+                continue
+            merged = merged.merge(df, on="student_id", how="outer", suffixes=("", "__dup"))
+            if "name__dup" in merged.columns:
+                merged["name"] = merged["name"].fillna(merged["name__dup"])
+                merged = merged.drop(columns=["name__dup"])
+
+        if merged is None:
+            return pd.DataFrame({"student_id": pd.Series(dtype="int64"), "name": pd.Series(dtype=object)})
+        merged = merged.reset_index(drop=True)
+        return pd.DataFrame({column: compact_column(merged[column]) for column in merged.columns})
+
+    def with_changes(self, dataset_name, rows, removed_ids=()):
+        """New store with one dataset's changed or added rows applied.
+
+        Students in removed_ids lose that dataset's columns but keep their other
+        data. As in the join, names come from the first dataset and other
+        datasets only fill in missing ones. Only touched cells are rewritten and only the touched names are
+        re-normalized; this store is left untouched for in-flight readers.
+        """
+        columns = {"name"} | {column for column, source in self.column_sources.items() if source == dataset_name}
+        positions = self.id_index.get_indexer(rows["student_id"])
+        existing = positions >= 0
+        removed = self.id_index.get_indexer(pd.Index(removed_ids))
+        removed = removed[removed >= 0]
+        appended = ~existing
+        if "name" in rows.columns and self.dataset_order[:1] != [dataset_name]:
+            renamed = existing.copy()
+            renamed[existing] = self.frame["name"].isna().to_numpy()[positions[existing]]
+        else:
+            renamed = existing
+
+        data = {}
+        for column in self.frame.columns:
+            series = self.frame[column]
+            if column in rows.columns and (column in columns or column == "student_id"):
+                values = rows[column].to_numpy()
+                written = renamed if column == "name" else existing
+                clear = removed if column in columns and column != "name" else removed[:0]
+                data[column] = _updated_column(
+                    series,
+                    np.concatenate([positions[written], clear]),
+                    np.concatenate([values[written], np.full(len(clear), np.nan, dtype=object)]),
+                    values[appended],
+                )
+            elif appended.any() or (column in columns and len(removed)):
+                clear = removed if column in columns else removed[:0]
+                data[column] = _updated_column(series, clear, np.full(len(clear), np.nan, dtype=object),
+                                               np.full(int(appended.sum()), np.nan, dtype=object))
+            else:
+                data[column] = series
+        frame = pd.DataFrame(data, copy=False)
+
+        normalized = self._normalized_names
+        if "name" in rows.columns:
+            names = rows["name"].astype(str).map(normalize_name).to_numpy()
+            normalized = np.concatenate([normalized, names[appended]])
+            normalized[positions[renamed]] = names[renamed]
+        id_index = self.id_index.append(pd.Index(rows["student_id"].to_numpy()[appended])) if appended.any() \
+            else self.id_index
+
+        store = StudentStore.__new__(StudentStore)
+        store.column_sources = dict(self.column_sources)
+        store.dataset_order = list(self.dataset_order)
+        store._profile_cache_size = self._profile_cache_size
+        store._set_frame(frame, normalized, id_index)
+        return store
+
+    def position_for_id(self, student_id):
+        try:
+            position = self.id_index.get_loc(int(student_id))
+        except (KeyError, TypeError, ValueError):
+            return None
+        return position if isinstance(position, (int, np.integer)) else None
+
+    def _name_codes(self, names):
+        """Code of each normalized name in the name index, -1 where unknown"""
+        return self.name_index.get_indexer(names) if len(self.name_index) else np.full(len(names), -1)
+
+    def memory_usage(self):
+        """Approximate bytes held by the joined frame and its indexes"""
+        return int(
+            self.frame.memory_usage(deep=True).sum()
+            + self.id_index.memory_usage(deep=True)
+            + self.name_index.memory_usage(deep=True)
+            + self._name_order.nbytes
+            + self._name_bounds.nbytes
+        )
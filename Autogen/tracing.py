@@ -0,0 +1,147 @@
+import threading
+from collections import deque
+
+# Upper bounds (seconds) of the latency histogram buckets; +Inf is implicit
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram plus a window of recent samples for exact quantiles"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, window=2048):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, seconds):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += seconds
+        self.recent.append(seconds)
+
+    def quantile(self, q):
+        """Quantile over the recent window (nearest rank); 0.0 when empty"""
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def cumulative(self):
+        """(le, count) pairs in Prometheus order, ending with +Inf"""
+        total = 0
+        pairs = []
+        for bound, count in zip(list(self.buckets) + ["+Inf"], self.counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels.items()) + "}"
+
+
+class Tracer:
+    """Process-wide aggregation of finished spans.
+
+    Each span is a dict with stage, agent, status and duration_ms (LLM spans
+    also carry prompt_tokens and completion_tokens). Durations go into one
+    histogram per (stage, agent, status); tokens into per-agent counters.
+    render() emits the Prometheus text exposition format.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.tokens = {}
+
+    def record(self, span):
+        key = (span["stage"], span["agent"], span["status"])
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(self.buckets)
+            histogram.observe(span["duration_ms"] / 1000)
+            # Cache hits and failed calls cost no completion tokens
+            if span["status"] == "ok":
+                for kind in ("prompt", "completion"):
+                    if f"{kind}_tokens" in span:
+                        token_key = (span["agent"], kind)
+                        self.tokens[token_key] = self.tokens.get(token_key, 0) + span[f"{kind}_tokens"]
+
+    def summary(self):
+        """Count, mean and p50/p95/p99 (ms) per stage and agent, across statuses"""
+        with self.lock:
+            merged = {}
+            for (stage, agent, status), histogram in self.histograms.items():
+                entry = merged.setdefault(f"{stage}/{agent}", {"count": 0, "sum": 0.0, "samples": [], "statuses": {}})
+                entry["count"] += histogram.count
+                entry["sum"] += histogram.sum
+                entry["samples"].extend(histogram.recent)
+                entry["statuses"][status] = histogram.count
+        result = {}
+        for name, entry in sorted(merged.items()):
+            samples = sorted(entry["samples"])
+            result[name] = {
+                "count": entry["count"],
+                "mean_ms": round(entry["sum"] / entry["count"] * 1000, 2),
+                **{f"p{int(q * 100)}_ms": round(samples[min(len(samples) - 1, int(q * len(samples)))] * 1000, 2)
+                   for q in QUANTILES},
+                "statuses": entry["statuses"],
+            }
+        return result
+
+    def render(self, gauges=None, counters=None):
+        """Prometheus text format; `gauges` adds {name: value} or {name: {label_value: value}} lines,
+        `counters` adds cumulative ones, named edutrack_<name>_total"""
+        lines = [
+            "# HELP edutrack_stage_duration_seconds Pipeline stage and LLM call latency",
+            "# TYPE edutrack_stage_duration_seconds histogram",
+        ]
+        with self.lock:
+            histograms = sorted(self.histograms.items())
+            for (stage, agent, status), histogram in histograms:
+                for bound, count in histogram.cumulative():
+                    labels = _labels(stage=stage, agent=agent, status=status, le=bound)
+                    lines.append(f"edutrack_stage_duration_seconds_bucket{labels} {count}")
+                labels = _labels(stage=stage, agent=agent, status=status)
+                lines.append(f"edutrack_stage_duration_seconds_sum{labels} {histogram.sum:.6f}")
+                lines.append(f"edutrack_stage_duration_seconds_count{labels} {histogram.count}")
+
+            lines += [
+                "# HELP edutrack_stage_latency_seconds Recent-window latency quantiles",
+                "# TYPE edutrack_stage_latency_seconds summary",
+            ]
+            for (stage, agent, status), histogram in histograms:
+                for q in QUANTILES:
+                    labels = _labels(stage=stage, agent=agent, status=status, quantile=q)
+                    lines.append(f"edutrack_stage_latency_seconds{labels} {histogram.quantile(q):.6f}")
+                labels = _labels(stage=stage, agent=agent, status=status)
+                lines.append(f"edutrack_stage_latency_seconds_sum{labels} {histogram.sum:.6f}")
+                lines.append(f"edutrack_stage_latency_seconds_count{labels} {histogram.count}")
+
+            lines += [
+                "# HELP edutrack_llm_tokens_total Estimated prompt and completion tokens sent to the LLM",
+                "# TYPE edutrack_llm_tokens_total counter",
+            ]
+            for (agent, kind), count in sorted(self.tokens.items()):
+                lines.append(f"edutrack_llm_tokens_total{_labels(agent=agent, kind=kind)} {count}")
+
+        metrics = [(f"{name}_total", "counter", value) for name, value in (counters or {}).items()]
+        metrics += [(name, "gauge", value) for name, value in (gauges or {}).items()]
+        for name, kind, value in metrics:
+            lines.append(f"# TYPE edutrack_{name} {kind}")
+            if isinstance(value, dict):
+                for label, labelled in sorted(value.items()):
+                    lines.append(f"edutrack_{name}{_labels(name=label)} {labelled}")
+            else:
+                lines.append(f"edutrack_{name} {value}")
+        return "\n".join(lines) + "\n"